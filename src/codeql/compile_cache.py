@@ -0,0 +1,175 @@
+"""
+Content-addressed cache of precompiled CodeQL queries (.qlx files).
+
+A precompiled query is only valid for the exact query text, the library
+code it can import (the .qll files and qlpack.yml / codeql-pack.lock.yml
+of its pack) and the CodeQL CLI that compiled it. Entries are keyed by a
+SHA-256 of all of these and stored in a cache directory that can be shared
+between checkouts and workers (CODEQL_QUERY_CACHE_DIR), so:
+
+- an edited query is always recompiled (a stale .qlx is never reused);
+- a fresh checkout with the same queries and CLI reuses earlier compiles.
+
+On a hit, the cached .qlx is copied next to the .ql, where CodeQL picks it up.
+"""
+
+import functools
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import List, Optional
+
+from src.utils.exceptions import CodeQLConfigError, CodeQLExecutionError
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_QUERY_CACHE_DIR = "output/cache/codeql-queries"
+
+# Pack files that change how queries in the pack resolve and compile
+_PACK_FILES = ("qlpack.yml", "codeql-pack.yml", "codeql-pack.lock.yml")
+
+
+@functools.lru_cache(maxsize=None)
+def get_codeql_version(codeql_bin: str) -> str:
+    """
+    Return the CodeQL CLI version string (cached per executable).
+
+    Raises:
+        CodeQLConfigError: If CodeQL executable not found.
+        CodeQLExecutionError: If 'codeql version' fails.
+    """
+    try:
+        completed = subprocess.run(
+            [codeql_bin, "version", "--format=terse"],
+            check=True,
+            text=True,
+            capture_output=True
+        )
+    except FileNotFoundError as e:
+        raise CodeQLConfigError(
+            f"CodeQL executable not found: {codeql_bin}. "
+            "Please check your CODEQL_PATH configuration."
+        ) from e
+    except subprocess.CalledProcessError as e:
+        raise CodeQLExecutionError(
+            f"Failed to get CodeQL version: CodeQL returned exit code {e.returncode}"
+        ) from e
+    return completed.stdout.strip()
+
+
+def find_pack_dir(query_file: Path) -> Path:
+    """
+    Return the directory of the pack containing `query_file` (the nearest
+    ancestor with a qlpack.yml), or the query's own directory.
+    """
+    directory = query_file.parent
+    while True:
+        if any((directory / name).exists() for name in _PACK_FILES):
+            return directory
+        if directory.parent == directory:
+            return query_file.parent
+        directory = directory.parent
+
+
+def query_cache_key(query_file: Path, cli_version: str) -> str:
+    """
+    Compute the cache key of a query: its text, its pack's metadata and
+    library (.qll) files, and the CLI version.
+
+    Args:
+        query_file (Path): The .ql file.
+        cli_version (str): Output of get_codeql_version().
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    pack_dir = find_pack_dir(query_file)
+    digest = hashlib.sha256()
+    digest.update(cli_version.encode("utf-8"))
+    digest.update(b"\0query\0")
+    digest.update(query_file.read_bytes())
+
+    pack_inputs = [pack_dir / name for name in _PACK_FILES if (pack_dir / name).exists()]
+    pack_inputs += sorted(pack_dir.rglob("*.qll"))
+    for path in pack_inputs:
+        digest.update(b"\0" + path.relative_to(pack_dir).as_posix().encode("utf-8") + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class QueryCompileCache:
+    """
+    Directory of precompiled queries named <key>.qlx.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_QUERY_CACHE_DIR) -> None:
+        """
+        Args:
+            cache_dir (str, optional): Where compiled queries are stored.
+        """
+        self.cache_dir = Path(cache_dir)
+
+    def _entry(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.qlx"
+
+    def restore(self, key: str, qlx_path: Path) -> bool:
+        """
+        Copy the cached compilation for `key` to `qlx_path` if there is one.
+
+        Returns:
+            bool: True on a cache hit.
+        """
+        entry = self._entry(key)
+        if not entry.exists():
+            return False
+        try:
+            shutil.copyfile(entry, qlx_path)
+        except OSError as e:
+            logger.warning("Cannot restore precompiled query %s: %s", qlx_path, e)
+            return False
+        return True
+
+    def store(self, key: str, qlx_path: Path) -> None:
+        """
+        Add a freshly compiled .qlx to the cache (atomically; failures are logged).
+        """
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(qlx_path, tmp_name)
+            os.replace(tmp_name, self._entry(key))
+        except OSError as e:
+            logger.warning("Cannot store precompiled query %s in cache: %s", qlx_path, e)
+
+
+def partition_queries(
+    query_files: List[Path],
+    cache: Optional[QueryCompileCache],
+    codeql_bin: str
+) -> List[Path]:
+    """
+    Restore every query that has a cached compilation and return the ones
+    that still need compiling.
+
+    Without a cache, a query needs compiling unless a .qlx newer than the
+    .ql already sits next to it.
+
+    Raises:
+        CodeQLConfigError: If CodeQL executable not found.
+        CodeQLExecutionError: If the CodeQL version cannot be determined.
+    """
+    misses = []
+    cli_version = get_codeql_version(codeql_bin) if cache else ""
+    for query_file in query_files:
+        qlx_path = Path(str(query_file) + "x")
+        if cache is None:
+            if not qlx_path.exists() or qlx_path.stat().st_mtime < query_file.stat().st_mtime:
+                misses.append(query_file)
+        elif not cache.restore(query_cache_key(query_file, cli_version), qlx_path):
+            misses.append(query_file)
+    return misses
@@ -0,0 +1,292 @@
+"""
+Speculative context prefetch for the first LLM turn.
+
+Many triage conversations open with the model asking for the caller of
+the function with the issue, or for a macro or struct used in it, and
+each request costs a full completion round trip. The prefetcher resolves
+these from the lookup indexes before the first turn and attaches them to
+the prompt, within a token budget. prefetch_stats() then reports, per
+issue, which prefetched items the model mentioned and how many it used
+without fetching them again.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypedDict
+
+from src.codeql.db_index import NAME_TABLES, get_name_index, resolve_tool_output
+from src.codeql.db_lookup import CodeQLDBLookup
+from src.utils.common_functions import estimate_tokens
+from src.utils.records import field_value, line_range
+
+_IDENTIFIER = re.compile(r"\b[A-Za-z_]\w*\b")
+
+# Identifiers that are never worth a lookup
+_C_KEYWORDS = frozenset("""
+    auto break case char const continue default do double else enum extern float for goto if
+    inline int long register restrict return short signed sizeof static struct switch typedef
+    union unsigned void volatile while bool true false class namespace new delete this template
+    typename public private protected virtual override nullptr operator using try catch throw
+    NULL
+""".split())
+
+# Distinct identifiers of the function looked up at most
+MAX_CANDIDATES = 200
+
+# Fewest tokens any section can take ("### macro 'X'" and a one-line body);
+# prefetching stops once the remaining budget is below this
+MIN_SECTION_TOKENS = 8
+
+# Tool calls that would have fetched each kind of prefetched item: name -> argument names
+_TOOL_ARGS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    "caller": {"get_caller_function": ()},
+    "macro": {"get_macro": ("macro_name",), "get_code_batch": ("macro_names",)},
+    "class": {"get_class": ("object_name",), "get_code_batch": ("class_names",)},
+}
+
+
+def _line_count(row: Optional[Mapping]) -> int:
+    """
+    Return how many source lines a caller / class row spans (0 if unknown).
+    """
+    if row is None:
+        return 0
+    try:
+        start_line, end_line = line_range(row)
+    except (KeyError, TypeError, ValueError):
+        return 0
+    return max(0, end_line - start_line + 1)
+
+
+class PrefetchedItemJson(TypedDict):
+    """
+    A prefetched item as saved in the raw input file and read by prefetch_stats().
+    """
+
+    kind: str
+    name: str
+    tokens: int
+
+
+@dataclass
+class PrefetchedItem:
+    """
+    One piece of context attached to the prompt.
+    """
+
+    kind: str
+    name: str
+    tokens: int
+
+
+@dataclass
+class PrefetchResult:
+    """
+    The prefetched context and what it contains.
+    """
+
+    context: str = ""
+    items: List[PrefetchedItem] = field(default_factory=list)
+    caller: Optional[Mapping] = None
+
+    @property
+    def tokens(self) -> int:
+        return sum(item.tokens for item in self.items)
+
+    def to_json(self) -> List[PrefetchedItemJson]:
+        return [PrefetchedItemJson(kind=item.kind, name=item.name, tokens=item.tokens) for item in self.items]
+
+
+class ContextPrefetcher:
+    """
+    Collects the direct caller and the macros and classes / structs referenced
+    by a function, most likely needed first, until the token budget is spent.
+    """
+
+    def __init__(
+        self,
+        budget_tokens: int,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        lookup: Optional[CodeQLDBLookup] = None
+    ) -> None:
+        """
+        Args:
+            budget_tokens (int): Maximum tokens of attached context (0 disables prefetching).
+            count_tokens (Callable[[str], int], optional): Token counter. Defaults to estimate_tokens().
+            lookup (Optional[CodeQLDBLookup], optional): Lookup helper. Defaults to a new one.
+        """
+        self.budget_tokens = max(0, budget_tokens)
+        self.count_tokens = count_tokens
+        self.lookup = lookup or CodeQLDBLookup()
+
+    def _code_of(self, db_path: str, row: Mapping) -> str:
+        file_path, start_line, end_line, lines = self.lookup.extract_function_lines_from_db(db_path, row)
+        return self.lookup.format_numbered_snippet(file_path, start_line, lines[start_line - 1:end_line])
+
+    def _candidates(
+        self,
+        db_path: str,
+        function_tree_file: str,
+        current_function: Mapping,
+        function_code: str
+    ) -> Iterator[Tuple[str, str, Callable[[], str], Optional[Mapping]]]:
+        """
+        Yield (kind, name, load_text, row) for each item worth attaching, in priority order.
+        """
+        caller = self.lookup.get_caller_function(function_tree_file, current_function)
+        if isinstance(caller, Mapping):
+            yield "caller", field_value(caller, "function_name"), partial(self._code_of, db_path, caller), caller
+
+        own_name = field_value(current_function, "function_name")
+        identifiers = [
+            name for name in dict.fromkeys(_IDENTIFIER.findall(function_code))
+            if name not in _C_KEYWORDS and name != own_name
+        ][:MAX_CANDIDATES]
+
+        for kind, file_name in (("macro", "Macros.csv"), ("class", "Classes.csv")):
+            csv_file = Path(db_path) / file_name
+            if not resolve_tool_output(csv_file).exists():
+                continue
+            index = get_name_index(csv_file, *NAME_TABLES[file_name])
+            for name in identifiers:
+                row = index.find(name)
+                if row is None:
+                    continue
+                if kind == "macro":
+                    yield kind, name, partial(field_value, row, "body"), row
+                else:
+                    yield kind, name, partial(self._code_of, db_path, row), row
+
+    def prefetch(
+        self,
+        db_path: str,
+        function_tree_file: str,
+        current_function: Mapping,
+        function_code: str,
+        max_tokens: Optional[int] = None
+    ) -> PrefetchResult:
+        """
+        Resolve the likely-needed context of a function within the token budget.
+
+        Items that do not fit in the remaining budget are skipped, so a large
+        caller does not crowd out small macro definitions. An item's source is
+        only read if its heading and line count (each numbered line costs at
+        least a token) fit, and the search stops once no section can fit.
+
+        Args:
+            db_path (str): Path to the CodeQL database folder.
+            function_tree_file (str): Path to FunctionTree.csv.
+            current_function (Mapping): The function with the issue.
+            function_code (str): The code already in the prompt (scanned for identifiers).
+            max_tokens (Optional[int], optional): Tokens left in the prompt budget; lowers
+                the prefetch budget if smaller. Defaults to None (no limit).
+
+        Returns:
+            PrefetchResult: The context to append to the prompt code and its items.
+
+        Raises:
+            CodeQLError: If database files cannot be read.
+        """
+        result = PrefetchResult()
+        remaining = self.budget_tokens if max_tokens is None else min(self.budget_tokens, max_tokens)
+        if remaining <= 0:
+            return result
+
+        sections = []
+        for kind, name, load_text, row in self._candidates(
+            db_path, function_tree_file, current_function, function_code
+        ):
+            if remaining < MIN_SECTION_TOKENS:
+                break
+            title = f"caller of '{field_value(current_function, 'function_name')}'" if kind == "caller" \
+                else f"{kind} '{name}'"
+            heading = f"### {title}\n"
+            if kind != "macro" and _line_count(row) >= remaining:
+                continue  # Cannot fit: skip without reading its source
+            if self.count_tokens(heading) >= remaining:
+                continue
+            section = heading + load_text()
+            tokens = self.count_tokens(section)
+            if tokens > remaining:
+                continue
+            remaining -= tokens
+            sections.append(section)
+            result.items.append(PrefetchedItem(kind, name, tokens))
+            if kind == "caller":
+                result.caller = row
+
+        if sections:
+            result.context = (
+                "\n\nAdditional context (already retrieved, no need to request it with tools):\n\n"
+                + "\n\n".join(sections)
+            )
+        return result
+
+
+def _tool_calls(message: Mapping) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (tool name, arguments) for the tool calls of an assistant message.
+    """
+    for call in message.get("tool_calls") or ():
+        function = call["function"] if isinstance(call, Mapping) else call.function
+        name = function["name"] if isinstance(function, Mapping) else function.name
+        arguments = function["arguments"] if isinstance(function, Mapping) else function.arguments
+        if isinstance(arguments, str):
+            try:
+                arguments = json.loads(arguments)
+            except ValueError:
+                arguments = {}
+        yield name, arguments if isinstance(arguments, dict) else {}
+
+
+def prefetch_stats(items: Sequence[PrefetchedItemJson], messages: List[Mapping]) -> Dict[str, int]:
+    """
+    Summarize how a conversation used the prefetched context.
+
+    An item counts as mentioned when an assistant message names it, and as
+    re-requested when the model still fetched it with a tool. Items mentioned
+    without being re-requested are the ones the prefetch actually served
+    (items_used). Several of them may have been fetched in a single tool
+    round, so this is not a count of round trips.
+
+    Args:
+        items (Sequence[PrefetchedItemJson]): PrefetchResult.to_json() of the issue.
+        messages (List[Mapping]): The conversation returned by run_llm_security_analysis().
+
+    Returns:
+        Dict[str, int]: prefetched, tokens, mentioned, rerequested and items_used.
+    """
+    assistant = [message for message in messages if message.get("role") == "assistant"]
+    text = "\n".join(str(message.get("content") or "") for message in assistant)
+    calls = [call for message in assistant for call in _tool_calls(message)]
+
+    mentioned = rerequested = used = 0
+    for item in items:
+        tools = _TOOL_ARGS.get(item["kind"], {})
+        fetched_again = False
+        for name, arguments in calls:
+            if name not in tools:
+                continue
+            arg_names = tools[name]
+            if not arg_names:
+                fetched_again = True
+            for arg_name in arg_names:
+                value = arguments.get(arg_name)
+                values = value if isinstance(value, list) else [value]
+                if item["name"] in values:
+                    fetched_again = True
+        is_mentioned = item["name"] in text
+        mentioned += is_mentioned
+        rerequested += fetched_again
+        used += is_mentioned and not fetched_again
+
+    return {
+        "prefetched": len(items),
+        "tokens": sum(item["tokens"] for item in items),
+        "mentioned": mentioned,
+        "rerequested": rerequested,
+        "items_used": used,
+    }
@@ -0,0 +1,729 @@
+"""
+In-memory indexes over CodeQL tool-query outputs.
+
+FunctionTree.csv is read once per database and turned into a per-file
+interval index, so "smallest function enclosing file:line" is answered
+with a binary search instead of a full CSV scan for every issue and
+every bracket reference. The same index carries function_id / caller_id
+maps, and Macros.csv, GlobalVars.csv and Classes.csv get name indexes
+(exact hash lookup plus a trigram index for partial matches), so each
+LLM tool call is a dictionary lookup rather than a file pass. CallGraph.csv
+(one row per call edge) becomes caller/callee adjacency lists.
+
+When a database has an up-to-date SQLite sidecar (see db_sidecar.py and
+build_tool_sidecar()), the same lookups are answered from it instead and
+the CSVs are not parsed at all.
+
+A tool output can also be the BQRS result decoded to JSON (<name>.json
+instead of <name>.csv, see CODEQL_TOOLS_FORMAT). Its columns arrive typed
+and unquoted, so rows are built without splitting or quote stripping.
+"""
+
+import heapq
+import json
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, TypeVar, Union
+
+from src.codeql.db_sidecar import (
+    SidecarWriter,
+    open_call_graph_sidecar,
+    open_function_sidecar,
+    open_name_sidecar,
+)
+from src.utils.csv_parser import parse_csv_row, split_csv_fields
+from src.utils.exceptions import CodeQLError
+from src.utils.records import FunctionRecord, ToolRow, field_value
+
+
+FUNCTION_TREE_KEYS = list(FunctionRecord.KEYS)
+MACROS_KEYS = ["macro_name", "body"]
+GLOBAL_VARS_KEYS = ["global_var_name", "file", "start_line", "end_line"]
+CLASSES_KEYS = ["type", "class_name", "file", "start_line", "end_line", "simple_name"]
+CALL_GRAPH_KEYS = ["caller_id", "callee_id", "file", "call_line"]
+
+# Name-indexed tool outputs: file name -> (keys, name fields, file type name)
+NAME_TABLES: Dict[str, Tuple[List[str], List[str], str]] = {
+    "Macros.csv": (MACROS_KEYS, ["macro_name"], "Macros CSV"),
+    "GlobalVars.csv": (GLOBAL_VARS_KEYS, ["global_var_name"], "GlobalVars CSV"),
+    "Classes.csv": (CLASSES_KEYS, ["class_name", "simple_name"], "Classes CSV"),
+}
+
+_NGRAM = 3
+
+
+def clean_field(value: str) -> str:
+    """
+    Strip the CSV quotes and surrounding whitespace from a CodeQL field value.
+    """
+    return value.replace("\"", "").strip()
+
+
+class _FileIntervals:
+    """
+    Smallest-enclosing-interval lookup for the functions of a single file.
+
+    The line axis is cut into elementary segments at every function start
+    and every function end + 1. Inside one segment the set of enclosing
+    functions does not change, so the answer is precomputed per segment
+    with a sweep and a query is a single bisect.
+    """
+
+    __slots__ = ("bounds", "answers")
+
+    def __init__(self, spans: List[Tuple[int, int, int]]) -> None:
+        """
+        Args:
+            spans (List[Tuple[int, int, int]]): (start_line, end_line, row_index) triples.
+        """
+        points = sorted({s for s, _, _ in spans} | {e + 1 for _, e, _ in spans})
+        by_start = sorted(spans)
+        self.bounds: List[int] = points
+        self.answers: List[int] = []
+
+        heap: List[Tuple[int, int, int]] = []
+        next_span = 0
+        for point in points:
+            while next_span < len(by_start) and by_start[next_span][0] <= point:
+                start, end, row_index = by_start[next_span]
+                # Ties on size go to the earliest row, matching the old linear scan
+                heapq.heappush(heap, (end - start, row_index, end))
+                next_span += 1
+            while heap and heap[0][2] < point:
+                heapq.heappop(heap)
+            self.answers.append(heap[0][1] if heap else -1)
+
+    def find(self, line: int) -> int:
+        """
+        Return the row index of the smallest function covering `line`, or -1.
+        """
+        pos = bisect_right(self.bounds, line) - 1
+        if pos < 0:
+            return -1
+        return self.answers[pos]
+
+
+class FunctionTreeIndex:
+    """
+    Interval index over the rows of a FunctionTree.csv file.
+
+    Rows are FunctionRecord objects: compact, with unquoted values and int
+    lines.
+    """
+
+    def __init__(self, rows: List[FunctionRecord]) -> None:
+        """
+        Build the index from parsed FunctionTree rows.
+
+        Args:
+            rows (List[FunctionRecord]): Rows in file order.
+        """
+        self.rows = rows
+        self._by_function_id: Dict[str, int] = {}
+        self._related: Dict[str, List[int]] = {}
+        spans_by_file: Dict[str, List[Tuple[int, int, int]]] = {}
+        for row_index, row in enumerate(rows):
+            function_id = clean_field(row.function_id)
+            caller_id = clean_field(row.caller_id)
+            self._by_function_id.setdefault(function_id, row_index)
+            # A function is "related" to its own id and to the id of its recorded caller
+            self._related.setdefault(function_id, []).append(row_index)
+            if caller_id and caller_id != function_id:
+                self._related.setdefault(caller_id, []).append(row_index)
+            spans_by_file.setdefault(row.file, []).append((row.start_line, row.end_line, row_index))
+
+        self._files: Dict[str, _FileIntervals] = {
+            file: _FileIntervals(spans) for file, spans in spans_by_file.items()
+        }
+        self._file_matches: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def segments(self) -> Iterator[Tuple[str, int, int]]:
+        """
+        Yield (file, first line, row index or -1) for every precomputed line
+        segment: from its first line up to the next segment of the file, the
+        smallest function covering a line is that row.
+        """
+        for file, intervals in self._files.items():
+            for start_line, row_index in zip(intervals.bounds, intervals.answers):
+                yield file, start_line, row_index
+
+    def _matching_files(self, file_path: str) -> List[str]:
+        """
+        Return the indexed file keys that contain `file_path` as a substring.
+
+        The result is memoized per query string; the scan runs over distinct
+        files, not rows.
+        """
+        matches = self._file_matches.get(file_path)
+        if matches is None:
+            # Keys are unquoted; the old scan matched against the quoted column
+            matches = [file for file in self._files if file_path in f"\"{file}\""]
+            with self._lock:
+                self._file_matches[file_path] = matches
+        return matches
+
+    def find_function_by_line(self, file_path: str, line: int) -> Optional[FunctionRecord]:
+        """
+        Find the most specific (smallest) function containing the given file and line.
+
+        Args:
+            file_path (str): File path substring to match against the row's file column.
+            line (int): The line number to check within function range.
+
+        Returns:
+            Optional[FunctionRecord]: The best matching function row, or None if not found.
+        """
+        best_index = -1
+        best_key: Tuple[int, int] = (0, 0)
+        for file in self._matching_files(file_path):
+            row_index = self._files[file].find(line)
+            if row_index < 0:
+                continue
+            row = self.rows[row_index]
+            key = (row.end_line - row.start_line, row_index)
+            if best_index < 0 or key < best_key:
+                best_index, best_key = row_index, key
+        return self.rows[best_index] if best_index >= 0 else None
+
+    def get_by_function_id(self, function_id: str) -> Optional[FunctionRecord]:
+        """
+        Return the first row whose function_id equals `function_id` (quotes ignored).
+        """
+        row_index = self._by_function_id.get(clean_field(function_id), -1)
+        return self.rows[row_index] if row_index >= 0 else None
+
+    def find_related_by_name(
+        self,
+        function_id: str,
+        name: str,
+        less_strict: bool = False
+    ) -> Optional[FunctionRecord]:
+        """
+        Find a function named `name` among the function `function_id` itself and
+        the functions whose recorded caller is `function_id`.
+
+        Args:
+            function_id (str): The function_id of a known function (quotes ignored).
+            name (str): The bare function name to look for.
+            less_strict (bool, optional): If True, accept names containing `name`.
+
+        Returns:
+            Optional[FunctionRecord]: The first matching row in file order, or None.
+        """
+        for row_index in self._related.get(clean_field(function_id), ()):
+            row = self.rows[row_index]
+            candidate_name = row.function_name.replace("\"", "")
+            if candidate_name == name or (less_strict and name in candidate_name):
+                return row
+        return None
+
+
+class NameIndex:
+    """
+    Name lookup over the rows of a tool-query CSV (Macros, GlobalVars, Classes).
+
+    Exact lookups are a dict hit. Partial (substring) lookups use a trigram
+    index over the distinct names to narrow candidates before verifying,
+    and always return the earliest matching row, like the old file scan.
+    """
+
+    def __init__(self, rows: Sequence[Mapping[str, str]], name_fields: List[str]) -> None:
+        """
+        Args:
+            rows (Sequence[Mapping[str, str]]): Parsed CSV rows or decoded ToolRows.
+            name_fields (List[str]): Columns whose (unquoted) value is matched against queries.
+        """
+        self.rows = rows
+        # Distinct name -> earliest row index carrying it in any name field
+        self._first_row: Dict[str, int] = {}
+        for row_index, row in enumerate(rows):
+            for field in name_fields:
+                name = row[field].replace("\"", "").strip()
+                if name:
+                    self._first_row.setdefault(name, row_index)
+
+        self._names: List[str] = list(self._first_row)
+        self._grams: Dict[str, List[int]] = {}
+        for name_index, name in enumerate(self._names):
+            for gram in {name[i:i + _NGRAM] for i in range(len(name) - _NGRAM + 1)}:
+                self._grams.setdefault(gram, []).append(name_index)
+
+    def find(self, name: str, less_strict: bool = False) -> Optional[Mapping[str, str]]:
+        """
+        Return the earliest row whose name equals `name` (or contains it if less_strict).
+
+        Args:
+            name (str): The name to look up.
+            less_strict (bool, optional): If True, use partial matching.
+
+        Returns:
+            Optional[Mapping[str, str]]: The matching row, or None if not found.
+        """
+        if not less_strict:
+            row_index = self._first_row.get(name, -1)
+            return self.rows[row_index] if row_index >= 0 else None
+
+        if len(name) >= _NGRAM:
+            postings = [self._grams.get(name[i:i + _NGRAM], []) for i in range(len(name) - _NGRAM + 1)]
+            candidates = (self._names[i] for i in min(postings, key=len))
+        else:
+            candidates = iter(self._names)
+
+        best = -1
+        for candidate in candidates:
+            if name in candidate:
+                row_index = self._first_row[candidate]
+                if best < 0 or row_index < best:
+                    best = row_index
+        return self.rows[best] if best >= 0 else None
+
+
+class CallGraphIndex:
+    """
+    Caller and callee adjacency lists over the edges of a CallGraph.csv file.
+
+    Each function_id maps to its distinct callers (and callees) in the order
+    their first call appears, so walking the call graph costs O(degree) per
+    function.
+    """
+
+    def __init__(self, edges: List[Tuple[str, str, int]]) -> None:
+        """
+        Args:
+            edges (List[Tuple[str, str, int]]): Unquoted (caller_id, callee_id, call_line)
+                triples in file order.
+        """
+        self._callers: Dict[str, Dict[str, None]] = {}
+        self._callees: Dict[str, Dict[str, None]] = {}
+        self._call_lines: Dict[Tuple[str, str], List[int]] = {}
+        for caller_id, callee_id, call_line in edges:
+            # Dicts as insertion-ordered sets: several calls between two functions are one edge
+            self._callers.setdefault(callee_id, {})[caller_id] = None
+            self._callees.setdefault(caller_id, {})[callee_id] = None
+            self._call_lines.setdefault((caller_id, callee_id), []).append(call_line)
+
+    def callers(self, function_id: str) -> List[str]:
+        """
+        Return the function_ids of the functions calling `function_id` (quotes ignored).
+        """
+        return list(self._callers.get(clean_field(function_id), ()))
+
+    def callees(self, function_id: str) -> List[str]:
+        """
+        Return the function_ids of the functions called by `function_id` (quotes ignored).
+        """
+        return list(self._callees.get(clean_field(function_id), ()))
+
+    def call_lines(self, caller_id: str, callee_id: str) -> List[int]:
+        """
+        Return the lines on which `caller_id` calls `callee_id`, in file order (quotes ignored).
+        """
+        return list(self._call_lines.get((clean_field(caller_id), clean_field(callee_id)), ()))
+
+
+def nearest_callers(call_graph: CallGraphIndex, function_id: str, count: int) -> List[Tuple[str, str]]:
+    """
+    Walk the call graph upwards from `function_id`, breadth first.
+
+    Direct callers come first, then their callers, and so on, until `count`
+    distinct functions are found. Works with CallGraphIndex and its sidecar
+    counterpart.
+
+    Args:
+        call_graph (CallGraphIndex): The call graph (or its sidecar counterpart).
+        function_id (str): The function to start from (quotes ignored).
+        count (int): Maximum number of callers to return.
+
+    Returns:
+        List[Tuple[str, str]]: (caller_id, callee_id) pairs, nearest first,
+            where callee_id is the function the caller calls on the way down.
+    """
+    start = clean_field(function_id)
+    seen = {start}
+    found: List[Tuple[str, str]] = []
+    frontier = [start]
+    while frontier and len(found) < count:
+        next_frontier = []
+        for callee_id in frontier:
+            for caller_id in call_graph.callers(callee_id):
+                if caller_id in seen:
+                    continue
+                seen.add(caller_id)
+                found.append((caller_id, callee_id))
+                next_frontier.append(caller_id)
+                if len(found) >= count:
+                    return found
+        frontier = next_frontier
+    return found
+
+
+_IndexT = TypeVar("_IndexT")
+
+# Indexes kept in memory at once (a database has up to six tool-query outputs)
+MAX_CACHED_INDEXES = 48
+
+_indexes: "OrderedDict[Tuple[str, str], Tuple[Tuple[int, int], object]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+# One lock per index key: an index is built once, without blocking other builds
+_index_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+
+def _read_csv_rows(
+    file_path: Union[str, Path],
+    keys: List[str],
+    file_type_name: str
+) -> List[Dict[str, str]]:
+    """
+    Parse every well-formed row of a CodeQL tool-query CSV file.
+
+    Args:
+        file_path (Union[str, Path]): Path to the CSV file.
+        keys (List[str]): Column names for the rows.
+        file_type_name (str): Descriptive name for the file type, used in error messages.
+
+    Returns:
+        List[Dict[str, str]]: Rows with exactly len(keys) fields, in file order.
+
+    Raises:
+        CodeQLError: If file cannot be read (not found, permission denied, etc.).
+    """
+    rows = []
+    try:
+        with Path(file_path).open("r", encoding="utf-8") as f:
+            for line in f:
+                row = parse_csv_row(line.rstrip("\r\n"), keys)
+                if len(row) == len(keys):
+                    rows.append(row)
+    except FileNotFoundError as e:
+        raise CodeQLError(f"{file_type_name} not found: {file_path}") from e
+    except PermissionError as e:
+        raise CodeQLError(f"Permission denied reading {file_type_name}: {file_path}") from e
+    except OSError as e:
+        raise CodeQLError(f"OS error while reading {file_type_name}: {file_path}") from e
+    return rows
+
+
+def resolve_tool_output(file_path: Union[str, Path]) -> Path:
+    """
+    Return the file holding a tool query's results: the given <name>.csv, or
+    the <name>.json decoded from BQRS (the newer one if both exist).
+
+    Args:
+        file_path (Union[str, Path]): The conventional CSV path (e.g. <db>/FunctionTree.csv).
+
+    Returns:
+        Path: The path to read. It is the CSV path if neither file exists.
+    """
+    csv_path = Path(file_path)
+    json_path = csv_path.with_suffix(".json")
+    try:
+        json_mtime = json_path.stat().st_mtime_ns
+    except OSError:
+        return csv_path
+    try:
+        if csv_path.stat().st_mtime_ns > json_mtime:
+            return csv_path
+    except OSError:
+        pass
+    return json_path
+
+
+def _read_json_tuples(file_path: Union[str, Path], width: int, file_type_name: str) -> List[List]:
+    """
+    Read the result tuples of a BQRS file decoded with 'bqrs decode --format=json'.
+
+    Entity columns (e.g. a File) are replaced by their label, which is what
+    the CSV output shows. Tuples narrower than `width` are dropped.
+
+    Raises:
+        CodeQLError: If file cannot be read or is not a decoded result set.
+    """
+    try:
+        with Path(file_path).open("r", encoding="utf-8") as f:
+            tuples = json.load(f)["#select"]["tuples"]
+    except FileNotFoundError as e:
+        raise CodeQLError(f"{file_type_name} not found: {file_path}") from e
+    except PermissionError as e:
+        raise CodeQLError(f"Permission denied reading {file_type_name}: {file_path}") from e
+    except OSError as e:
+        raise CodeQLError(f"OS error while reading {file_type_name}: {file_path}") from e
+    except (ValueError, KeyError, TypeError) as e:
+        raise CodeQLError(f"Invalid decoded BQRS JSON in {file_type_name}: {file_path}") from e
+
+    return [
+        [value.get("label", "") if isinstance(value, dict) else value for value in values[:width]]
+        for values in tuples
+        if len(values) >= width
+    ]
+
+
+def _read_tool_rows(
+    file_path: Union[str, Path],
+    keys: List[str],
+    file_type_name: str
+) -> Sequence[Mapping[str, str]]:
+    """
+    Read the rows of a Macros/GlobalVars/Classes output, from CSV or decoded JSON.
+
+    Raises:
+        CodeQLError: If file cannot be read (not found, permission denied, etc.).
+    """
+    if Path(file_path).suffix != ".json":
+        return _read_csv_rows(file_path, keys, file_type_name)
+    key_tuple = tuple(keys)
+    return [ToolRow(key_tuple, values) for values in _read_json_tuples(file_path, len(keys), file_type_name)]
+
+
+def _read_function_records(function_tree_file: Union[str, Path]) -> List[FunctionRecord]:
+    """
+    Parse every well-formed row of a FunctionTree output (CSV or decoded JSON)
+    into FunctionRecords.
+
+    Raises:
+        CodeQLError: If file cannot be read (not found, permission denied, etc.).
+    """
+    if Path(function_tree_file).suffix == ".json":
+        return [
+            FunctionRecord(*values)
+            for values in _read_json_tuples(function_tree_file, len(FUNCTION_TREE_KEYS), "Function tree file")
+        ]
+    records = []
+    width = len(FUNCTION_TREE_KEYS)
+    try:
+        with Path(function_tree_file).open("r", encoding="utf-8") as f:
+            for line in f:
+                fields = split_csv_fields(line.rstrip("\r\n"))
+                if len(fields) < width:
+                    continue
+                try:
+                    records.append(FunctionRecord.from_csv_fields(fields[:width]))
+                except ValueError:
+                    continue  # Skip if lines aren't integers
+    except FileNotFoundError as e:
+        raise CodeQLError(f"Function tree file not found: {function_tree_file}") from e
+    except PermissionError as e:
+        raise CodeQLError(f"Permission denied reading Function tree file: {function_tree_file}") from e
+    except OSError as e:
+        raise CodeQLError(f"OS error while reading Function tree file: {function_tree_file}") from e
+    return records
+
+
+def _get_cached_index(
+    file_path: Union[str, Path],
+    file_type_name: str,
+    build: Callable[[], _IndexT]
+) -> _IndexT:
+    """
+    Return the cached index for `file_path`, calling `build` on first use.
+
+    Indexes are cached per resolved path and rebuilt when the file's
+    modification time or size changes (e.g. after the tool queries re-run).
+    Builds of different files run in parallel; concurrent callers asking
+    for the same file wait for a single build. At most MAX_CACHED_INDEXES
+    indexes are kept; the least recently used one is dropped first.
+
+    Raises:
+        CodeQLError: If the file cannot be accessed.
+    """
+    path = Path(file_path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError as e:
+        raise CodeQLError(f"{file_type_name} not found: {file_path}") from e
+    except OSError as e:
+        raise CodeQLError(f"OS error while reading {file_type_name}: {file_path}") from e
+
+    key = (str(path.resolve()), file_type_name)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == version:
+            _indexes.move_to_end(key)
+            return cached[1]
+        build_lock = _index_build_locks.setdefault(key, threading.Lock())
+
+    with build_lock:
+        # Another thread may have built it while we waited
+        with _indexes_lock:
+            cached = _indexes.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        index = build()
+        with _indexes_lock:
+            _indexes[key] = (version, index)
+            _indexes.move_to_end(key)
+            while len(_indexes) > MAX_CACHED_INDEXES:
+                evicted, _ = _indexes.popitem(last=False)
+                _index_build_locks.pop(evicted, None)
+        return index
+
+
+def evict_indexes(db_path: Union[str, Path]) -> None:
+    """
+    Drop the cached indexes of one database's tool-query outputs, e.g. once
+    its issues have been triaged.
+
+    Args:
+        db_path (Union[str, Path]): The database folder.
+    """
+    db_dir = Path(db_path).resolve()
+    with _indexes_lock:
+        for key in [key for key in _indexes if db_dir in Path(key[0]).parents]:
+            del _indexes[key]
+            _index_build_locks.pop(key, None)
+
+
+def get_function_index(function_tree_file: Union[str, Path]) -> FunctionTreeIndex:
+    """
+    Return the FunctionTreeIndex for a FunctionTree.csv file, building it on first use.
+
+    Args:
+        function_tree_file (Union[str, Path]): Path to the FunctionTree.csv file.
+
+    Returns:
+        FunctionTreeIndex: The index for that file.
+
+    Raises:
+        CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
+    """
+    function_tree_file = resolve_tool_output(function_tree_file)
+    return _get_cached_index(
+        function_tree_file,
+        "Function tree file",
+        lambda: open_function_sidecar(function_tree_file)
+        or FunctionTreeIndex(_read_function_records(function_tree_file))
+    )
+
+
+def get_name_index(
+    csv_file: Union[str, Path],
+    keys: List[str],
+    name_fields: List[str],
+    file_type_name: str
+) -> NameIndex:
+    """
+    Return the NameIndex for a Macros/GlobalVars/Classes CSV, building it on first use.
+
+    Args:
+        csv_file (Union[str, Path]): Path to the CSV file.
+        keys (List[str]): Column names for the rows.
+        name_fields (List[str]): Columns matched against lookup names.
+        file_type_name (str): Descriptive name for the file type (e.g., "Macros CSV").
+
+    Returns:
+        NameIndex: The index for that file.
+
+    Raises:
+        CodeQLError: If the CSV file cannot be read (not found, permission denied, etc.).
+    """
+    csv_file = resolve_tool_output(csv_file)
+    return _get_cached_index(
+        csv_file,
+        file_type_name,
+        lambda: open_name_sidecar(csv_file, keys, name_fields)
+        or NameIndex(_read_tool_rows(csv_file, keys, file_type_name), name_fields)
+    )
+
+
+def _read_call_edges(call_graph_file: Union[str, Path]) -> List[Tuple[str, str, int]]:
+    """
+    Read the unquoted (caller_id, callee_id, call_line) triples of a CallGraph output (CSV or JSON).
+
+    Raises:
+        CodeQLError: If file cannot be read (not found, permission denied, etc.).
+    """
+    edges = []
+    for row in _read_tool_rows(call_graph_file, CALL_GRAPH_KEYS, "Call graph file"):
+        try:
+            call_line = int(field_value(row, "call_line"))
+        except ValueError:
+            call_line = 0
+        edges.append((field_value(row, "caller_id"), field_value(row, "callee_id"), call_line))
+    return edges
+
+
+def get_call_graph_index(call_graph_file: Union[str, Path]) -> Optional[CallGraphIndex]:
+    """
+    Return the call graph index for a CallGraph.csv file, building it on first use.
+
+    Args:
+        call_graph_file (Union[str, Path]): Path to the CallGraph.csv file.
+
+    Returns:
+        Optional[CallGraphIndex]: The index, or None if the database has no call
+            graph output (e.g. it was analyzed before the call graph query existed).
+
+    Raises:
+        CodeQLError: If the call graph file cannot be read.
+    """
+    call_graph_file = resolve_tool_output(call_graph_file)
+    if not call_graph_file.exists():
+        return None
+    return _get_cached_index(
+        call_graph_file,
+        "Call graph file",
+        lambda: open_call_graph_sidecar(call_graph_file)
+        or CallGraphIndex(_read_call_edges(call_graph_file))
+    )
+
+
+def build_tool_sidecar(db_path: Union[str, Path]) -> Path:
+    """
+    Write the SQLite sidecar for the tool-query outputs of a database.
+
+    FunctionTree and whichever of Macros, GlobalVars, Classes and CallGraph
+    exist (as CSV or decoded JSON) are parsed once and stored with lookup indexes.
+    The sidecar records each file's modification time and size and is
+    ignored for a file that changes afterwards.
+
+    Args:
+        db_path (Union[str, Path]): The CodeQL database folder.
+
+    Returns:
+        Path: The sidecar path.
+
+    Raises:
+        CodeQLError: If a CSV cannot be read or the sidecar cannot be written.
+    """
+    db_path = Path(db_path)
+    function_tree_file = resolve_tool_output(db_path / "FunctionTree.csv")
+    writer = SidecarWriter(db_path)
+    try:
+        records = _read_function_records(function_tree_file)
+        writer.add_function_tree(function_tree_file, records, FunctionTreeIndex(records).segments())
+        for file_name, (keys, name_fields, file_type_name) in NAME_TABLES.items():
+            csv_file = resolve_tool_output(db_path / file_name)
+            if csv_file.exists():
+                writer.add_name_table(
+                    csv_file, _read_tool_rows(csv_file, keys, file_type_name), keys, name_fields
+                )
+        call_graph_file = resolve_tool_output(db_path / "CallGraph.csv")
+        if call_graph_file.exists():
+            writer.add_call_graph(call_graph_file, _read_call_edges(call_graph_file))
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def tool_sidecar_is_fresh(db_path: Union[str, Path]) -> bool:
+    """
+    Return True if the database's sidecar is up to date with all its tool CSVs.
+    """
+    db_path = Path(db_path)
+    if open_function_sidecar(resolve_tool_output(db_path / "FunctionTree.csv")) is None:
+        return False
+    call_graph_file = resolve_tool_output(db_path / "CallGraph.csv")
+    if call_graph_file.exists() and open_call_graph_sidecar(call_graph_file) is None:
+        return False
+    return all(
+        open_name_sidecar(path, keys, name_fields) is not None
+        for path, keys, name_fields in (
+            (resolve_tool_output(db_path / file_name), keys, name_fields)
+            for file_name, (keys, name_fields, _) in NAME_TABLES.items()
+        )
+        if path.exists()
+    )
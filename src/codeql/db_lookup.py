@@ -2,16 +2,25 @@
 CodeQL database lookup utilities.
 
 This module provides functions to query CodeQL CSV files (FunctionTree.csv,
-Macros.csv, GlobalVars.csv, Classes.csv) and extract code snippets from
-the source archive.
+Macros.csv, GlobalVars.csv, Classes.csv, CallGraph.csv) and extract code snippets from
+the source archive. Lookups are answered from per-database indexes built
+lazily by src.codeql.db_index.
 """
 
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import List, Mapping, Optional, Tuple, Union
 
-from src.utils.exceptions import CodeQLError
-from src.utils.common_functions import read_file_lines_from_zip
-from src.utils.csv_parser import parse_csv_row
+from src.codeql.db_index import (
+    CLASSES_KEYS,
+    GLOBAL_VARS_KEYS,
+    MACROS_KEYS,
+    get_call_graph_index,
+    get_function_index,
+    get_name_index,
+    nearest_callers,
+)
+from src.utils.records import field_value, line_range
+from src.utils.source_archive import get_source_archive
 
 
 class CodeQLDBLookup:
@@ -20,78 +29,15 @@ class CodeQLDBLookup:
     global variables, classes, and caller relationships.
     """
 
-    def _iter_csv_lines(
-        self,
-        file_path: Union[str, Path],
-        file_type_name: str
-    ):
-        """
-        Generator that yields lines from a CSV file, handling file I/O errors.
-
-        This helper centralizes CSV file opening, line iteration, and error handling.
-        Each method can iterate over the yielded lines and apply method-specific logic.
-
-        Args:
-            file_path: Path to the CSV file to read.
-            file_type_name: Descriptive name for the file type (e.g., "Function tree file",
-                           "Macros CSV", "GlobalVars CSV") for error messages.
-
-        Yields:
-            str: Each line from the CSV file (including newline characters).
-
-        Raises:
-            CodeQLError: If file cannot be read (not found, permission denied, etc.).
-        """
-        try:
-            with Path(file_path).open("r", encoding="utf-8") as f:
-                while True:
-                    line = f.readline()
-                    if not line:
-                        break
-                    yield line
-        except (FileNotFoundError, PermissionError, OSError) as e:
-            raise self._convert_csv_file_error(e, file_path, file_type_name) from e
-
-
-    @staticmethod
-    def _convert_csv_file_error(
-        error: Exception,
-        file_path: Union[str, Path],
-        file_type_name: str
-    ) -> CodeQLError:
-        """
-        Convert file I/O exceptions to CodeQLError with consistent messaging.
-
-        Args:
-            error: The original exception (FileNotFoundError, PermissionError, or OSError).
-            file_path: Path to the CSV file that caused the error.
-            file_type_name: Descriptive name for the file type (e.g., "Function tree file",
-                           "Macros CSV", "GlobalVars CSV") for error messages.
-
-        Returns:
-            CodeQLError: Converted exception with appropriate message.
-        """
-        file_path_str = str(file_path)
-        if isinstance(error, FileNotFoundError):
-            return CodeQLError(f"{file_type_name} not found: {file_path_str}")
-        elif isinstance(error, PermissionError):
-            return CodeQLError(f"Permission denied reading {file_type_name}: {file_path_str}")
-        elif isinstance(error, OSError):
-            return CodeQLError(f"OS error while reading {file_type_name}: {file_path_str}")
-        else:
-            # Fallback for unexpected exception types
-            return CodeQLError(f"Error reading {file_type_name}: {file_path_str}")
-
-
     def get_function_by_line(
         self,
         function_tree_file: str,
         file: str,
         line: int
-    ) -> Optional[Dict[str, str]]:
+    ) -> Optional[Mapping[str, str]]:
         """
-        Retrieve the function dictionary from a CSV (FunctionTree.csv) that matches
-        the specified file and line coverage.
+        Retrieve the smallest function from FunctionTree.csv that covers the
+        specified file and line, using the database's interval index.
 
         Args:
             function_tree_file (str): Path to the FunctionTree.csv file.
@@ -99,30 +45,21 @@ class CodeQLDBLookup:
             line (int): A line number within the function's start_line and end_line range.
 
         Returns:
-            Optional[Dict[str, str]]: The matching function row as a dict, or None if not found.
+            Optional[Mapping[str, str]]: The matching function row as a dict, or None if not found.
         
         Raises:
             CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
         """
-        keys = ["function_name", "file", "start_line", "function_id", "end_line", "caller_id"]
-        for function in self._iter_csv_lines(function_tree_file, "Function tree file"):
-            if file in function:
-                row_dict = parse_csv_row(function, keys)
-                if row_dict and row_dict["start_line"] and row_dict["end_line"]:
-                    start = int(row_dict["start_line"])
-                    end = int(row_dict["end_line"])
-                    if start <= line <= end:
-                        return row_dict
-        return None
+        return get_function_index(function_tree_file).find_function_by_line(file, line)
 
 
     def get_function_by_name(
             self,
             function_tree_file: str,
             function_name: str,
-            all_function: List[Dict[str, Any]],
+            all_function: List[Mapping[str, str]],
             less_strict: bool = False
-        ) -> Tuple[Union[str, Dict[str, str]], Optional[Dict[str, str]]]:
+        ) -> Tuple[Union[str, Mapping[str, str]], Optional[Mapping[str, str]]]:
             """
             Retrieve a function by searching function_name in FunctionTree.csv.
             If not found, tries partial match if less_strict is True.
@@ -130,38 +67,26 @@ class CodeQLDBLookup:
             Args:
                 function_tree_file (str): Path to FunctionTree.csv.
                 function_name (str): Desired function name (e.g., 'MyClass::MyFunc').
-                all_function (List[Dict[str, Any]]): A list of known function dictionaries.
+                all_function (List[Mapping[str, str]]): A list of known function dictionaries.
                 less_strict (bool, optional): If True, use partial matching. Defaults to False.
 
             Returns:
-                Tuple[Union[str, Dict[str, str]], Optional[Dict[str, str]]]:
+                Tuple[Union[str, Mapping[str, str]], Optional[Mapping[str, str]]]:
                     - The found function (dict) or an error message (str).
                     - The "parent function" that references it, if relevant.
             
             Raises:
                 CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
             """
-            keys = ["function_name", "file", "start_line", "function_id", "end_line", "caller_id"]
             function_name_only = function_name.split("::")[-1]
+            function_index = get_function_index(function_tree_file)
 
             for current_function in all_function:
-                try:
-                    with Path(function_tree_file).open("r", encoding="utf-8") as f:
-                        while True:
-                            row = f.readline()
-                            if not row:
-                                break
-                            if current_function["function_id"] in row:
-                                row_dict = parse_csv_row(row, keys)
-                                if not row_dict:
-                                    continue
-
-                                candidate_name = row_dict["function_name"].replace("\"", "")
-                                if (candidate_name == function_name_only
-                                        or (less_strict and function_name_only in candidate_name)):
-                                    return row_dict, current_function
-                except (FileNotFoundError, PermissionError, OSError) as e:
-                    raise self._convert_csv_file_error(e, function_tree_file, "Function tree file") from e
+                row_dict = function_index.find_related_by_name(
+                    current_function["function_id"], function_name_only, less_strict
+                )
+                if row_dict:
+                    return row_dict, current_function
 
             # Try partial matching if less_strict is False
             if not less_strict:
@@ -179,7 +104,7 @@ class CodeQLDBLookup:
         curr_db: str,
         macro_name: str,
         less_strict: bool = False
-    ) -> Union[str, Dict[str, str]]:
+    ) -> Union[str, Mapping[str, str]]:
         """
         Return macro info from Macros.csv for the given macro_name.
         If not found, tries partial match if less_strict is True.
@@ -190,26 +115,19 @@ class CodeQLDBLookup:
             less_strict (bool, optional): If True, use partial matching.
 
         Returns:
-            Union[str, Dict[str, str]]:
+            Union[str, Mapping[str, str]]:
                 - A dict with 'macro_name' and 'body' if found,
                 - or an error message string if not found.
         
         Raises:
             CodeQLError: If Macros CSV file cannot be read (not found, permission denied, etc.).
         """
-        macro_file = Path(curr_db) / "Macros.csv"
-        keys = ["macro_name", "body"]
-
-        for macro in self._iter_csv_lines(macro_file, "Macros CSV"):
-            if macro_name in macro:
-                row_dict = parse_csv_row(macro, keys)
-                if not row_dict:
-                    continue
-
-                actual_name = row_dict["macro_name"].replace("\"", "")
-                if (actual_name == macro_name
-                        or (less_strict and macro_name in actual_name)):
-                    return row_dict
+        macro_index = get_name_index(
+            Path(curr_db) / "Macros.csv", MACROS_KEYS, ["macro_name"], "Macros CSV"
+        )
+        row_dict = macro_index.find(macro_name, less_strict)
+        if row_dict:
+            return row_dict
 
         if not less_strict:
             return self.get_macro(curr_db, macro_name, True)
@@ -225,7 +143,7 @@ class CodeQLDBLookup:
         curr_db: str,
         global_var_name: str,
         less_strict: bool = False
-    ) -> Union[str, Dict[str, str]]:
+    ) -> Union[str, Mapping[str, str]]:
         """
         Return a global variable from GlobalVars.csv matching global_var_name.
         If not found, tries partial match if less_strict is True.
@@ -236,27 +154,20 @@ class CodeQLDBLookup:
             less_strict (bool, optional): If True, use partial matching.
 
         Returns:
-            Union[str, Dict[str, str]]:
+            Union[str, Mapping[str, str]]:
                 - A dict with ['global_var_name','file','start_line','end_line'] if found,
                 - or an error message string if not found.
         
         Raises:
             CodeQLError: If GlobalVars CSV file cannot be read (not found, permission denied, etc.).
         """
-        global_var_file = Path(curr_db) / "GlobalVars.csv"
-        keys = ["global_var_name", "file", "start_line", "end_line"]
         var_name_only = global_var_name.split("::")[-1]
-
-        for line in self._iter_csv_lines(global_var_file, "GlobalVars CSV"):
-            if var_name_only in line:
-                data_dict = parse_csv_row(line, keys)
-                if not data_dict:
-                    continue
-
-                actual_name = data_dict["global_var_name"].replace("\"", "")
-                if (actual_name == var_name_only
-                        or (less_strict and var_name_only in actual_name)):
-                    return data_dict
+        global_var_index = get_name_index(
+            Path(curr_db) / "GlobalVars.csv", GLOBAL_VARS_KEYS, ["global_var_name"], "GlobalVars CSV"
+        )
+        data_dict = global_var_index.find(var_name_only, less_strict)
+        if data_dict:
+            return data_dict
 
         if not less_strict:
             return self.get_global_var(curr_db, global_var_name, True)
@@ -272,7 +183,7 @@ class CodeQLDBLookup:
         curr_db: str,
         class_name: str,
         less_strict: bool = False
-    ) -> Union[str, Dict[str, str]]:
+    ) -> Union[str, Mapping[str, str]]:
         """
         Return class info (type, class_name, file, start_line, end_line, simple_name)
         from Classes.csv for class_name. If not found, tries partial match if less_strict is True.
@@ -283,32 +194,20 @@ class CodeQLDBLookup:
             less_strict (bool, optional): If True, use partial matching.
 
         Returns:
-            Union[str, Dict[str, str]]:
+            Union[str, Mapping[str, str]]:
                 - A dict with keys ['type','class_name','file','start_line','end_line','simple_name']
                 - or an error message string if not found.
         
         Raises:
             CodeQLError: If Classes CSV file cannot be read (not found, permission denied, etc.).
         """
-        classes_file = Path(curr_db) / "Classes.csv"
-        keys = ["type", "class_name", "file", "start_line", "end_line", "simple_name"]
         class_name_only = class_name.split("::")[-1]
-
-        for row in self._iter_csv_lines(classes_file, "Classes CSV"):
-            if class_name_only in row:
-                row_dict = parse_csv_row(row, keys)
-                if not row_dict:
-                    continue
-
-                actual_class = row_dict["class_name"].replace("\"", "")
-                simple_class = row_dict["simple_name"].replace("\"", "")
-                if (
-                    actual_class == class_name_only
-                    or simple_class == class_name_only
-                    or (less_strict and class_name_only in actual_class)
-                    or (less_strict and class_name_only in simple_class)
-                ):
-                    return row_dict
+        class_index = get_name_index(
+            Path(curr_db) / "Classes.csv", CLASSES_KEYS, ["class_name", "simple_name"], "Classes CSV"
+        )
+        row_dict = class_index.find(class_name_only, less_strict)
+        if row_dict:
+            return row_dict
 
         if not less_strict:
             return self.get_class(curr_db, class_name, True)
@@ -316,44 +215,127 @@ class CodeQLDBLookup:
             return f"Class '{class_name}' not found. Could it be a Namespace?"
 
 
-    def get_caller_function(
+    def get_callers(
         self,
         function_tree_file: str,
-        current_function: Dict[str, str]
-    ) -> Union[str, Dict[str, str]]:
+        current_function: Mapping[str, str],
+        count: int = 1
+    ) -> List[Tuple[Mapping[str, str], Mapping[str, str]]]:
         """
-        Return the caller function from function_tree_file that calls current_function.
+        Return up to `count` callers of current_function, nearest first.
+
+        Walks the call graph (CallGraph.csv next to function_tree_file)
+        breadth first: direct callers, then their callers, and so on. For
+        databases without a call graph (or functions without call edges),
+        the single caller recorded in FunctionTree.csv is used.
 
         Args:
             function_tree_file (str): Path to FunctionTree.csv.
-            current_function (Dict[str, str]): The function dictionary whose caller we want.
+            current_function (Mapping[str, str]): The function whose callers we want.
+            count (int, optional): Maximum number of callers. Defaults to 1.
 
         Returns:
-            Union[str, Dict[str, str]]:
-                - Dict describing the caller if found
-                - or an error string if the caller wasn't found.
-        
+            List[Tuple[Mapping[str, str], Mapping[str, str]]]: (caller, called function)
+                pairs, where the called function is current_function or one of
+                the callers listed before.
+
         Raises:
-            CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
+            CodeQLError: If function tree or call graph file cannot be read.
         """
-        keys = ["function_name", "file", "start_line", "function_id", "end_line", "caller_id"]
-        caller_id = current_function["caller_id"].replace("\"", "").strip()
+        function_index = get_function_index(function_tree_file)
+        call_graph = get_call_graph_index(Path(function_tree_file).parent / "CallGraph.csv")
+        if call_graph is None or not call_graph.callers(field_value(current_function, "function_id")):
+            caller = self._get_recorded_caller(function_tree_file, current_function)
+            return [(caller, current_function)] if caller else []
+
+        function_id = field_value(current_function, "function_id")
+        rows = {function_id: current_function}
+        callers = []
+        # Edges to functions missing from FunctionTree.csv are skipped, so ask for extra ones
+        for caller_id, callee_id in nearest_callers(call_graph, function_id, count * 2 + 2):
+            caller = function_index.get_by_function_id(caller_id)
+            callee = rows.get(callee_id)
+            if caller is None or callee is None:
+                continue
+            rows[caller_id] = caller
+            callers.append((caller, callee))
+            if len(callers) >= count:
+                break
+        return callers
+
+
+    def get_call_lines(
+        self,
+        function_tree_file: str,
+        caller: Mapping[str, str],
+        callee: Mapping[str, str]
+    ) -> List[int]:
+        """
+        Return the lines on which `caller` calls `callee`, from the call graph
+        (CallGraph.csv next to function_tree_file).
+
+        Args:
+            function_tree_file (str): Path to FunctionTree.csv.
+            caller (Mapping[str, str]): The calling function.
+            callee (Mapping[str, str]): The called function.
 
-        for line in self._iter_csv_lines(function_tree_file, "Function tree file"):
-            if caller_id in line:
-                data_dict = parse_csv_row(line, keys)
-                if not data_dict:
-                    continue
-                if data_dict["function_id"].replace("\"", "").strip() == caller_id:
-                    return data_dict
+        Returns:
+            List[int]: The call lines, or an empty list if the database has no call graph.
+
+        Raises:
+            CodeQLError: If the call graph file cannot be read.
+        """
+        call_graph = get_call_graph_index(Path(function_tree_file).parent / "CallGraph.csv")
+        if call_graph is None:
+            return []
+        return call_graph.call_lines(field_value(caller, "function_id"), field_value(callee, "function_id"))
+
+
+    def _get_recorded_caller(
+        self,
+        function_tree_file: str,
+        current_function: Mapping[str, str]
+    ) -> Optional[Mapping[str, str]]:
+        """
+        Return the caller recorded in the caller_id column of FunctionTree.csv.
+        """
+        caller_id = field_value(current_function, "caller_id")
+
+        data_dict = get_function_index(function_tree_file).get_by_function_id(caller_id)
+        if data_dict:
+            return data_dict
 
         # Fallback if 'caller_id' is in format file:line
         maybe_line = caller_id.split(":")
         if len(maybe_line) == 2:
             file_part, line_part = maybe_line
-            function = self.get_function_by_line(function_tree_file, file_part[1:], int(line_part))
-            if function:
-                return function
+            return self.get_function_by_line(function_tree_file, file_part[1:], int(line_part))
+        return None
+
+
+    def get_caller_function(
+        self,
+        function_tree_file: str,
+        current_function: Mapping[str, str]
+    ) -> Union[str, Mapping[str, str]]:
+        """
+        Return the caller function from function_tree_file that calls current_function.
+
+        Args:
+            function_tree_file (str): Path to FunctionTree.csv.
+            current_function (Mapping[str, str]): The function dictionary whose caller we want.
+
+        Returns:
+            Union[str, Mapping[str, str]]:
+                - Dict describing the caller if found
+                - or an error string if the caller wasn't found.
+        
+        Raises:
+            CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
+        """
+        callers = self.get_callers(function_tree_file, current_function, 1)
+        if callers:
+            return callers[0][0]
 
         return (
             "Caller function was not found. "
@@ -364,29 +346,27 @@ class CodeQLDBLookup:
     def extract_function_lines_from_db(
         self,
         db_path: str,
-        current_function: Dict[str, str],
+        current_function: Mapping[str, str],
     ) -> Tuple[str, int, int, List[str]]:
         """
         Extract function lines from the CodeQL database source archive.
 
         Args:
             db_path (str): Path to the CodeQL database directory.
-            current_function (Dict[str, str]): The function dictionary.
+            current_function (Mapping[str, str]): The function dictionary.
 
         Returns:
             Tuple[str, int, int, List[str]]:
                 - file_path (str): The file path (after .replace and [1:])
                 - start_line (int): Starting line number
                 - end_line (int): Ending line number
-                - all_lines (List[str]): Full file splitlines
+                - all_lines (List[str]): Full file lines (shared with the archive cache; do not modify)
         """
         src_zip = Path(db_path) / "src.zip"
-        file_path = current_function["file"].replace("\"", "")[1:]
-        code_file = read_file_lines_from_zip(str(src_zip), file_path)
-        lines = code_file.split("\n")
+        file_path = field_value(current_function, "file")[1:]
+        lines = get_source_archive(str(src_zip)).read_lines(file_path)
 
-        start_line = int(current_function["start_line"])
-        end_line = int(current_function["end_line"])
+        start_line, end_line = line_range(current_function)
         return file_path, start_line, end_line, lines
 
 
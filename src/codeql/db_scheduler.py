@@ -0,0 +1,190 @@
+"""
+Run one job per CodeQL database, several databases at a time.
+
+A single machine-wide budget of CodeQL threads (and optionally RAM) is
+shared by the databases being processed. Databases are started largest
+first, and each job receives a share of the currently free budget in
+proportion to its size relative to the other databases about to start,
+so a big database gets most of the cores while small ones run alongside
+it instead of queueing behind it.
+
+A failing database (whatever the error) is logged and reported in the
+returned summary; the other databases keep running. Only configuration
+errors, which would fail every database, stop the run.
+"""
+
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src.utils.common_functions import read_yml
+from src.utils.exceptions import CodeQLConfigError, LLMConfigError, VulnhallaError
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class DatabaseJob:
+    """
+    One database to process and the resources it was given.
+    """
+    db_path: str
+    weight: int
+    threads: int = 0
+    ram_mb: Optional[int] = None
+
+
+@dataclass
+class ScheduleResult:
+    """
+    Outcome of run_database_jobs(): succeeded DB paths and failed DB path → error.
+    """
+    succeeded: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+def estimate_db_weight(db_path: str) -> int:
+    """
+    Estimate how expensive a database is to analyze.
+
+    Uses 'baselineLinesOfCode' from codeql-database.yml when present, else
+    the size of the database's source archive and dataset on disk.
+
+    Args:
+        db_path (str): The path to the CodeQL database.
+
+    Returns:
+        int: A positive weight (lines of code or bytes).
+    """
+    db = Path(db_path)
+    try:
+        lines = (read_yml(str(db / "codeql-database.yml")) or {}).get("baselineLinesOfCode")
+        if isinstance(lines, int) and lines > 0:
+            return lines
+    except VulnhallaError:
+        pass
+
+    size = 0
+    try:
+        for path in db.rglob("*"):
+            if path.is_file():
+                size += path.stat().st_size
+    except OSError:
+        pass
+    return max(1, size)
+
+
+def allocate_threads(free_threads: int, weights: List[int]) -> List[int]:
+    """
+    Split `free_threads` between jobs starting together, proportionally to
+    their weights. Every job gets at least one thread; the last job takes
+    whatever the rounding left over.
+
+    Args:
+        free_threads (int): Threads not used by running jobs.
+        weights (List[int]): Weights of the jobs about to start.
+
+    Returns:
+        List[int]: Threads per job, in the same order.
+    """
+    shares = []
+    remaining_threads = free_threads
+    remaining_weight = sum(weights)
+    for i, weight in enumerate(weights):
+        jobs_left = len(weights) - i
+        if jobs_left == 1:
+            share = remaining_threads
+        else:
+            share = math.floor(remaining_threads * weight / remaining_weight)
+            share = min(max(1, share), remaining_threads - (jobs_left - 1))
+        shares.append(max(1, share))
+        remaining_threads -= share
+        remaining_weight -= weight
+    return shares
+
+
+def run_database_jobs(
+    db_paths: List[str],
+    run_job: Callable[[DatabaseJob], None],
+    threads: int,
+    max_parallel: int = 1,
+    ram_mb: Optional[int] = None
+) -> ScheduleResult:
+    """
+    Run `run_job` for every database, up to `max_parallel` at once.
+
+    Args:
+        db_paths (List[str]): Databases to process.
+        run_job (Callable[[DatabaseJob], None]): Processes one database using
+            job.threads and job.ram_mb.
+        threads (int): Total CodeQL threads shared by all running jobs.
+        max_parallel (int, optional): Maximum databases processed at once. Defaults to 1.
+        ram_mb (Optional[int], optional): Total RAM (MB) shared by all running jobs,
+            split like the threads. Defaults to None (CodeQL's own default per job).
+
+    Returns:
+        ScheduleResult: Which databases succeeded and which failed (with the error).
+
+    Raises:
+        CodeQLConfigError: If CodeQL is misconfigured (this would fail every
+            database, so pending jobs are cancelled).
+        LLMConfigError: If the LLM is misconfigured (likewise).
+    """
+    threads = max(1, threads)
+    pending = sorted(
+        (DatabaseJob(db_path, estimate_db_weight(db_path)) for db_path in db_paths),
+        key=lambda job: job.weight,
+        reverse=True
+    )
+    slots = max(1, min(max_parallel, threads, len(pending) or 1))
+    total = len(pending)
+    result = ScheduleResult()
+    running: Dict[Future, DatabaseJob] = {}
+    started_at: Dict[str, float] = {}
+    free_threads = threads
+
+    with ThreadPoolExecutor(max_workers=slots, thread_name_prefix="codeql-db") as executor:
+        while pending or running:
+            starting = pending[:min(slots - len(running), free_threads)]
+            if starting:
+                del pending[:len(starting)]
+                shares = allocate_threads(free_threads, [job.weight for job in starting])
+                for job, share in zip(starting, shares):
+                    job.threads = share
+                    job.ram_mb = max(256, ram_mb * share // threads) if ram_mb else None
+                    free_threads -= share
+                    started_at[job.db_path] = time.monotonic()
+                    logger.info(
+                        "Processing DB: %s (threads=%d%s)", job.db_path, job.threads,
+                        f", ram={job.ram_mb}MB" if job.ram_mb else ""
+                    )
+                    running[executor.submit(run_job, job)] = job
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                free_threads += job.threads
+                elapsed = time.monotonic() - started_at[job.db_path]
+                finished = len(result.succeeded) + len(result.failed) + 1
+                try:
+                    future.result()
+                except (CodeQLConfigError, LLMConfigError):
+                    for other in running:
+                        other.cancel()
+                    raise
+                except Exception as e:
+                    # Any other error only fails this database
+                    result.failed[job.db_path] = str(e) or type(e).__name__
+                    logger.error(
+                        "[%d/%d] DB failed after %.0fs: %s: %s", finished, total, elapsed, job.db_path, e,
+                        exc_info=not isinstance(e, VulnhallaError)
+                    )
+                else:
+                    result.succeeded.append(job.db_path)
+                    logger.info("[%d/%d] DB done in %.0fs: %s", finished, total, elapsed, job.db_path)
+
+    return result
@@ -0,0 +1,503 @@
+"""
+SQLite sidecar for CodeQL tool-query outputs.
+
+The in-memory indexes in db_index.py parse every tool CSV once per process.
+On large databases (millions of FunctionTree rows) that load dominates
+short runs, the UI and each worker process. The sidecar stores the same
+rows once, already split and typed, in <db>/tool_index.sqlite with B-tree
+indexes on the lookup keys. Opening it costs a file open, and each lookup
+touches only the pages it needs (SQLite memory-maps the file). Like the
+in-memory indexes, it stores the precomputed smallest-enclosing-function
+segments of every file (a line lookup is one B-tree probe per matching
+file) and trigram postings of the names (a partial-name lookup verifies
+only the names sharing the query's rarest trigram).
+
+The sidecar indexes expose the same methods as FunctionTreeIndex, NameIndex
+and CallGraphIndex and return the same rows (FunctionRecord objects and dicts of
+raw quoted values), so CodeQLDBLookup cannot tell them apart. A sidecar
+is used only if the CSV it was built from is unchanged (same mtime and
+size), otherwise the CSV is indexed in memory as before.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from src.utils.exceptions import CodeQLError
+from src.utils.records import FunctionRecord
+
+SIDECAR_FILE = "tool_index.sqlite"
+SIDECAR_VERSION = "4"
+
+# SQLite mmap window for reading the sidecar
+_MMAP_BYTES = 1 << 30
+
+_FUNCTION_COLUMNS = "row, function_name, file, start_line, function_id, end_line, caller_id"
+
+_NGRAM = 3
+
+
+def _grams(name: str) -> List[str]:
+    return list({name[i:i + _NGRAM] for i in range(len(name) - _NGRAM + 1)})
+
+
+def _clean(value: str) -> str:
+    return value.replace("\"", "").strip()
+
+
+def _file_version(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SidecarWriter:
+    """
+    Builds a sidecar file from parsed tool-query rows.
+
+    Rows are written to a temporary file that replaces the sidecar on
+    commit(), so readers never see a half-written sidecar.
+    """
+
+    def __init__(self, db_path: Union[str, Path]) -> None:
+        """
+        Args:
+            db_path (Union[str, Path]): The CodeQL database folder.
+
+        Raises:
+            CodeQLError: If the temporary sidecar cannot be created.
+        """
+        self.path = Path(db_path) / SIDECAR_FILE
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.path.parent), prefix=".tool_index.", suffix=".tmp")
+            os.close(fd)
+            self._tmp_path = Path(tmp_name)
+            self._conn = sqlite3.connect(tmp_name)
+        except (OSError, sqlite3.Error) as e:
+            raise CodeQLError(f"Cannot create tool index sidecar in {self.path.parent}") from e
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=OFF;
+            PRAGMA synchronous=OFF;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE sources (
+                file_name TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL, name_fields TEXT NOT NULL);
+            CREATE TABLE files (file_id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+            CREATE TABLE functions (
+                row INTEGER PRIMARY KEY, function_name TEXT, file_id INTEGER, file TEXT,
+                start_line, function_id TEXT, end_line, caller_id TEXT,
+                function_key TEXT, caller_key TEXT);
+            CREATE TABLE segments (
+                file_id INTEGER NOT NULL, start_line INTEGER NOT NULL, row INTEGER NOT NULL,
+                PRIMARY KEY (file_id, start_line)) WITHOUT ROWID;
+            CREATE TABLE name_rows (
+                source TEXT NOT NULL, row INTEGER NOT NULL, fields TEXT NOT NULL,
+                PRIMARY KEY (source, row)) WITHOUT ROWID;
+            CREATE TABLE names (
+                source TEXT NOT NULL, name TEXT NOT NULL, row INTEGER NOT NULL,
+                PRIMARY KEY (source, name)) WITHOUT ROWID;
+            CREATE TABLE name_grams (source TEXT NOT NULL, gram TEXT NOT NULL, name TEXT NOT NULL);
+            CREATE TABLE gram_counts (
+                source TEXT NOT NULL, gram TEXT NOT NULL, count INTEGER NOT NULL,
+                PRIMARY KEY (source, gram)) WITHOUT ROWID;
+            CREATE TABLE calls (
+                row INTEGER PRIMARY KEY, caller_key TEXT NOT NULL, callee_key TEXT NOT NULL,
+                call_line INTEGER NOT NULL);
+            """
+        )
+        self._conn.execute("INSERT INTO meta VALUES ('version', ?)", (SIDECAR_VERSION,))
+
+    def _add_source(self, csv_path: Path, name_fields: Sequence[str]) -> None:
+        mtime_ns, size = _file_version(csv_path)
+        self._conn.execute(
+            "INSERT INTO sources VALUES (?, ?, ?, ?)",
+            (csv_path.name, mtime_ns, size, json.dumps(list(name_fields)))
+        )
+
+    def add_function_tree(
+        self,
+        csv_path: Path,
+        records: Sequence[FunctionRecord],
+        segments: Iterable[Tuple[str, int, int]]
+    ) -> None:
+        """
+        Store the FunctionTree.csv rows (in file order) and the line segments of
+        each file: (file, first line, row of the smallest enclosing function or -1),
+        as computed by FunctionTreeIndex.segments().
+        """
+        file_ids: Dict[str, int] = {}
+
+        def rows():
+            for row_index, record in enumerate(records):
+                file_id = file_ids.setdefault(record.file, len(file_ids))
+                yield (
+                    row_index, record.function_name, file_id, record.file, record.start_line,
+                    record.function_id, record.end_line, record.caller_id,
+                    _clean(record.function_id), _clean(record.caller_id)
+                )
+
+        self._conn.executemany("INSERT INTO functions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows())
+        self._conn.executemany("INSERT INTO files VALUES (?, ?)", ((i, f) for f, i in file_ids.items()))
+        self._conn.executemany(
+            "INSERT INTO segments VALUES (?, ?, ?)",
+            ((file_ids[file], start_line, row) for file, start_line, row in segments)
+        )
+        self._add_source(csv_path, [])
+
+    def add_name_table(
+        self,
+        csv_path: Path,
+        rows: Iterable[Mapping[str, str]],
+        keys: Sequence[str],
+        name_fields: Sequence[str]
+    ) -> None:
+        """
+        Store the rows of a Macros/GlobalVars/Classes CSV and their lookup names.
+        """
+        source = csv_path.name
+        # Distinct name -> earliest row carrying it in any name field
+        first_row: Dict[str, int] = {}
+        stored: List[Tuple[str, int, str]] = []
+        for row_index, row in enumerate(rows):
+            stored.append((source, row_index, json.dumps([row[key] for key in keys])))
+            for field in name_fields:
+                name = _clean(row[field])
+                if name:
+                    first_row.setdefault(name, row_index)
+        gram_counts: Dict[str, int] = {}
+        postings: List[Tuple[str, str, str]] = []
+        for name in first_row:
+            for gram in _grams(name):
+                gram_counts[gram] = gram_counts.get(gram, 0) + 1
+                postings.append((source, gram, name))
+        self._conn.executemany("INSERT INTO name_rows VALUES (?, ?, ?)", stored)
+        self._conn.executemany("INSERT INTO names VALUES (?, ?, ?)", ((source, n, r) for n, r in first_row.items()))
+        self._conn.executemany("INSERT INTO name_grams VALUES (?, ?, ?)", postings)
+        self._conn.executemany(
+            "INSERT INTO gram_counts VALUES (?, ?, ?)", ((source, g, c) for g, c in gram_counts.items())
+        )
+        self._add_source(csv_path, name_fields)
+
+    def add_call_graph(self, csv_path: Path, edges: Iterable[Tuple[str, str, int]]) -> None:
+        """
+        Store the (caller_id, callee_id, call_line) edges of CallGraph.csv (in file order).
+        """
+        self._conn.executemany(
+            "INSERT INTO calls VALUES (?, ?, ?, ?)",
+            ((row_index, *edge) for row_index, edge in enumerate(edges))
+        )
+        self._add_source(csv_path, [])
+
+    def commit(self) -> Path:
+        """
+        Create the lookup indexes and atomically install the sidecar.
+
+        Returns:
+            Path: The sidecar path.
+
+        Raises:
+            CodeQLError: If the sidecar cannot be written.
+        """
+        try:
+            self._conn.executescript(
+                """
+                CREATE INDEX functions_by_file ON functions (file_id, start_line);
+                CREATE INDEX functions_by_id ON functions (function_key, row);
+                CREATE INDEX functions_by_caller ON functions (caller_key, row);
+                CREATE INDEX name_grams_by_gram ON name_grams (source, gram);
+                CREATE INDEX calls_by_callee ON calls (callee_key, row);
+                CREATE INDEX calls_by_caller ON calls (caller_key, row);
+                """
+            )
+            self._conn.commit()
+            self._conn.close()
+            os.replace(self._tmp_path, self.path)
+        except (OSError, sqlite3.Error) as e:
+            self.abort()
+            raise CodeQLError(f"Cannot write tool index sidecar: {self.path}") from e
+        return self.path
+
+    def abort(self) -> None:
+        """
+        Discard the temporary sidecar.
+        """
+        try:
+            self._conn.close()
+        except sqlite3.Error:
+            pass
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class _SidecarConnection:
+    """
+    A read-only, thread-safe connection to a sidecar file.
+
+    A closed connection (its sidecar was replaced) reopens the current file
+    on next use, so indexes still holding it keep working.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size={_MMAP_BYTES}")
+            self._conn = conn
+        return self._conn
+
+    def all(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def one(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchone()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SidecarFunctionIndex:
+    """
+    FunctionTreeIndex interface answered from the sidecar's functions table.
+    """
+
+    def __init__(self, conn: _SidecarConnection) -> None:
+        self._conn = conn
+        self._files: Optional[List[Tuple[int, str]]] = None
+        self._file_matches: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _record(row: tuple) -> FunctionRecord:
+        return FunctionRecord(*row[1:])
+
+    def _matching_files(self, file_path: str) -> List[int]:
+        matches = self._file_matches.get(file_path)
+        if matches is None:
+            with self._lock:
+                if self._files is None:
+                    self._files = self._conn.all("SELECT file_id, path FROM files ORDER BY file_id")
+            # Same substring semantics as FunctionTreeIndex (against the quoted column)
+            matches = [file_id for file_id, path in self._files if file_path in f"\"{path}\""]
+            with self._lock:
+                self._file_matches[file_path] = matches
+        return matches
+
+    def find_function_by_line(self, file_path: str, line: int) -> Optional[FunctionRecord]:
+        """
+        Find the most specific (smallest) function containing the given file and line.
+        """
+        best: Optional[tuple] = None
+        for file_id in self._matching_files(file_path):
+            # The segment starting at or before `line` knows its smallest enclosing function
+            row = self._conn.one(
+                f"SELECT {_FUNCTION_COLUMNS}, end_line - start_line AS size FROM functions WHERE row = ("
+                " SELECT row FROM segments WHERE file_id = ? AND start_line <= ?"
+                " ORDER BY start_line DESC LIMIT 1)",
+                (file_id, line)
+            )
+            if row is not None and (best is None or (row[-1], row[0]) < (best[-1], best[0])):
+                best = row
+        return self._record(best[:-1]) if best is not None else None
+
+    def get_by_function_id(self, function_id: str) -> Optional[FunctionRecord]:
+        """
+        Return the first row whose function_id equals `function_id` (quotes ignored).
+        """
+        row = self._conn.one(
+            f"SELECT {_FUNCTION_COLUMNS} FROM functions WHERE function_key = ? ORDER BY row LIMIT 1",
+            (_clean(function_id),)
+        )
+        return self._record(row) if row is not None else None
+
+    def find_related_by_name(
+        self,
+        function_id: str,
+        name: str,
+        less_strict: bool = False
+    ) -> Optional[FunctionRecord]:
+        """
+        Find a function named `name` among the function `function_id` itself and
+        the functions whose recorded caller is `function_id`.
+        """
+        key = _clean(function_id)
+        rows = self._conn.all(
+            f"SELECT {_FUNCTION_COLUMNS} FROM functions WHERE function_key = ?1"
+            " UNION SELECT " + _FUNCTION_COLUMNS + " FROM functions"
+            " WHERE caller_key = ?1 AND caller_key != '' AND function_key != ?1"
+            " ORDER BY row",
+            (key,)
+        )
+        for row in rows:
+            candidate_name = row[1].replace("\"", "")
+            if candidate_name == name or (less_strict and name in candidate_name):
+                return self._record(row)
+        return None
+
+
+class SidecarNameIndex:
+    """
+    NameIndex interface answered from the sidecar's names table.
+    """
+
+    def __init__(self, conn: _SidecarConnection, source: str, keys: Sequence[str]) -> None:
+        self._conn = conn
+        self._source = source
+        self._keys = list(keys)
+
+    def find(self, name: str, less_strict: bool = False) -> Optional[Dict[str, str]]:
+        """
+        Return the earliest row whose name equals `name` (or contains it if less_strict).
+        """
+        if not less_strict:
+            found = self._conn.one(
+                "SELECT row FROM names WHERE source = ? AND name = ?", (self._source, name)
+            )
+        elif len(name) >= _NGRAM:
+            grams = _grams(name)
+            counts = self._conn.all(
+                f"SELECT gram, count FROM gram_counts WHERE source = ? AND gram IN ({', '.join('?' * len(grams))})",
+                (self._source, *grams)
+            )
+            if len(counts) < len(grams):
+                return None  # Some trigram of `name` occurs in no name
+            rarest = min(counts, key=lambda gram_count: gram_count[1])[0]
+            found = self._conn.one(
+                "SELECT MIN(names.row) FROM name_grams JOIN names"
+                " ON names.source = name_grams.source AND names.name = name_grams.name"
+                " WHERE name_grams.source = ? AND name_grams.gram = ? AND instr(name_grams.name, ?) > 0",
+                (self._source, rarest, name)
+            )
+        else:
+            found = self._conn.one(
+                "SELECT MIN(row) FROM names WHERE source = ? AND instr(name, ?) > 0", (self._source, name)
+            )
+        if found is None or found[0] is None:
+            return None
+        fields = self._conn.one(
+            "SELECT fields FROM name_rows WHERE source = ? AND row = ?", (self._source, found[0])
+        )
+        if fields is None:
+            return None
+        return dict(zip(self._keys, json.loads(fields[0])))
+
+
+class SidecarCallGraphIndex:
+    """
+    CallGraphIndex interface answered from the sidecar's calls table.
+    """
+
+    def __init__(self, conn: _SidecarConnection) -> None:
+        self._conn = conn
+
+    def _distinct(self, column: str, where: str, function_id: str) -> List[str]:
+        rows = self._conn.all(
+            f"SELECT {column} FROM calls WHERE {where} = ? GROUP BY {column} ORDER BY MIN(row)",
+            (_clean(function_id),)
+        )
+        return [row[0] for row in rows]
+
+    def callers(self, function_id: str) -> List[str]:
+        """
+        Return the function_ids of the functions calling `function_id` (quotes ignored).
+        """
+        return self._distinct("caller_key", "callee_key", function_id)
+
+    def callees(self, function_id: str) -> List[str]:
+        """
+        Return the function_ids of the functions called by `function_id` (quotes ignored).
+        """
+        return self._distinct("callee_key", "caller_key", function_id)
+
+    def call_lines(self, caller_id: str, callee_id: str) -> List[int]:
+        """
+        Return the lines on which `caller_id` calls `callee_id`, in file order (quotes ignored).
+        """
+        rows = self._conn.all(
+            "SELECT call_line FROM calls WHERE callee_key = ? AND caller_key = ? ORDER BY row",
+            (_clean(callee_id), _clean(caller_id))
+        )
+        return [row[0] for row in rows]
+
+
+_connections: Dict[str, Tuple[Tuple[int, int], _SidecarConnection]] = {}
+_connections_lock = threading.Lock()
+
+
+def _open_fresh(csv_file: Union[str, Path], name_fields: Sequence[str]) -> Optional[_SidecarConnection]:
+    """
+    Return a connection to the sidecar next to `csv_file` if it was built
+    from the current version of that CSV (and with the same name fields).
+    """
+    csv_path = Path(csv_file)
+    sidecar = csv_path.parent / SIDECAR_FILE
+    try:
+        sidecar_version = _file_version(sidecar)
+        csv_version = _file_version(csv_path)
+    except OSError:
+        return None
+
+    key = str(sidecar.resolve())
+    try:
+        with _connections_lock:
+            cached = _connections.get(key)
+            if cached is None or cached[0] != sidecar_version:
+                if cached is not None:
+                    cached[1].close()  # The sidecar was replaced
+                cached = (sidecar_version, _SidecarConnection(sidecar))
+                _connections[key] = cached
+        conn = cached[1]
+        version = conn.one("SELECT value FROM meta WHERE key = 'version'")
+        source = conn.one(
+            "SELECT mtime_ns, size, name_fields FROM sources WHERE file_name = ?", (csv_path.name,)
+        )
+    except sqlite3.Error:
+        return None
+    if (version is None or version[0] != SIDECAR_VERSION or source is None
+            or (source[0], source[1]) != csv_version or json.loads(source[2]) != list(name_fields)):
+        return None
+    return conn
+
+
+def open_function_sidecar(function_tree_file: Union[str, Path]) -> Optional[SidecarFunctionIndex]:
+    """
+    Return a sidecar-backed function index for a FunctionTree.csv, or None if
+    there is no up-to-date sidecar.
+    """
+    conn = _open_fresh(function_tree_file, [])
+    return SidecarFunctionIndex(conn) if conn else None
+
+
+def open_name_sidecar(
+    csv_file: Union[str, Path],
+    keys: Sequence[str],
+    name_fields: Sequence[str]
+) -> Optional[SidecarNameIndex]:
+    """
+    Return a sidecar-backed name index for a Macros/GlobalVars/Classes CSV,
+    or None if there is no up-to-date sidecar.
+    """
+    conn = _open_fresh(csv_file, name_fields)
+    return SidecarNameIndex(conn, Path(csv_file).name, keys) if conn else None
+
+
+def open_call_graph_sidecar(call_graph_file: Union[str, Path]) -> Optional[SidecarCallGraphIndex]:
+    """
+    Return a sidecar-backed call graph index for a CallGraph.csv, or None if
+    there is no up-to-date sidecar.
+    """
+    conn = _open_fresh(call_graph_file, [])
+    return SidecarCallGraphIndex(conn) if conn else None
@@ -11,13 +11,30 @@ Example:
     python src/codeql/run_codeql_queries.py
 """
 
+import os
 import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 
 # Make sure your common_functions module is in your PYTHONPATH or same folder
-from src.utils.common_functions import get_all_dbs
-from src.utils.config import get_codeql_path
+from src.codeql.compile_cache import (
+    QueryCompileCache,
+    get_codeql_version,
+    partition_queries,
+    query_cache_key,
+)
+from src.codeql.db_index import build_tool_sidecar, resolve_tool_output, tool_sidecar_is_fresh
+from src.codeql.db_scheduler import DatabaseJob, run_database_jobs
+from src.utils.common_functions import get_all_dbs, read_yml
+from src.utils.config import (
+    get_codeql_parallel_dbs,
+    get_codeql_path,
+    get_codeql_query_cache_dir,
+    get_codeql_ram_mb,
+    get_codeql_tools_format,
+    get_codeql_tools_sidecar,
+)
 from src.utils.logger import get_logger
 from src.utils.exceptions import CodeQLError, CodeQLConfigError, CodeQLExecutionError
 
@@ -27,99 +44,167 @@ logger = get_logger(__name__)
 # Default locations/values
 DEFAULT_CODEQL = get_codeql_path()
 DEFAULT_LANG = "c"  # Mapped to data/queries/cpp for some tasks
+# RAM (MB) planned for one 'codeql query compile' JVM when sizing the compile pool
+COMPILE_RAM_MB = 2048
 
 
-def pre_compile_ql(file_name: str, threads: int, codeql_bin: str) -> None:
+def _physical_ram_mb() -> Optional[int]:
     """
-    Pre-compile a single .ql file using CodeQL.
+    Return the machine's physical memory in MB, or None if it cannot be read.
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def compile_workers(misses: int, threads: int, ram_mb: Optional[int] = None) -> int:
+    """
+    Return how many query compilations may run at once.
+
+    Each compilation is a JVM, so the pool is sized by memory: COMPILE_RAM_MB
+    per compilation within `ram_mb` (or half the physical memory when no
+    budget is set, one at a time if that is unknown), and never more than
+    `threads` or the number of queries to compile.
+
+    Args:
+        misses (int): Number of queries to compile.
+        threads (int): Thread budget for compilation.
+        ram_mb (Optional[int], optional): RAM budget (MB) for compilation. Defaults to None.
+
+    Returns:
+        int: The number of parallel compilations (at least 1).
+    """
+    if ram_mb is None:
+        physical_mb = _physical_ram_mb()
+        ram_mb = physical_mb // 2 if physical_mb else COMPILE_RAM_MB
+    return max(1, min(misses, threads, ram_mb // COMPILE_RAM_MB))
+
+
+def pre_compile_ql(file_name: str, threads: int, codeql_bin: str, ram_mb: Optional[int] = None) -> None:
+    """
+    Pre-compile a single .ql file using CodeQL, (re)writing the .qlx next to it.
 
     Args:
         file_name (str): The path to the .ql query file.
         threads (int): Number of threads to use during compilation.
         codeql_bin (str): Full path to the 'codeql' executable.
+        ram_mb (Optional[int], optional): Memory budget (MB) for the compiler.
+            Defaults to None (CodeQL's own default).
     
     Raises:
         CodeQLConfigError: If CodeQL executable not found.
         CodeQLExecutionError: If query compilation fails.
     """
-    qlx_path = Path(str(file_name) + "x")
-    if not qlx_path.exists():
-        try:
-            subprocess.run(
-                [
-                    codeql_bin,
-                    "query",
-                    "compile",
-                    file_name,
-                    f'--threads={threads}',
-                    "--precompile"
-                ],
-                check=True,
-                text=True,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.DEVNULL
-            )
-        except FileNotFoundError as e:
-            raise CodeQLConfigError(
-                f"CodeQL executable not found: {codeql_bin}. "
-                "Please check your CODEQL_PATH configuration."
-            ) from e
-        except subprocess.CalledProcessError as e:
-            raise CodeQLExecutionError(
-                f"Failed to compile query {file_name}: CodeQL returned exit code {e.returncode}"
-            ) from e
+    try:
+        subprocess.run(
+            [
+                codeql_bin,
+                "query",
+                "compile",
+                file_name,
+                f'--threads={threads}',
+                *([f'--ram={ram_mb}'] if ram_mb else []),
+                "--precompile"
+            ],
+            check=True,
+            text=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except FileNotFoundError as e:
+        raise CodeQLConfigError(
+            f"CodeQL executable not found: {codeql_bin}. "
+            "Please check your CODEQL_PATH configuration."
+        ) from e
+    except subprocess.CalledProcessError as e:
+        raise CodeQLExecutionError(
+            f"Failed to compile query {file_name}: CodeQL returned exit code {e.returncode}"
+        ) from e
 
 
-def compile_all_queries(queries_folder: str, threads: int, codeql_bin: str) -> None:
+def compile_all_queries(
+    queries_folder: str,
+    threads: int,
+    codeql_bin: str,
+    cache_dir: Optional[str] = None,
+    ram_mb: Optional[int] = None
+) -> None:
     """
     Recursively pre-compile all .ql files in a folder.
 
+    Queries with a cached compilation (same query text, pack libraries and
+    CodeQL version; see src/codeql/compile_cache.py) are restored from the
+    cache. The rest are compiled in parallel, as many at once as the RAM
+    budget allows (see compile_workers()), splitting `threads` and `ram_mb`
+    between the compilations, and added to the cache.
+
     Args:
         queries_folder (str): Directory containing .ql files (and possibly subdirectories).
         threads (int): Number of threads to use during compilation.
         codeql_bin (str): Full path to the 'codeql' executable.
+        cache_dir (Optional[str], optional): Compilation cache directory. Defaults to
+            CODEQL_QUERY_CACHE_DIR; an empty string disables the cache (a .qlx newer
+            than its .ql is then reused).
+        ram_mb (Optional[int], optional): Total RAM (MB) for the compilations running
+            at once. Defaults to None (half the physical memory, CodeQL's default per
+            compilation).
     
     Raises:
         CodeQLConfigError: If CodeQL executable not found.
         CodeQLExecutionError: If query compilation fails.
     """
     queries_folder_path = Path(queries_folder)
-    for file_path in queries_folder_path.rglob("*"):
-        if file_path.is_file() and file_path.suffix.lower() == ".ql":
-            pre_compile_ql(str(file_path), threads, codeql_bin)
+    query_files = sorted(
+        file_path for file_path in queries_folder_path.rglob("*")
+        if file_path.is_file() and file_path.suffix.lower() == ".ql"
+    )
+    if cache_dir is None:
+        cache_dir = get_codeql_query_cache_dir()
+    cache = QueryCompileCache(cache_dir) if cache_dir else None
+
+    misses = partition_queries(query_files, cache, codeql_bin)
+    if len(query_files) > len(misses):
+        logger.debug(
+            "Restored %d cached precompiled queries in %s", len(query_files) - len(misses), queries_folder
+        )
+    if not misses:
+        return
 
+    workers = compile_workers(len(misses), threads, ram_mb)
+    threads_per_compile = max(1, threads // workers)
+    ram_per_compile = ram_mb // workers if ram_mb else None
+    cli_version = get_codeql_version(codeql_bin) if cache else ""
 
-def run_one_query(
-    query_file: str,
-    curr_db: str,
-    output_bqrs: str,
-    output_csv: str,
-    threads: int,
-    codeql_bin: str
-) -> None:
+    def compile_one(query_file: Path) -> None:
+        pre_compile_ql(str(query_file), threads_per_compile, codeql_bin, ram_per_compile)
+        if cache:
+            cache.store(query_cache_key(query_file, cli_version), Path(str(query_file) + "x"))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ql-compile") as executor:
+        # list() re-raises the first compilation error
+        list(executor.map(compile_one, misses))
+
+
+def decode_bqrs(output_bqrs: str, output_csv: str, codeql_bin: str, output_format: str = "csv") -> None:
     """
-    Execute a single CodeQL query on a specific database and export the results.
+    Decode a BQRS result file to CSV (or to JSON, which keeps the column types).
 
     Args:
-        query_file (str): The path to the .ql file to run.
-        curr_db (str): The path to the CodeQL database on which to run queries.
-        output_bqrs (str): Where to write the intermediate BQRS output.
-        output_csv (str): Where to write the CSV representation of the results.
-        threads (int): Number of threads to use during query execution.
+        output_bqrs (str): The BQRS file to decode.
+        output_csv (str): Where to write the decoded results.
         codeql_bin (str): Full path to the 'codeql' executable.
-    
+        output_format (str, optional): "csv" or "json". Defaults to "csv".
+
     Raises:
         CodeQLConfigError: If CodeQL executable not found.
-        CodeQLExecutionError: If query execution or BQRS decoding fails.
+        CodeQLExecutionError: If BQRS decoding fails.
     """
-    # Run the query
     try:
         subprocess.run(
             [
-                codeql_bin, "query", "run", query_file,
-                f'--database={curr_db}',
-                f'--output={output_bqrs}',
-                f'--threads={threads}'
+                codeql_bin, "bqrs", "decode", output_bqrs,
+                f'--format={output_format}', f'--output={output_csv}'
             ],
             check=True,
             text=True,
@@ -133,25 +218,80 @@ def run_one_query(
         ) from e
     except subprocess.CalledProcessError as e:
         raise CodeQLExecutionError(
-            f"Failed to run query {query_file} on database {curr_db}: "
+            f"Failed to decode BQRS file {output_bqrs} to {output_format.upper()}: "
             f"CodeQL returned exit code {e.returncode}"
         ) from e
 
-    # Decode BQRS to CSV
+
+def tool_query_bqrs_path(curr_db: str, query_file: Path) -> Path:
+    """
+    Return where 'database run-queries' stores the results of a query:
+    <db>/results/<qlpack name>/<query path relative to the pack>.bqrs
+
+    Args:
+        curr_db (str): The path to the CodeQL database.
+        query_file (Path): The .ql file (inside a folder with a qlpack.yml).
+
+    Returns:
+        Path: The expected BQRS path.
+    """
+    pack_dir = query_file.parent
+    while not (pack_dir / "qlpack.yml").exists() and pack_dir.parent != pack_dir:
+        pack_dir = pack_dir.parent
+    pack_name = read_yml(str(pack_dir / "qlpack.yml"))["name"]
+    relative = query_file.relative_to(pack_dir).with_suffix(".bqrs")
+    return Path(curr_db) / "results" / pack_name / relative
+
+
+def run_tool_queries(
+    curr_db: str,
+    query_files: List[Path],
+    threads: int,
+    codeql_bin: str,
+    ram_mb: Optional[int] = None
+) -> None:
+    """
+    Evaluate all tool queries on a database in a single 'database run-queries'
+    invocation.
+
+    One evaluator runs the queries in parallel with all `threads` and shares
+    the work on common predicates (functions, files, locations) between them,
+    instead of re-evaluating it in one 'query run' per query.
+
+    Args:
+        curr_db (str): The path to the CodeQL database.
+        query_files (List[Path]): The .ql files to evaluate.
+        threads (int): Number of threads to use during query execution.
+        codeql_bin (str): Full path to the 'codeql' executable.
+        ram_mb (Optional[int], optional): Memory budget (MB) for the evaluator.
+            Defaults to None (CodeQL's own default).
+
+    Raises:
+        CodeQLConfigError: If CodeQL executable not found.
+        CodeQLExecutionError: If query execution fails.
+    """
     try:
         subprocess.run(
             [
-                codeql_bin, "bqrs", "decode", output_bqrs,
-                '--format=csv', f'--output={output_csv}'
+                codeql_bin, "database", "run-queries", curr_db,
+                *[str(query_file) for query_file in query_files],
+                f'--threads={threads}',
+                *([f'--ram={ram_mb}'] if ram_mb else [])
             ],
             check=True,
             text=True,
             stdout=subprocess.DEVNULL,
             stderr=subprocess.DEVNULL
         )
+    except FileNotFoundError as e:
+        raise CodeQLConfigError(
+            f"CodeQL executable not found: {codeql_bin}. "
+            "Please check your CODEQL_PATH configuration."
+        ) from e
     except subprocess.CalledProcessError as e:
+        names = ", ".join(query_file.name for query_file in query_files)
         raise CodeQLExecutionError(
-            f"Failed to decode BQRS file {output_bqrs} to CSV: "
+            f"Failed to run tool queries ({names}) on database {curr_db}: "
             f"CodeQL returned exit code {e.returncode}"
         ) from e
 
@@ -162,11 +302,17 @@ def run_queries_on_db(
     queries_folder: str,
     threads: int,
     codeql_bin: str,
-    timeout: int = 300
+    timeout: int = 300,
+    ram_mb: Optional[int] = None,
+    tools_format: Optional[str] = None
 ) -> None:
     """
-    Execute all tool queries in 'tools_folder' individually on a given database,
-    then run 'database analyze' with all queries in 'queries_folder'.
+    Execute all tool queries in 'tools_folder' on a given database, then run
+    'database analyze' with all queries in 'queries_folder'.
+
+    The tool queries are evaluated together by one 'database run-queries'
+    process. Their BQRS results are then decoded (to <query>.csv, or to
+    <query>.json in JSON mode) on a thread pool while 'database analyze' runs.
 
     Args:
         curr_db (str): The path to the CodeQL database.
@@ -176,29 +322,76 @@ def run_queries_on_db(
         codeql_bin (str): Full path to the 'codeql' executable.
         timeout (int, optional): Timeout in seconds for the 'database analyze' command.
             Defaults to 300.
+        ram_mb (Optional[int], optional): Memory budget (MB) for each CodeQL evaluator.
+            Defaults to None (CodeQL's own default).
+        tools_format (Optional[str], optional): "csv" or "json" for the tool query
+            results. Defaults to CODEQL_TOOLS_FORMAT (see get_codeql_tools_format()).
     
     Raises:
         CodeQLConfigError: If CodeQL executable not found.
         CodeQLExecutionError: If query execution or database analysis fails.
     """
-    # 1) Run each .ql in tools_folder individually
+    # 1) Evaluate all .ql files in tools_folder together
+    decoders: List[Future] = []
+    decode_pool: Optional[ThreadPoolExecutor] = None
+    if tools_format is None:
+        tools_format = get_codeql_tools_format()
     tools_folder_path = Path(tools_folder)
     if tools_folder_path.is_dir():
-        for file_path in tools_folder_path.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() == ".ql":
-                file_stem = file_path.stem
-                run_one_query(
-                    str(file_path),
-                    curr_db,
-                    str(Path(curr_db) / f"{file_stem}.bqrs"),
-                    str(Path(curr_db) / f"{file_stem}.csv"),
-                    threads,
-                    codeql_bin
-                )
+        query_files = sorted(
+            file_path for file_path in tools_folder_path.iterdir()
+            if file_path.is_file() and file_path.suffix.lower() == ".ql"
+        )
+        if query_files:
+            run_tool_queries(curr_db, query_files, threads, codeql_bin, ram_mb)
+            decode_pool = ThreadPoolExecutor(max_workers=len(query_files), thread_name_prefix="bqrs-decode")
+            for file_path in query_files:
+                decoders.append(decode_pool.submit(
+                    decode_bqrs,
+                    str(tool_query_bqrs_path(curr_db, file_path)),
+                    str(Path(curr_db) / f"{file_path.stem}.{tools_format}"),
+                    codeql_bin,
+                    tools_format
+                ))
     else:
         logger.warning("Tools folder '%s' not found. Skipping individual queries.", tools_folder)
 
-    # 2) Run the entire queries folder in one go using database analyze
+    try:
+        run_database_analyze(curr_db, queries_folder, threads, codeql_bin, timeout, ram_mb)
+    finally:
+        if decode_pool is not None:
+            decode_pool.shutdown(wait=True)
+    # Surface the first decoding error, if any
+    for decoder in decoders:
+        decoder.result()
+
+
+def run_database_analyze(
+    curr_db: str,
+    queries_folder: str,
+    threads: int,
+    codeql_bin: str,
+    timeout: int = 300,
+    ram_mb: Optional[int] = None
+) -> None:
+    """
+    Run 'database analyze' with all queries in 'queries_folder' and write
+    the findings to <db>/issues.csv.
+
+    Args:
+        curr_db (str): The path to the CodeQL database.
+        queries_folder (str): Folder containing .ql queries for database analysis.
+        threads (int): Number of threads to use during query execution.
+        codeql_bin (str): Full path to the 'codeql' executable.
+        timeout (int, optional): Timeout in seconds for the 'database analyze' command.
+            Defaults to 300.
+        ram_mb (Optional[int], optional): Memory budget (MB) for the evaluator.
+            Defaults to None (CodeQL's own default).
+
+    Raises:
+        CodeQLConfigError: If CodeQL executable not found.
+        CodeQLExecutionError: If database analysis fails.
+    """
     queries_folder_path = Path(queries_folder)
     if queries_folder_path.is_dir():
         try:
@@ -212,7 +405,8 @@ def run_queries_on_db(
                     f'--timeout={timeout}',
                     '--format=csv',
                     f'--output={str(Path(curr_db) / "issues.csv")}',
-                    f'--threads={threads}'
+                    f'--threads={threads}',
+                    *([f'--ram={ram_mb}'] if ram_mb else [])
                 ],
                 check=True,
                 text=True,
@@ -233,40 +427,74 @@ def run_queries_on_db(
         logger.warning("Queries folder '%s' not found. Skipping database analysis.", queries_folder)
 
 
+def build_tool_sidecars(db_paths: List[str]) -> None:
+    """
+    Build the SQLite sidecar of the tool-query outputs for each database
+    that has a FunctionTree.csv and no up-to-date sidecar yet.
+
+    Lookups fall back to parsing the CSVs, so a failed build is only logged.
+
+    Args:
+        db_paths (List[str]): CodeQL database folders.
+    """
+    for curr_db in db_paths:
+        if not resolve_tool_output(Path(curr_db) / "FunctionTree.csv").exists() or tool_sidecar_is_fresh(curr_db):
+            continue
+        try:
+            sidecar = build_tool_sidecar(curr_db)
+        except CodeQLError as e:
+            logger.warning("Cannot build tool index sidecar for %s: %s", curr_db, e)
+            continue
+        logger.info("Built tool index sidecar %s", sidecar)
+
+
 def compile_and_run_codeql_queries(
     codeql_bin: str = DEFAULT_CODEQL,
     lang: str = DEFAULT_LANG,
     threads: int = 16,
     timeout: int = 300,
     *,
-    dbs_dir: str
+    dbs_dir: str,
+    max_parallel_dbs: Optional[int] = None,
+    ram_mb: Optional[int] = None
 ) -> None:
     """
     Compile and run CodeQL queries on CodeQL databases for a specific language.
 
     1. Pre-compile all .ql files in the tools and queries folders.
     2. Enumerate all CodeQL DBs for the given language.
-    3. Run each DB against both the 'tools' and 'issues' queries folders.
+    3. Run each DB against both the 'tools' and 'issues' queries folders,
+       several DBs at a time (see run_database_jobs()).
+    4. Store the tool outputs of each DB in a SQLite sidecar for fast
+       lookups, unless CODEQL_TOOLS_SIDECAR is off.
 
     Args:
         codeql_bin (str, optional): Full path to the 'codeql' executable. Defaults to DEFAULT_CODEQL.
         lang (str, optional): Language code. Defaults to 'c' (which maps to data/queries/cpp).
-        threads (int, optional): Number of threads for compilation/execution. Defaults to 16.
+        threads (int, optional): Total number of threads for compilation/execution,
+            shared by the databases processed at once. Defaults to 16.
         timeout (int, optional): Timeout in seconds for database analysis. Defaults to 300.
         dbs_dir (str): The path to the CodeQL databases.
+        max_parallel_dbs (Optional[int], optional): Maximum databases processed at once.
+            Defaults to CODEQL_PARALLEL_DBS (see get_codeql_parallel_dbs()).
+        ram_mb (Optional[int], optional): Total RAM (MB) shared by the running evaluators.
+            Defaults to CODEQL_RAM_MB, or CodeQL's own default if unset.
         
     Raises:
         CodeQLConfigError: If CodeQL executable not found (from compilation or query execution).
-        CodeQLExecutionError: If query compilation or execution fails.
+        CodeQLExecutionError: If query compilation fails, or if every database failed.
     """
     # Setup paths
     queries_subfolder = "cpp" if lang == "c" else lang
     queries_folder = str(Path("data/queries") / queries_subfolder / "issues")
     tools_folder = str(Path("data/queries") / queries_subfolder / "tools")
 
+    if ram_mb is None:
+        ram_mb = get_codeql_ram_mb()
+
     # Step 1: Pre-compile all queries
-    compile_all_queries(tools_folder, threads, codeql_bin)
-    compile_all_queries(queries_folder, threads, codeql_bin)
+    compile_all_queries(tools_folder, threads, codeql_bin, ram_mb=ram_mb)
+    compile_all_queries(queries_folder, threads, codeql_bin, ram_mb=ram_mb)
 
     # Step 2: Run queries
     # Validate database directory exists and is accessible
@@ -298,6 +526,7 @@ def compile_and_run_codeql_queries(
         logger.warning("Make sure databases were downloaded and extracted successfully.")
         return
 
+    pending_dbs = []
     for curr_db in actual_dbs:
         # Check if database folder is empty
         curr_db_path = Path(curr_db)
@@ -311,19 +540,41 @@ def compile_and_run_codeql_queries(
                 continue
         
         # If issues.csv was not generated yet, or FunctionTree.csv missing, run
-        if (not (curr_db_path / "FunctionTree.csv").exists() or
+        if (not resolve_tool_output(curr_db_path / "FunctionTree.csv").exists() or
                 not (curr_db_path / "issues.csv").exists()):
-            logger.info("Processing DB: %s", curr_db)
-            run_queries_on_db(
-                curr_db,
-                tools_folder,
-                queries_folder,
-                threads,
-                codeql_bin,
-                timeout
-            )
+            pending_dbs.append(curr_db)
         else:
-            logger.info("Output files already exist for this DB, skipping...")
+            logger.info("Output files already exist for DB %s, skipping...", curr_db)
+
+    if max_parallel_dbs is None:
+        max_parallel_dbs = get_codeql_parallel_dbs()
+
+    def run_job(job: DatabaseJob) -> None:
+        run_queries_on_db(
+            job.db_path,
+            tools_folder,
+            queries_folder,
+            job.threads,
+            codeql_bin,
+            timeout,
+            job.ram_mb
+        )
+
+    result = run_database_jobs(pending_dbs, run_job, threads, max_parallel_dbs, ram_mb)
+    if result.failed:
+        logger.warning(
+            "CodeQL queries failed on %d of %d database(s):", len(result.failed), len(pending_dbs)
+        )
+        for db_path, error in result.failed.items():
+            logger.warning("  %s: %s", db_path, error)
+        if not result.succeeded:
+            raise CodeQLExecutionError(
+                f"CodeQL queries failed on all {len(result.failed)} database(s); "
+                f"first error: {next(iter(result.failed.values()))}"
+            )
+
+    if get_codeql_tools_sidecar():
+        build_tool_sidecars([db for db in actual_dbs if db not in result.failed])
 
     logger.info("[+] done!")
 
@@ -0,0 +1,228 @@
+"""
+Static caller -> callee argument mapping.
+
+When the model fetches a function reached from a known caller, the
+conversation gets a note of which caller expressions are passed to which
+callee parameters. map_call_arguments() derives that note from the code
+itself: it reads the callee's parameter names from its signature, finds
+the calls to the callee in the caller (on the call-graph call lines, when
+known) and pairs the arguments of each call with the parameters. Comments
+and string literals are masked first, so their commas and parentheses do
+not confuse the parse. The note has the same shape as the one produced by
+LLMAnalyzer.map_func_args_by_llm(), which is only needed when the call
+cannot be parsed.
+"""
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+# What may follow a parameter list before the body (C++ qualifiers, trailing return type)
+_QUALIFIERS = re.compile(r"\b(?:const|volatile|noexcept|override|final)\b|->.*", re.DOTALL)
+_COMMENT = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_COMMENT_OR_LITERAL = re.compile(
+    r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'", re.DOTALL
+)
+
+
+def _blank(text: str) -> str:
+    """
+    Replace `text` by spaces, keeping its line breaks (and so every offset).
+    """
+    return re.sub(r"[^\n]", " ", text)
+
+
+def _mask(text: str) -> str:
+    """
+    Blank out comments and the contents of string / character literals, keeping offsets.
+    """
+    def replace(match: "re.Match[str]") -> str:
+        token = match.group(0)
+        if token[0] in "\"'":
+            return token[0] + "_" * (len(token) - 2) + token[-1]
+        return _blank(token)
+
+    return _COMMENT_OR_LITERAL.sub(replace, text)
+
+
+def _strip_snippet(code: str) -> List[Tuple[int, str]]:
+    """
+    Return (line number, text) for each code line of a numbered snippet.
+    """
+    lines = []
+    for index, line in enumerate(code.split("\n")):
+        match = re.match(r"^(\d+): ?(.*)$", line)
+        if match:
+            lines.append((int(match.group(1)), match.group(2)))
+        elif not line.startswith("file: "):
+            lines.append((index + 1, line))
+    return lines
+
+
+def _matching_paren(text: str, open_index: int) -> int:
+    """
+    Return the index of the parenthesis closing the one at `open_index`, or -1.
+    """
+    depth = 0
+    for index in range(open_index, len(text)):
+        char = text[index]
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+
+def split_arguments(text: str, masked: Optional[str] = None) -> List[str]:
+    """
+    Split an argument (or parameter) list on its top-level commas.
+
+    Args:
+        text (str): The list, without its parentheses.
+        masked (Optional[str], optional): `text` with comments and literals masked
+            (see _mask()). Defaults to masking `text`.
+
+    Returns:
+        List[str]: The stripped arguments (an empty list for an empty list).
+    """
+    if masked is None:
+        masked = _mask(text)
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(masked):
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    parts = [" ".join(part.split()) for part in parts]
+    return [] if parts == [""] else parts
+
+
+def _parameter_name(parameter: str) -> Optional[str]:
+    """
+    Return the name declared by a C/C++ parameter ("const char *msg" -> "msg").
+    """
+    parameter = re.sub(r"=.*$", "", parameter).strip()  # C++ default argument
+    if parameter in ("", "void"):
+        return None
+    if parameter == "...":
+        return "..."
+    pointer_name = re.search(r"\(\s*[*&]+\s*([A-Za-z_]\w*)\s*\)", parameter)  # function pointer
+    if pointer_name:
+        return pointer_name.group(1)
+    parameter = re.sub(r"\[[^\]]*\]", "", parameter)
+    names = _IDENTIFIER.findall(parameter)
+    return names[-1] if names else None
+
+
+def parse_signature(code: str) -> Optional[Tuple[str, List[str]]]:
+    """
+    Return (function name, parameter names) from the start of a function's code.
+
+    Args:
+        code (str): The function's code (a numbered snippet or plain source).
+
+    Returns:
+        Optional[Tuple[str, List[str]]]: The name and parameters, or None if
+            no signature is found before the body.
+    """
+    text = _COMMENT.sub(lambda match: _blank(match.group(0)), "\n".join(line for _, line in _strip_snippet(code)))
+    masked = _mask(text)
+    body = masked.find("{")
+    header = masked if body < 0 else masked[:body]
+    for match in re.finditer(r"([A-Za-z_][\w:~]*)\s*\(", header):
+        close = _matching_paren(header, match.end() - 1)
+        if close < 0 or re.search(r"\w", _QUALIFIERS.sub("", header[close + 1:])):
+            continue
+        name = match.group(1).split("::")[-1]
+        params = [
+            _parameter_name(param)
+            for param in split_arguments(text[match.end():close], header[match.end():close])
+        ]
+        return name, [param for param in params if param]
+    return None
+
+
+def find_calls(code: str, callee_name: str) -> List[Tuple[int, List[str]]]:
+    """
+    Return (line number, arguments) for each call to `callee_name` in the body of `code`.
+    """
+    lines = _strip_snippet(code)
+    # Arguments are read without comments, the structure from the masked text
+    text = _COMMENT.sub(lambda match: _blank(match.group(0)), "\n".join(line for _, line in lines))
+    masked = _mask(text)
+    body = max(0, masked.find("{"))
+    starts = []
+    offset = 0
+    for _, line in lines:
+        starts.append(offset)
+        offset += len(line) + 1
+
+    calls = []
+    for match in re.compile(r"(?<![\w.>:])" + re.escape(callee_name) + r"\s*\(").finditer(masked, body):
+        close = _matching_paren(masked, match.end() - 1)
+        if close < 0:
+            continue
+        line_index = max(index for index, start in enumerate(starts) if start <= match.start())
+        calls.append((
+            lines[line_index][0], split_arguments(text[match.end():close], masked[match.end():close])
+        ))
+    return calls
+
+
+def map_call_arguments(
+    caller_code: str,
+    callee_code: str,
+    caller_name: str = "caller",
+    call_lines: Optional[Iterable[int]] = None
+) -> Optional[str]:
+    """
+    Map the arguments of the caller's calls to the callee's parameters.
+
+    Args:
+        caller_code (str): The code of the caller function.
+        callee_code (str): The code of the callee function.
+        caller_name (str, optional): The caller's name, used in the note. Defaults
+            to the name in the caller's signature.
+        call_lines (Optional[Iterable[int]], optional): The lines of the calls, from
+            the call graph. Only calls on these lines are mapped, unless none is found
+            there. Defaults to None (every call to the callee).
+
+    Returns:
+        Optional[str]: Lines "caller_var (caller_name) -> callee_var (callee_name)",
+            one block per call site, or None if the callee's signature or a
+            call to it cannot be parsed.
+    """
+    signature = parse_signature(callee_code)
+    if signature is None:
+        return None
+    callee_name, parameters = signature
+    caller_signature = parse_signature(caller_code)
+    if caller_signature is not None:
+        caller_name = caller_signature[0]
+
+    calls = find_calls(caller_code, callee_name)
+    if call_lines:
+        call_lines = set(call_lines)
+        calls = [call for call in calls if call[0] in call_lines] or calls
+    if not calls:
+        return None
+
+    blocks = []
+    for line_number, arguments in calls:
+        mapped = []
+        for index, argument in enumerate(arguments):
+            if index < len(parameters) and parameters[index] != "...":
+                parameter = parameters[index]
+            elif parameters and parameters[-1] == "...":
+                parameter = f"... (variadic argument {index - len(parameters) + 2})"
+            else:
+                return None  # More arguments than parameters: not this function
+            mapped.append(f"{argument} ({caller_name}) -> {parameter} ({callee_name})")
+        blocks.append(f"Call at line {line_number}:\n" + ("\n".join(mapped) if mapped else "(no arguments)"))
+    return "\n\n".join(blocks)
@@ -0,0 +1,148 @@
+"""
+Compaction of the conversation history resent on every tool round.
+
+run_llm_security_analysis() sends the whole conversation on every round,
+so each tool output is paid for again in every later request. With
+compaction enabled (LLM_COMPACT_AFTER_ROUNDS), the request carries:
+
+- the tool outputs of the last N tool rounds in full, and a one-line
+  summary (what was fetched, how many lines) of older ones that are
+  longer than it, which the model can fetch again if it still needs them;
+- the argument-mapping notes added after the tool outputs of older
+  rounds in full when they are short (the static mapper writes a few
+  "argument -> parameter" lines), and as a one-line summary when they are
+  longer (free-text mappings written by the LLM);
+- every code block only once: a block already shown earlier in the
+  conversation (in the prompt or an earlier tool output) is replaced by a
+  reference to it.
+
+Only the request is compacted: the recorded conversation, saved to the
+results folder, keeps every message in full.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# Code blocks as formatted by CodeQLDBLookup.format_numbered_snippet() and the prompt
+_CODE_BLOCK = re.compile(r"file: (?P<file>[^\n]*)\n(?P<body>(?:\d+: [^\n]*(?:\n|$))+)")
+_LINE_NUMBER = re.compile(r"^(\d+): ", re.MULTILINE)
+
+# Shorter code blocks are not worth a reference
+MIN_DEDUP_LINES = 3
+
+# Argument-mapping notes of stale rounds up to this many lines are kept in full
+MAX_STALE_NOTE_LINES = 6
+
+
+def _normalize(text: str) -> str:
+    return text.replace("\t", "    ").rstrip("\n")
+
+
+class ConversationCompactor:
+    """
+    Builds the compacted request messages of a conversation.
+    """
+
+    def __init__(self, keep_rounds: int = 0) -> None:
+        """
+        Args:
+            keep_rounds (int, optional): Tool rounds whose outputs are sent in full
+                (0 disables compaction). Defaults to 0.
+        """
+        self.keep_rounds = max(0, keep_rounds)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "ConversationCompactor":
+        """
+        Build a compactor from the LLM configuration dictionary (see load_llm_config()).
+        """
+        return cls(int((config or {}).get("compact_after_rounds", 0) or 0))
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_rounds > 0
+
+    @staticmethod
+    def _summarize(message: Dict[str, Any], round_number: int) -> str:
+        content = str(message.get("content") or "")
+        first_line = content.split("\n", 1)[0][:200]
+        return (
+            f"[Output of {message.get('name', 'tool')} from tool round {round_number} omitted "
+            f"({content.count(chr(10)) + 1} lines, began: {first_line!r}). Call the tool again if you need it.]"
+        )
+
+    @staticmethod
+    def _summarize_note(content: str, round_number: int) -> str:
+        first_line = content.split("\n", 1)[0][:200]
+        return (
+            f"[Argument mapping from tool round {round_number} omitted "
+            f"({content.count(chr(10)) + 1} lines, began: {first_line!r}).]"
+        )
+
+    @staticmethod
+    def _deduplicate(content: str, seen: List[str]) -> str:
+        """
+        Replace the code blocks of `content` that already appear in `seen` by a reference.
+        """
+        def replace(match: "re.Match[str]") -> str:
+            body = _normalize(match.group("body"))
+            if body.count("\n") + 1 < MIN_DEDUP_LINES or not any(body in text for text in seen):
+                return match.group(0)
+            numbers = _LINE_NUMBER.findall(body)
+            trailing = "\n" if match.group(0).endswith("\n") else ""
+            return (
+                f"file: {match.group('file')}\n"
+                f"(lines {numbers[0]}-{numbers[-1]} are shown earlier in the conversation)" + trailing
+            )
+
+        return _CODE_BLOCK.sub(replace, content)
+
+    def compact(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the messages to send for the next round.
+
+        Tool rounds are numbered by the assistant messages with tool calls;
+        the tool outputs and argument-mapping notes (assistant messages
+        without tool calls) that follow such a message belong to its round.
+
+        Args:
+            messages (List[Dict[str, Any]]): The full conversation so far (not modified).
+
+        Returns:
+            List[Dict[str, Any]]: The compacted messages (the input list if compaction is disabled).
+        """
+        if not self.enabled:
+            return messages
+
+        total_rounds = sum(
+            1 for message in messages if message.get("role") == "assistant" and message.get("tool_calls")
+        )
+        last_stale_round = total_rounds - self.keep_rounds
+
+        compacted = []
+        seen: List[str] = []
+        round_number = 0
+        for message in messages:
+            role = message.get("role")
+            if role == "assistant" and message.get("tool_calls"):
+                round_number += 1
+            content = message.get("content")
+            if role == "tool" and isinstance(content, str):
+                summary = self._summarize(message, round_number) if round_number <= last_stale_round else ""
+                # A summary longer than the output it replaces saves nothing
+                if summary and len(summary) < len(content):
+                    message = {**message, "content": summary}
+                else:
+                    deduplicated = self._deduplicate(content, seen)
+                    if deduplicated != content:
+                        message = {**message, "content": deduplicated}
+            elif (
+                role == "assistant" and not message.get("tool_calls") and isinstance(content, str)
+                and 0 < round_number <= last_stale_round and content.count("\n") + 1 > MAX_STALE_NOTE_LINES
+            ):
+                message = {**message, "content": self._summarize_note(content, round_number)}
+            # Only what is actually sent can be referred to
+            if role in ("user", "tool") and isinstance(message.get("content"), str):
+                seen.append(_normalize(message["content"]))
+            compacted.append(message)
+        return compacted
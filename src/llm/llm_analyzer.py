@@ -9,17 +9,133 @@ All logic is now wrapped in the `LLMAnalyzer` class for improved organization.
 
 import os
 import json
-from typing import Any, Dict, List, Optional, Tuple, Union
+import re
+import threading
+import time
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 import litellm
 from src.utils.llm_config import load_llm_config, get_model_name
 from src.utils.config_validator import validate_llm_config_dict
 from src.utils.logger import get_logger
 from src.utils.exceptions import LLMApiError, LLMConfigError
+from src.utils.records import field_value
 from src.codeql.db_lookup import CodeQLDBLookup
+from src.llm.arg_mapper import map_call_arguments
+from src.llm.conversation_compactor import ConversationCompactor
+from src.llm.rate_limiter import LLMRateLimiter
+from src.llm.response_cache import LLMResponseCache, make_cache_key
+from src.llm.verdict import VERDICT_INSTRUCTIONS, parse_verdict, verdict_response_format
+
+if TYPE_CHECKING:
+    from litellm.types.llms.openai import ChatCompletionToolParam
 
 logger = get_logger(__name__)
 
+# Upper bound on the callers returned by one get_caller_function call
+MAX_CALLERS_PER_CALL = 5
+
+# Upper bound on the symbols (and lookup threads) of one get_code_batch call
+MAX_BATCH_SYMBOLS = 10
+MAX_BATCH_WORKERS = 8
+
+# Argument mappings computed at once, across all conversations
+MAX_ARG_MAPPING_WORKERS = 8
+
+# Heading that starts the per-issue part of a prompt (see data/templates/*/template.template).
+# The tools, the system messages and the prompt up to it are the same for every issue of a type.
+PROMPT_ISSUE_HEADING = "### Issue Overview"
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Status codes that end the conversation
+STATUS_CODES = ("1337", "1007", "7331", "3713")
+# Final verdicts after which a streamed answer can be cut short (7331 may still get a 3713).
+# Only a code at the start of a line, or in a "status" slot, is taken as the verdict.
+_STATUS_LINE = re.compile(r'^[\s*#>`"-]*(?:status["\s*]*[:=][\s*"`]*)?(1337|1007|7331|3713)\b', re.IGNORECASE)
+# Text that is still reasoning rather than explaining a verdict
+_HEDGED = re.compile(
+    r"\?|\b(?:let me|let's|i need|need to|i'll|i will|i should|not sure|unclear|maybe|perhaps)\b",
+    re.IGNORECASE,
+)
+# Characters of explanation that must follow the status code before the stream is stopped
+MIN_EXPLANATION_CHARS = 20
+
+
+class StreamedAnswer:
+    """
+    Follow a streamed answer line by line to tell when it holds a final status
+    code and a complete line of explanation after it, so the rest can be skipped.
+
+    Only the lines completed by each chunk are examined, so the cost stays
+    linear in the length of the answer.
+    """
+
+    def __init__(self) -> None:
+        self._partial_line = ""
+        self._status: Optional[str] = None
+        self._explanation = 0
+        self._undecided = False
+
+    def feed(self, delta: str) -> bool:
+        """
+        Append a chunk of text and report whether the answer is complete.
+
+        Args:
+            delta (str): The text of the next streamed chunk.
+
+        Returns:
+            bool: True once a final verdict and its explanation have been read.
+        """
+        if "\n" not in delta:
+            self._partial_line += delta
+            return False
+        finished, self._partial_line = (self._partial_line + delta).rsplit("\n", 1)
+        for line in finished.split("\n"):
+            self._read_line(line)
+        return self.complete
+
+    @property
+    def complete(self) -> bool:
+        """True if a final verdict has been followed by enough explanation."""
+        return (
+            not self._undecided
+            and self._status is not None
+            and self._explanation >= MIN_EXPLANATION_CHARS
+        )
+
+    def _read_line(self, line: str) -> None:
+        hedged = bool(_HEDGED.search(line))
+        match = _STATUS_LINE.match(line)
+        if match:
+            # 7331 asks for more context and 3713 can still follow it
+            self._undecided = self._undecided or match.group(1) == "7331"
+            final = match.group(1) in ("1337", "1007")
+            self._status = match.group(1) if final and not hedged else None
+            line = line[match.end():]
+            self._explanation = 0
+        elif hedged:
+            # Reasoning after the code means the verdict is not final yet
+            self._status = None
+        if self._status is not None:
+            self._explanation += len(line.strip(" *:-`\"\t"))
+
+
+def supports_cache_markers(model: Optional[str]) -> bool:
+    """
+    Return True if prompt caching for `model` is requested with cache_control
+    markers (Anthropic, Claude on Bedrock / Vertex AI, Gemini). OpenAI-style
+    providers cache a repeated prefix without them.
+    """
+    model = (model or "").lower()
+    provider = model.split("/", 1)[0] if "/" in model else ""
+    if provider in ("anthropic", "gemini"):
+        return True
+    if provider in ("bedrock", "vertex_ai"):
+        return "claude" in model or "gemini" in model
+    return not provider and model.startswith("claude")
+
 
 class LLMAnalyzer:
     """
@@ -35,9 +151,28 @@ class LLMAnalyzer:
         self.config: Optional[Dict[str, Any]] = None
         self.model: Optional[str] = None
         self.db_lookup = CodeQLDBLookup()
+        self.rate_limiter = LLMRateLimiter()
+        self.response_cache: Optional[LLMResponseCache] = None
+        self.compactor = ConversationCompactor()
+        self.args_model: Optional[str] = None
+        self.args_mapping = "auto"  # See ALLOWED_ARGS_MAPPING_MODES
+        # Argument mappings run here, alongside the other tool lookups of a turn
+        self._arg_mapper = ThreadPoolExecutor(
+            max_workers=MAX_ARG_MAPPING_WORKERS, thread_name_prefix="arg-map"
+        )
+        # Symbol lookups of get_code_batch calls, shared by all conversations
+        self._batch_resolver = ThreadPoolExecutor(
+            max_workers=MAX_BATCH_WORKERS, thread_name_prefix="tool-batch"
+        )
+        self.prompt_cache_markers = False
+        self.stream = False
+        self.structured_output = False
+        self.response_format: Optional[Dict[str, Any]] = None
+        # Per-round stats of the last conversation run on each thread
+        self._round_stats = threading.local()
 
         # Tools configuration: A set of function calls the LLM can invoke
-        self.tools: List[Dict[str, Any]] = [
+        self.tools: List["ChatCompletionToolParam"] = [
             {
                 "type": "function",
                 "function": {
@@ -64,7 +199,8 @@ class LLMAnalyzer:
                     "name": "get_caller_function",
                     "description": (
                         "Retrieves the caller function of the function with the issue. "
-                        "Call it repeatedly to climb further up the call chain."
+                        "Call it repeatedly to climb further up the call chain, or set "
+                        "'count' to get several callers at once."
                     ),
                     "parameters": {
                         "type": "object",
@@ -72,6 +208,13 @@ class LLMAnalyzer:
                             "_": {
                                 "type": "boolean",
                                 "description": "Unused. Ignore."
+                            },
+                            "count": {
+                                "type": "integer",
+                                "description": (
+                                    "How many callers to return, nearest first (direct callers, "
+                                    f"then their callers). Defaults to 1, at most {MAX_CALLERS_PER_CALL}."
+                                )
                             }
                         },
                         "required": []
@@ -137,6 +280,45 @@ class LLMAnalyzer:
                         "required": ["macro_name"]
                     }
                 }
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_code_batch",
+                    "description": (
+                        "Retrieves several symbols in one call: functions, classes / structs / "
+                        "unions, macros and global variables. Prefer it over calling the single "
+                        f"tools one by one. At most {MAX_BATCH_SYMBOLS} names per call."
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "function_names": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": (
+                                    "Functions to retrieve. For class methods, use ClassName::MethodName."
+                                )
+                            },
+                            "class_names": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Classes / structs / unions to retrieve."
+                            },
+                            "macro_names": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Macros to retrieve."
+                            },
+                            "global_var_names": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "description": "Global variables to retrieve."
+                            }
+                        },
+                        "required": []
+                    }
+                }
             }
         ]
 
@@ -181,6 +363,25 @@ class LLMAnalyzer:
             },
         ]
 
+    def close(self) -> None:
+        """
+        Stop the argument-mapping and batch-lookup threads and close the
+        response cache.
+
+        Mappings already running are finished; the analyzer must not be used
+        for new conversations afterwards.
+        """
+        self._batch_resolver.shutdown(wait=True, cancel_futures=True)
+        self._arg_mapper.shutdown(wait=True, cancel_futures=True)
+        if self.response_cache is not None:
+            self.response_cache.close()
+
+    def __enter__(self) -> "LLMAnalyzer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
     def init_llm_client(self, config: Optional[Dict[str, Any]] = None) -> None:
         """
         Initialize the LLM configuration for LiteLLM.
@@ -201,7 +402,7 @@ class LLMAnalyzer:
                 model = config.get("model", "gpt-4o")
                 self.model = get_model_name(provider, model)
                 logger.info("Using model: %s", self.model)
-                self.setup_litellm_env()
+                self._configure_from(config)
                 return
             
             # Load from .env file
@@ -210,7 +411,7 @@ class LLMAnalyzer:
             self.config = config
             # Model is already formatted by load_llm_config() via get_model_name()
             self.model = config.get("model", "gpt-4o")
-            self.setup_litellm_env()
+            self._configure_from(config)
             
         except ValueError as e:
             # Configuration validation errors should be LLMConfigError
@@ -220,6 +421,49 @@ class LLMAnalyzer:
             raise LLMConfigError(f"Failed to initialize LLM client: {e}") from e
 
 
+    def _configure_from(self, config: Dict[str, Any]) -> None:
+        """
+        Set up LiteLLM and the per-analyzer helpers from a validated config,
+        once self.config and self.model are set.
+        """
+        self.setup_litellm_env()
+        self.rate_limiter = LLMRateLimiter.from_config(config)
+        self.response_cache = LLMResponseCache.from_config(config)
+        self.compactor = ConversationCompactor.from_config(config)
+        self._configure_arg_mapping(config)
+        self.prompt_cache_markers = bool(config.get("prompt_cache", True)) and supports_cache_markers(self.model)
+        self.stream = bool(config.get("stream", False))
+        self._configure_structured_output(config)
+
+    def _configure_arg_mapping(self, config: Dict[str, Any]) -> None:
+        """
+        Set the argument-mapping mode and model (LLM_ARGS_MAPPING, LLM_ARGS_MODEL).
+        """
+        self.args_mapping = config.get("args_mapping") or "auto"
+        args_model = config.get("args_model")
+        self.args_model = get_model_name(config.get("provider", "openai"), args_model) if args_model else self.model
+        if self.args_mapping != "static" and self.args_model != self.model:
+            logger.info("Using model for argument mapping: %s", self.args_model)
+
+    def _configure_structured_output(self, config: Dict[str, Any]) -> None:
+        """
+        Enable the JSON verdict (LLM_STRUCTURED_OUTPUT): the answer format is
+        added to the system messages, and requested with response_format when
+        the model supports JSON schemas.
+        """
+        self.structured_output = bool(config.get("structured_output", False))
+        if not self.structured_output:
+            return
+        if not any(message["content"] == VERDICT_INSTRUCTIONS for message in self.MESSAGES):
+            self.MESSAGES = self.MESSAGES + [{"role": "system", "content": VERDICT_INSTRUCTIONS}]
+        try:
+            supports_schema = litellm.supports_response_schema(model=self.model)
+        except Exception:
+            supports_schema = False
+        self.response_format = verdict_response_format() if supports_schema else None
+        if not supports_schema:
+            logger.info("Model %s has no JSON schema support; the verdict format is requested in the prompt", self.model)
+
     def setup_litellm_env(self) -> None:
         """
         Set up environment variables for LiteLLM based on config.
@@ -300,26 +544,142 @@ class LLMAnalyzer:
                 os.environ[env_var_name] = api_key
 
 
+    def _estimate_tokens(
+        self, messages: List[Dict[str, Any]], tools: Optional[List["ChatCompletionToolParam"]] = None
+    ) -> int:
+        """
+        Estimate the prompt size of a request for TPM pacing.
+
+        Uses LiteLLM's tokenizer for the configured model and falls back to
+        a characters / 4 heuristic when the messages can't be tokenized.
+        """
+        try:
+            return litellm.token_counter(model=self.model or "gpt-4o", messages=messages, tools=tools)
+        except Exception:
+            return len(json.dumps(messages, default=str)) // 4
+
+    def _stream_completion(self, completion_kwargs: Dict[str, Any]) -> Any:
+        """
+        Run a streamed litellm.completion and assemble the chunks into a response.
+
+        The time to the first token is recorded for the current round. Once
+        the text holds a final status code and its explanation (and no tool
+        call is being streamed), the stream is closed, so the provider stops
+        generating where it supports cancellation.
+
+        Returns:
+            Any: The LiteLLM response object built from the chunks received.
+        """
+        started = time.monotonic()
+        stream = litellm.completion(**completion_kwargs, stream=True)
+        chunks = []
+        answer = StreamedAnswer()
+        ttft_ms = None
+        calls_tool = False
+        stopped_early = False
+        for chunk in stream:
+            chunks.append(chunk)
+            delta = chunk.choices[0].delta if chunk.choices else None
+            if delta is None:
+                continue
+            if ttft_ms is None and (delta.content or delta.tool_calls):
+                ttft_ms = int((time.monotonic() - started) * 1000)
+            calls_tool = calls_tool or bool(delta.tool_calls)
+            # A JSON verdict is only complete at its closing brace, so it is
+            # always read to the end.
+            complete = answer.feed(delta.content or "")
+            if complete and not calls_tool and not self.structured_output:
+                stopped_early = True
+                break
+
+        if stopped_early:
+            close = getattr(getattr(stream, "completion_stream", None), "close", None)
+            if callable(close):
+                close()
+        if not chunks:
+            raise LLMApiError("LLM API stream ended without any chunk")
+        self._round_stats.stream = {"ttft_ms": ttft_ms or 0, "stopped_early": int(stopped_early)}
+        return litellm.stream_chunk_builder(chunks, messages=completion_kwargs["messages"])
+
+    def _completion(self, stream: bool = False, **completion_kwargs: Any) -> Any:
+        """
+        Call litellm.completion through the response cache and the shared rate limiter.
+
+        If a response cache is configured, an identical earlier request (same
+        model, sampling parameters, tools and messages) is replayed from disk
+        without a network call. Otherwise requests are paced against the RPM/TPM budgets, retried with jittered
+        exponential backoff (honouring Retry-After) on rate limits, timeouts
+        and transient provider errors, and any remaining failure is converted
+        to LLMApiError.
+
+        Args:
+            stream (bool, optional): Stream the completion (see _stream_completion()).
+                Defaults to False.
+            **completion_kwargs: Keyword arguments for litellm.completion.
+
+        Returns:
+            Any: The LiteLLM response object.
+
+        Raises:
+            LLMApiError: If LLM API call fails after retries (rate limits, timeouts, auth failures, etc.).
+        """
+        response_cache = self.response_cache
+        cache_key = None
+        if response_cache is not None:
+            cache_key = make_cache_key(completion_kwargs)
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        estimated_tokens = 0
+        if self.rate_limiter.tokens:
+            estimated_tokens = self._estimate_tokens(
+                completion_kwargs["messages"], completion_kwargs.get("tools")
+            )
+
+        try:
+            response = self.rate_limiter.call(
+                (lambda: self._stream_completion(completion_kwargs)) if stream
+                else (lambda: litellm.completion(**completion_kwargs)),
+                estimated_tokens=estimated_tokens
+            )
+        except litellm.RateLimitError as e:
+            raise LLMApiError(f"Rate limit exceeded for LLM API: {e}") from e
+        except litellm.Timeout as e:
+            raise LLMApiError(f"LLM API request timed out: {e}") from e
+        except litellm.AuthenticationError as e:
+            raise LLMApiError(f"LLM API authentication failed: {e}") from e
+        except litellm.APIError as e:
+            raise LLMApiError(f"LLM API error: {e}") from e
+        except Exception as e:
+            # Catch any other unexpected errors from LiteLLM
+            raise LLMApiError(f"Unexpected error during LLM API call: {e}") from e
+
+        if response_cache is not None and cache_key is not None and response.choices:
+            response_cache.put(cache_key, response)
+        return response
+
+
     def extract_function_from_file(
         self,
         db_path: str,
-        current_function: Union[str, Dict[str, str]]
+        current_function: Union[str, Mapping[str, str]]
     ) -> str:
         """
         Return the snippet of code for the given current_function from the archived src.zip.
 
         Args:
             db_path (str): Path to the CodeQL database directory.
-            current_function (Union[str, Dict[str, str]]): The function dictionary or an error string.
+            current_function (Union[str, Mapping[str, str]]): The function dictionary or an error string.
 
         Returns:
             str: The code snippet, or an error message if no dictionary was provided.
         
         Raises:
             CodeQLError: If ZIP file cannot be read or file not found in archive.
-                This exception is raised by `read_file_lines_from_zip()` and propagated here.
+                This exception is raised by `SourceArchive.read_lines()` and propagated here.
         """
-        if not isinstance(current_function, dict):
+        if not isinstance(current_function, Mapping):
             return str(current_function)
 
         file_path, start_line, end_line, lines = self.db_lookup.extract_function_lines_from_db(
@@ -329,6 +689,144 @@ class LLMAnalyzer:
         return self.db_lookup.format_numbered_snippet(file_path, start_line, snippet_lines)
 
 
+    @staticmethod
+    def _caller_count(tool_args: Dict[str, Any]) -> int:
+        """
+        Return the number of callers requested by a get_caller_function call,
+        clamped to 1..MAX_CALLERS_PER_CALL.
+        """
+        try:
+            count = int(tool_args.get("count", 1))
+        except (TypeError, ValueError):
+            return 1
+        return max(1, min(count, MAX_CALLERS_PER_CALL))
+
+
+    def _resolve_function_code(
+        self,
+        function_tree_file: str,
+        db_path: str,
+        function_name: str,
+        all_functions: List[Mapping[str, str]]
+    ) -> Tuple[str, Optional[Mapping[str, str]], Optional["Future[Dict[str, Any]]"]]:
+        """
+        Resolve one get_function_code request.
+
+        Returns:
+            Tuple[str, Optional[Mapping[str, str]], Optional[Future[Dict[str, Any]]]]:
+                - The code of the function (or an error message),
+                - The function found, if any,
+                - The pending argument-mapping message, if the function was reached from a known caller.
+        """
+        child_function, parent_function = self.db_lookup.get_function_by_name(
+            function_tree_file, function_name, all_functions
+        )
+        child_code = self.extract_function_from_file(db_path, child_function)
+        if not isinstance(child_function, Mapping):
+            return child_code, None, None
+
+        arg_message = None
+        if isinstance(parent_function, Mapping):
+            caller_code = self.extract_function_from_file(db_path, parent_function)
+            arg_message = self.submit_arg_mapping(
+                caller_code, child_code,
+                self.db_lookup.get_call_lines(function_tree_file, parent_function, child_function)
+            )
+        return child_code, child_function, arg_message
+
+
+    def _resolve_macro(self, db_path: str, macro_name: str) -> str:
+        """
+        Resolve one get_macro request to the macro definition or an error message.
+        """
+        macro = self.db_lookup.get_macro(db_path, macro_name)
+        if isinstance(macro, Mapping):
+            return field_value(macro, "body")
+        return macro
+
+
+    def _resolve_global_var(self, db_path: str, global_var_name: str) -> str:
+        """
+        Resolve one get_global_var request to the variable's code or an error message.
+        """
+        global_var = self.db_lookup.get_global_var(db_path, global_var_name)
+        if isinstance(global_var, Mapping):
+            return self.extract_function_from_file(db_path, global_var)
+        return global_var
+
+
+    def _resolve_class(self, db_path: str, object_name: str) -> str:
+        """
+        Resolve one get_class request to the class's code or an error message.
+        """
+        curr_class = self.db_lookup.get_class(db_path, object_name)
+        if isinstance(curr_class, Mapping):
+            return self.extract_function_from_file(db_path, curr_class)
+        return curr_class
+
+
+    def _resolve_batch(
+        self,
+        function_tree_file: str,
+        db_path: str,
+        tool_args: Dict[str, Any],
+        all_functions: List[Mapping[str, str]]
+    ) -> Tuple[str, List[Mapping[str, str]], List["Future[Dict[str, Any]]"]]:
+        """
+        Resolve a get_code_batch request: every requested symbol is looked up
+        in parallel and the results are returned as one tool message.
+
+        Functions are resolved against the functions known before the batch,
+        so symbols in one batch do not depend on each other.
+
+        Returns:
+            Tuple[str, List[Mapping[str, str]], List[Future[Dict[str, Any]]]]:
+                - The combined tool message,
+                - The functions found,
+                - The pending argument-mapping messages for functions reached from a known caller.
+        """
+        known_functions = list(all_functions)
+        resolvers = {
+            "function_names": ("function", lambda name: self._resolve_function_code(
+                function_tree_file, db_path, name, known_functions
+            )),
+            "class_names": ("class", lambda name: (self._resolve_class(db_path, name), None, None)),
+            "macro_names": ("macro", lambda name: (self._resolve_macro(db_path, name), None, None)),
+            "global_var_names": (
+                "global variable", lambda name: (self._resolve_global_var(db_path, name), None, None)
+            ),
+        }
+        requests = []
+        for arg_name, (kind, resolve) in resolvers.items():
+            names = tool_args.get(arg_name) or []
+            if isinstance(names, str):
+                names = [names]
+            for name in dict.fromkeys(str(name) for name in names):
+                requests.append((kind, name, resolve))
+        if not requests:
+            return "No symbols requested. Pass at least one name list.", [], []
+
+        skipped = requests[MAX_BATCH_SYMBOLS:]
+        requests = requests[:MAX_BATCH_SYMBOLS]
+        results = list(self._batch_resolver.map(lambda request: request[2](request[1]), requests))
+
+        sections = []
+        found_functions: List[Mapping[str, str]] = []
+        arg_messages: List["Future[Dict[str, Any]]"] = []
+        for (kind, name, _), (content, function, arg_message) in zip(requests, results):
+            sections.append(f"### {kind} '{name}'\n{content}")
+            if function is not None:
+                found_functions.append(function)
+            if arg_message is not None:
+                arg_messages.append(arg_message)
+        if skipped:
+            sections.append(
+                f"Only the first {MAX_BATCH_SYMBOLS} symbols were resolved; request these again: "
+                + ", ".join(name for _, name, _ in skipped)
+            )
+        return "\n\n".join(sections), found_functions, arg_messages
+
+
     def map_func_args_by_llm(
         self,
         caller: str,
@@ -346,7 +844,7 @@ class LLMAnalyzer:
             Dict[str, Any]: The LLM response object from `self.client`.
         
         Raises:
-            LLMApiError: If LLM API call fails (rate limits, timeouts, auth failures, etc.).
+            LLMApiError: If LLM API call fails after retries (rate limits, timeouts, auth failures, etc.).
         """
         args_prompt = (
             "Given caller function and callee function.\n"
@@ -359,35 +857,158 @@ class LLMAnalyzer:
             f"{callee}"
         )
 
-        # Use the main model from config
-        model_name = self.model if self.model else "gpt-4o"
+        # Use the argument-mapping model (LLM_ARGS_MODEL), the main model by default
+        model_name = self.args_model or self.model or "gpt-4o"
         
-        try:
-            response = litellm.completion(
-                model=model_name,
-                messages=[{"role": "user", "content": args_prompt}],
-                timeout=120  # 2 minute timeout
-            )
-            return response.choices[0].message
-        except litellm.RateLimitError as e:
-            raise LLMApiError(f"Rate limit exceeded for LLM API: {e}") from e
-        except litellm.Timeout as e:
-            raise LLMApiError(f"LLM API request timed out: {e}") from e
-        except litellm.AuthenticationError as e:
-            raise LLMApiError(f"LLM API authentication failed: {e}") from e
-        except litellm.APIError as e:
-            raise LLMApiError(f"LLM API error: {e}") from e
-        except Exception as e:
-            # Catch any other unexpected errors from LiteLLM
-            raise LLMApiError(f"Unexpected error during LLM API call: {e}") from e
+        response = self._completion(
+            model=model_name,
+            messages=[{"role": "user", "content": args_prompt}],
+            timeout=120  # 2 minute timeout
+        )
+        return response.choices[0].message
+
 
+    def map_func_args(
+        self,
+        caller: str,
+        callee: str,
+        call_lines: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Describe how the caller's variables map to the callee's parameters,
+        with the configured argument-mapping mode.
+
+        In "auto" mode (the default) the call is parsed locally (see
+        map_call_arguments()) and the LLM is only asked when that fails;
+        "static" never asks the LLM and "llm" always does.
+
+        Args:
+            caller (str): The code snippet of the caller function.
+            callee (str): The code snippet of the callee function.
+            call_lines (Optional[List[int]], optional): The lines of the calls in the
+                caller, from the call graph. Defaults to None (unknown).
+
+        Returns:
+            Dict[str, Any]: The message to add to the conversation.
+
+        Raises:
+            LLMApiError: If LLM API call fails after retries.
+        """
+        if self.args_mapping != "llm":
+            mapping = map_call_arguments(caller, callee, call_lines=call_lines)
+            if mapping is not None:
+                return {"role": "assistant", "content": mapping}
+            if self.args_mapping == "static":
+                return {
+                    "role": "assistant",
+                    "content": "The arguments passed to the callee could not be mapped from the call site."
+                }
+            logger.debug("Call site could not be parsed, mapping arguments with the LLM")
+        args_content = self.map_func_args_by_llm(caller, callee)
+        return {"role": args_content.role, "content": args_content.content}
+
+    def submit_arg_mapping(
+        self,
+        caller: str,
+        callee: str,
+        call_lines: Optional[List[int]] = None
+    ) -> "Future[Dict[str, Any]]":
+        """
+        Start map_func_args() in the background, so it runs while the other
+        tool calls of the turn are resolved.
+        """
+        return self._arg_mapper.submit(self.map_func_args, caller, callee, call_lines)
+
+
+    def last_round_stats(self) -> List[Dict[str, int]]:
+        """
+        Return the per-round token counts of the last conversation run on the calling thread.
+
+        Returns:
+            List[Dict[str, int]]: One entry per request: prompt_tokens (as reported by
+                the provider, or estimated), cached_tokens (prompt tokens the provider
+                read from its prompt cache), with compaction enabled saved_tokens
+                (estimated tokens the compaction removed from the request) and, with
+                streaming enabled, ttft_ms (time to first token) and stopped_early.
+        """
+        return list(getattr(self._round_stats, "rounds", []))
+
+    @staticmethod
+    def _cached_tokens(usage: Any) -> int:
+        """
+        Return the prompt tokens a response reports as read from the provider's prompt cache.
+        """
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+        if cached is None:
+            cached = getattr(usage, "cache_read_input_tokens", None)
+        return int(cached or 0)
+
+    def _add_cache_markers(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Return the request messages with cache_control markers at the end of
+        the static prefix: after the system messages (which follow the tools)
+        and after the issue-type part of the prompt.
+
+        Args:
+            messages (List[Dict[str, Any]]): The messages to send (not modified).
+
+        Returns:
+            List[Dict[str, Any]]: The marked messages (the input list if markers are disabled).
+        """
+        if not self.prompt_cache_markers or len(messages) <= len(self.MESSAGES):
+            return messages
+
+        marked = list(messages)
+        last_system = len(self.MESSAGES) - 1
+        marked[last_system] = {
+            **messages[last_system],
+            "content": [{"type": "text", "text": messages[last_system]["content"], "cache_control": CACHE_CONTROL}]
+        }
+        prompt = messages[len(self.MESSAGES)]
+        content = prompt.get("content")
+        if not isinstance(content, str):
+            return marked
+        prefix_end = content.find("\n" + PROMPT_ISSUE_HEADING)
+        if prefix_end > 0:
+            marked[len(self.MESSAGES)] = {**prompt, "content": [
+                {"type": "text", "text": content[:prefix_end + 1], "cache_control": CACHE_CONTROL},
+                {"type": "text", "text": content[prefix_end + 1:]},
+            ]}
+        return marked
+
+    def _record_round(
+        self,
+        response: Any,
+        messages: List[Dict[str, Any]],
+        sent_messages: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Record the prompt size (and streaming stats) of one request of the current conversation.
+        """
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) if usage is not None else None
+        sent_tokens = None
+        if not prompt_tokens:
+            sent_tokens = self._estimate_tokens(sent_messages, self.tools)
+            prompt_tokens = sent_tokens
+        round_stats = {"prompt_tokens": int(prompt_tokens), "cached_tokens": self._cached_tokens(usage)}
+        # Time to first token and early stop of a streamed (not replayed) completion
+        round_stats.update(getattr(self._round_stats, "stream", None) or {})
+        self._round_stats.stream = None
+        if sent_messages is not messages:
+            if sent_tokens is None:
+                sent_tokens = self._estimate_tokens(sent_messages, self.tools)
+            round_stats["saved_tokens"] = max(0, self._estimate_tokens(messages, self.tools) - sent_tokens)
+        self._round_stats.rounds.append(round_stats)
+        logger.debug("LLM round %d: %s", len(self._round_stats.rounds), round_stats)
 
     def run_llm_security_analysis(
         self,
         prompt: str,
         function_tree_file: str,
-        current_function: Dict[str, str],
-        functions: List[Dict[str, str]],
+        current_function: Mapping[str, str],
+        functions: List[Mapping[str, str]],
         db_path: str,
         temperature: float = 0.2,
         top_p: float = 0.2
@@ -397,11 +1018,20 @@ class LLMAnalyzer:
         any new system instructions or tool calls, until a final answer with
         a recognized status code is reached or we exhaust a tool-call limit.
 
+        With compaction enabled (see ConversationCompactor), each request
+        carries a compacted copy of the conversation; the returned messages
+        are always complete. For providers that need them, the request also
+        carries prompt-cache markers after the static prefix (tools, system
+        messages and the issue-type part of the prompt).
+        With streaming enabled (LLM_STREAM), completions are consumed as they
+        arrive and stopped once a final status code and its explanation are in. The prompt tokens of every request are available
+        from last_round_stats() afterwards.
+
         Args:
             prompt (str): The user prompt for the LLM to process.
             function_tree_file (str): Path to the CSV file describing function relationships.
-            current_function (Dict[str, str]): The current function dict for context.
-            functions (List[Dict[str, str]]): List of function dictionaries.
+            current_function (Mapping[str, str]): The current function dict for context.
+            functions (List[Mapping[str, str]]): List of function dictionaries.
             db_path (str): Path to the CodeQL DB folder.
             temperature (float, optional): Sampling temperature. Defaults to 0.2.
             top_p (float, optional): Nucleus sampling. Defaults to 0.2.
@@ -428,46 +1058,41 @@ class LLMAnalyzer:
 
         amount_of_tools = 0
         final_content = ""
+        self._round_stats.rounds = []
+        self._round_stats.stream = None
 
         while not got_answer:
+            sent_messages = self.compactor.compact(messages)
+            request_messages = self._add_cache_markers(sent_messages)
             # Send the current messages + tools to the LLM endpoint
-            try:
-                # Build completion kwargs - Bedrock Claude doesn't allow both temperature and top_p
-                completion_kwargs = {
-                    "model": self.model,
-                    "messages": messages,
-                    "tools": self.tools,
-                    "timeout": 120  # 2 minute timeout to prevent hanging
-                }
-                
-                # Check if using Bedrock (model starts with "bedrock/" or contains "arn:aws:bedrock")
-                is_bedrock = (
-                    self.model and 
-                    (self.model.startswith("bedrock/") or "arn:aws:bedrock" in self.model)
-                )
-                
-                if is_bedrock:
-                    # Bedrock Claude only accepts temperature OR top_p, not both
-                    completion_kwargs["temperature"] = temperature
-                else:
-                    completion_kwargs["temperature"] = temperature
-                    completion_kwargs["top_p"] = top_p
-                
-                response = litellm.completion(**completion_kwargs)
-            except litellm.RateLimitError as e:
-                raise LLMApiError(f"Rate limit exceeded for LLM API: {e}") from e
-            except litellm.Timeout as e:
-                raise LLMApiError(f"LLM API request timed out: {e}") from e
-            except litellm.AuthenticationError as e:
-                raise LLMApiError(f"LLM API authentication failed: {e}") from e
-            except litellm.APIError as e:
-                raise LLMApiError(f"LLM API error: {e}") from e
-            except Exception as e:
-                # Catch any other unexpected errors from LiteLLM
-                raise LLMApiError(f"Unexpected error during LLM API call: {e}") from e
+            # Build completion kwargs - Bedrock Claude doesn't allow both temperature and top_p
+            completion_kwargs = {
+                "model": self.model,
+                "messages": request_messages,
+                "tools": self.tools,
+                "timeout": 120  # 2 minute timeout to prevent hanging
+            }
+            if self.response_format is not None:
+                completion_kwargs["response_format"] = self.response_format
+            
+            # Check if using Bedrock (model starts with "bedrock/" or contains "arn:aws:bedrock")
+            is_bedrock = (
+                self.model and 
+                (self.model.startswith("bedrock/") or "arn:aws:bedrock" in self.model)
+            )
+            
+            if is_bedrock:
+                # Bedrock Claude only accepts temperature OR top_p, not both
+                completion_kwargs["temperature"] = temperature
+            else:
+                completion_kwargs["temperature"] = temperature
+                completion_kwargs["top_p"] = top_p
+            
+            response = self._completion(stream=self.stream, **completion_kwargs)
             
             if not response.choices:
                 raise LLMApiError(f"LLM API response is empty: {response}")
+            self._record_round(response, messages, sent_messages)
 
             content_obj = response.choices[0].message
             messages.append({
@@ -480,17 +1105,20 @@ class LLMAnalyzer:
             tool_calls = content_obj.tool_calls
 
             if not tool_calls:
-                # Check if we have a recognized status code
-                if final_content and any(code in final_content for code in ["1337", "1007", "7331", "3713"]):
-                    got_answer = True
+                # Check if we have a recognized status code (a valid verdict in structured mode)
+                if self.structured_output:
+                    got_answer = parse_verdict(final_content) is not None
                 else:
+                    got_answer = bool(final_content) and any(code in final_content for code in STATUS_CODES)
+                if not got_answer:
                     messages.append({
                         "role": "system",
                         "content": "Please follow all the instructions!"
                     })
             else:
                 amount_of_tools += 1
-                arg_messages: List[Dict[str, Any]] = []
+                # Argument mappings run in the background and join the conversation after the tool outputs
+                arg_messages: List["Future[Dict[str, Any]]"] = []
 
                 for tc in tool_calls:
                     tool_call_id = tc.id
@@ -508,65 +1136,74 @@ class LLMAnalyzer:
 
                     # Evaluate which tool to call
                     if tool_function_name == 'get_function_code' and "function_name" in tool_args:
-                        child_function, parent_function = self.db_lookup.get_function_by_name(
-                            function_tree_file, tool_args["function_name"], all_functions
+                        response_msg, child_function, arg_message = self._resolve_function_code(
+                            function_tree_file, db_path_clean, tool_args["function_name"], all_functions
                         )
-                        if isinstance(child_function, dict):
+                        if child_function is not None:
                             all_functions.append(child_function)
-                        child_code = self.extract_function_from_file(db_path_clean, child_function)
-                        response_msg = child_code
+                        if arg_message is not None:
+                            arg_messages.append(arg_message)
+
+                    elif tool_function_name == 'get_code_batch':
+                        response_msg, found_functions, batch_arg_messages = self._resolve_batch(
+                            function_tree_file, db_path_clean, tool_args, all_functions
+                        )
+                        all_functions.extend(found_functions)
+                        arg_messages.extend(batch_arg_messages)
+
+                    elif tool_function_name == 'get_caller_function' and self._caller_count(tool_args) > 1:
+                        callers = self.db_lookup.get_callers(
+                            function_tree_file, current_function, self._caller_count(tool_args)
+                        )
+                        if not callers:
+                            response_msg = str(
+                                self.db_lookup.get_caller_function(function_tree_file, current_function)
+                            )
+                        else:
+                            snippets = []
+                            for caller_function, called_function in callers:
+                                all_functions.append(caller_function)
+                                snippets.append(
+                                    f"Here is a caller of '{called_function['function_name']}':\n"
+                                    + self.extract_function_from_file(db_path_clean, caller_function)
+                                )
+                            response_msg = "\n\n".join(snippets)
 
-                        if isinstance(child_function, dict) and isinstance(parent_function, dict):
-                            caller_code = self.extract_function_from_file(db_path_clean, parent_function)
-                            args_content = self.map_func_args_by_llm(caller_code, child_code)
-                            arg_messages.append({
-                                "role": args_content.role,
-                                "content": args_content.content
-                            })
+                            # Map arguments for the nearest caller only; the chain climbs from it
+                            nearest_caller = callers[0][0]
+                            arg_messages.append(self.submit_arg_mapping(
+                                self.extract_function_from_file(db_path_clean, nearest_caller),
+                                self.extract_function_from_file(db_path_clean, current_function),
+                                self.db_lookup.get_call_lines(function_tree_file, nearest_caller, current_function)
+                            ))
+                            current_function = nearest_caller
 
                     elif tool_function_name == 'get_caller_function':
-                        caller_function = self.db_lookup.get_caller_function(function_tree_file, current_function)
-                        response_msg = str(caller_function)
+                        caller_or_error = self.db_lookup.get_caller_function(function_tree_file, current_function)
+                        response_msg = str(caller_or_error)
 
-                        if isinstance(caller_function, dict):
-                            all_functions.append(caller_function)
-                            caller_code = self.extract_function_from_file(db_path_clean, caller_function)
+                        if isinstance(caller_or_error, Mapping):
+                            all_functions.append(caller_or_error)
+                            caller_code = self.extract_function_from_file(db_path_clean, caller_or_error)
                             response_msg = (
                                 f"Here is the caller function for '{current_function['function_name']}':\n"
                                 + caller_code
                             )
-                            args_content = self.map_func_args_by_llm(
+                            arg_messages.append(self.submit_arg_mapping(
                                 caller_code,
-                                self.extract_function_from_file(db_path_clean, current_function)
-                            )
-                            arg_messages.append({
-                                "role": args_content.role,
-                                "content": args_content.content
-                            })
-                            current_function = caller_function
+                                self.extract_function_from_file(db_path_clean, current_function),
+                                self.db_lookup.get_call_lines(function_tree_file, caller_or_error, current_function)
+                            ))
+                            current_function = caller_or_error
 
                     elif tool_function_name == 'get_macro' and "macro_name" in tool_args:
-                        macro = self.db_lookup.get_macro(db_path_clean, tool_args["macro_name"])
-                        if isinstance(macro, dict):
-                            response_msg = macro["body"]
-                        else:
-                            response_msg = macro
+                        response_msg = self._resolve_macro(db_path_clean, tool_args["macro_name"])
 
                     elif tool_function_name == 'get_global_var' and "global_var_name" in tool_args:
-                        global_var = self.db_lookup.get_global_var(db_path_clean, tool_args["global_var_name"])
-                        if isinstance(global_var, dict):
-                            global_var_code = self.extract_function_from_file(db_path_clean, global_var)
-                            response_msg = global_var_code
-                        else:
-                            response_msg = global_var
+                        response_msg = self._resolve_global_var(db_path_clean, tool_args["global_var_name"])
 
                     elif tool_function_name == 'get_class' and "object_name" in tool_args:
-                        curr_class = self.db_lookup.get_class(db_path_clean, tool_args["object_name"])
-                        if isinstance(curr_class, dict):
-                            class_code = self.extract_function_from_file(db_path_clean, curr_class)
-                            response_msg = class_code
-                        else:
-                            response_msg = curr_class
+                        response_msg = self._resolve_class(db_path_clean, tool_args["object_name"])
 
                     else:
                         response_msg = (
@@ -581,7 +1218,7 @@ class LLMAnalyzer:
                         "content": response_msg
                     })
 
-                messages += arg_messages
+                messages += [arg_message.result() for arg_message in arg_messages]
 
                 if amount_of_tools >= 6:
                     messages.append({
@@ -0,0 +1,232 @@
+"""
+Token-budgeted assembly of the code part of a triage prompt.
+
+The prompt embeds the function with the issue and the functions its
+message references, each in full. A very large function can exceed the
+model's context window, and the request then fails. PromptAssembler
+counts tokens with the configured model's tokenizer and fits these
+sections into a budget. When a function is too long, the lines around the
+line of interest (the sink, or the referenced line) are kept together
+with the first and last lines of the function, and the rest is replaced by
+an "... (N lines omitted) ..." marker.
+
+When everything fits, the assembled code is exactly the unbudgeted code,
+so prompts (and their cache and incremental-run hashes) do not change.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import litellm
+
+from src.utils.common_functions import estimate_tokens
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Share of the budget kept for the referenced functions when the main one is too long
+EXTRA_FUNCTIONS_SHARE = 0.4
+
+# Leading lines (signature) kept in an elided function, besides the first one
+HEAD_LINES = 2
+
+# Share of the model's input window used by the first prompt with an "auto" budget;
+# the rest is left for tool results
+AUTO_BUDGET_SHARE = 0.5
+
+
+def make_token_counter(model: Optional[str]) -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a text with the model's tokenizer.
+
+    Falls back to estimate_tokens() when no model is configured or the
+    text cannot be tokenized.
+
+    Args:
+        model (Optional[str]): The LiteLLM model name.
+
+    Returns:
+        Callable[[str], int]: The token counter.
+    """
+    if not model:
+        return estimate_tokens
+
+    def count_tokens(text: str) -> int:
+        try:
+            return litellm.token_counter(model=model, text=text)
+        except Exception:
+            return estimate_tokens(text)
+
+    return count_tokens
+
+
+def resolve_prompt_budget(configured: Union[int, str, None], model: Optional[str]) -> int:
+    """
+    Return the token budget of the first prompt.
+
+    Trimming is opt-in: without a configured budget prompts are sent in full.
+
+    Args:
+        configured (Union[int, str, None]): prompt_max_tokens from the LLM config.
+            None or 0 means no limit; "auto" derives the budget from the model's
+            input window.
+        model (Optional[str]): The LiteLLM model name.
+
+    Returns:
+        int: The budget in tokens, or 0 for no limit.
+    """
+    if configured != "auto":
+        return max(0, int(configured or 0))
+    if not model:
+        return 0
+    try:
+        max_input = litellm.get_model_info(model).get("max_input_tokens") or 0
+    except Exception:
+        return 0
+    return int(max_input * AUTO_BUDGET_SHARE)
+
+
+@dataclass
+class CodeSection:
+    """
+    One function of the prompt: a "file: ..." header, its numbered lines and
+    the index of the line that must be kept.
+    """
+
+    header: str
+    lines: List[str]
+    focus: int = 0
+
+    def render(self) -> str:
+        return self.header + "\n" + "\n".join(self.lines)
+
+
+class PromptAssembler:
+    """
+    Fits the code sections of a prompt into a token budget.
+    """
+
+    def __init__(self, max_tokens: int, count_tokens: Callable[[str], int] = estimate_tokens) -> None:
+        """
+        Args:
+            max_tokens (int): Budget of the whole prompt in tokens (0 = no limit).
+            count_tokens (Callable[[str], int], optional): Token counter (see make_token_counter()).
+        """
+        self.max_tokens = max(0, max_tokens)
+        self.count_tokens = count_tokens
+
+    def fit_section(self, section: CodeSection, budget: int) -> Tuple[Optional[str], int, int]:
+        """
+        Render a section within `budget` tokens, eliding lines far from its focus line.
+
+        Args:
+            section (CodeSection): The function to render.
+            budget (int): Tokens available.
+
+        Returns:
+            Tuple[Optional[str], int, int]: The text (None if even the header, first,
+                focus and last lines do not fit), its token count and the number of
+                lines omitted.
+        """
+        full = section.render()
+        full_tokens = self.count_tokens(full)
+        if full_tokens <= budget:
+            return full, full_tokens, 0
+
+        lines = section.lines
+        if not lines:
+            return None, 0, 0
+        last = len(lines) - 1
+        focus = min(max(section.focus, 0), last)
+        costs = [self.count_tokens(line) + 1 for line in lines]
+        marker_cost = self.count_tokens(f"    ... ({len(lines)} lines omitted) ...") + 1
+        available = budget - self.count_tokens(section.header) - 2 * marker_cost
+
+        keep = {0, focus, last}
+        used = sum(costs[i] for i in keep)
+        if used > available:
+            return None, 0, 0
+
+        # Signature lines first, then the window around the focus line, growing outwards
+        order = list(range(1, HEAD_LINES + 1))
+        for distance in range(1, len(lines)):
+            order += [focus - distance, focus + distance]
+        for index in order:
+            if index < 0 or index > last or index in keep:
+                continue
+            if used + costs[index] > available:
+                if abs(index - focus) > HEAD_LINES:
+                    break  # Keep the window contiguous
+                continue
+            keep.add(index)
+            used += costs[index]
+
+        rendered = [section.header]
+        previous = -1
+        for index in sorted(keep):
+            if index - previous > 1:
+                rendered.append(f"    ... ({index - previous - 1} lines omitted) ...")
+            rendered.append(lines[index])
+            previous = index
+        text = "\n".join(rendered)
+        return text, self.count_tokens(text), len(lines) - len(keep)
+
+    def assemble(self, sections: List[CodeSection], overhead_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """
+        Join the code sections (the function with the issue first) within the budget.
+
+        Args:
+            sections (List[CodeSection]): The main function, then the referenced functions.
+            overhead_tokens (int): Tokens of the rest of the prompt (template, hints, message).
+
+        Returns:
+            Tuple[str, Dict[str, int]]: The code and its statistics: budget, code_tokens,
+                elided_lines and dropped_functions.
+        """
+        full_code = "\n\n".join(section.render() for section in sections)
+        stats = {"budget": self.max_tokens, "code_tokens": 0, "elided_lines": 0, "dropped_functions": 0}
+        if not self.max_tokens:
+            stats["code_tokens"] = self.count_tokens(full_code)
+            return full_code, stats
+
+        budget = max(0, self.max_tokens - overhead_tokens)
+        main, extras = sections[0], sections[1:]
+        extras_tokens = sum(self.count_tokens(section.render()) for section in extras)
+        reserved = min(extras_tokens, int(budget * EXTRA_FUNCTIONS_SHARE))
+
+        text, tokens, elided = self.fit_section(main, budget - reserved)
+        if text is None:
+            text, tokens, elided = self.fit_section(main, budget)
+        if text is None:
+            # Not even the focus line fits: send it alone rather than nothing
+            text = main.header + "\n" + main.lines[min(main.focus, len(main.lines) - 1)] if main.lines else main.header
+            tokens, elided = self.count_tokens(text), max(0, len(main.lines) - 1)
+        parts = [text]
+        stats["elided_lines"] += elided
+        remaining = budget - tokens
+
+        for section in extras:
+            text, tokens, elided = self.fit_section(section, remaining - 1)
+            if text is None:
+                stats["dropped_functions"] += 1
+                continue
+            parts.append(text)
+            stats["elided_lines"] += elided
+            remaining -= tokens + 1
+
+        code = "\n\n".join(parts)
+        stats["code_tokens"] = self.count_tokens(code)
+        if stats["elided_lines"] or stats["dropped_functions"]:
+            logger.debug(
+                "Prompt code trimmed to %d tokens: %d line(s) elided, %d function(s) dropped",
+                stats["code_tokens"], stats["elided_lines"], stats["dropped_functions"]
+            )
+        return code, stats
+
+    def remaining_tokens(self, code_tokens: int, overhead_tokens: int) -> Optional[int]:
+        """
+        Return the tokens left for further context after the code, or None for no limit.
+        """
+        if not self.max_tokens:
+            return None
+        return max(0, self.max_tokens - overhead_tokens - code_tokens)
@@ -0,0 +1,282 @@
+"""
+Shared rate limiting and retry scheduling for LLM calls.
+
+One LLMRateLimiter is shared by every conversation an LLMAnalyzer runs
+(including the concurrent worker threads). It combines:
+
+- token buckets for requests per minute (LLM_RPM) and tokens per minute
+  (LLM_TPM), so calls are paced before the provider starts returning 429s;
+- an adaptive concurrency gate that halves the number of in-flight calls
+  on every rate-limit error and slowly grows back after successes;
+- retries with jittered exponential backoff that honour Retry-After.
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Any, Callable, Optional, TypeVar
+
+import litellm
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth retrying: the provider is overloaded or the connection dropped
+RETRYABLE_ERRORS = (
+    litellm.RateLimitError,
+    litellm.Timeout,
+    litellm.APIConnectionError,
+    litellm.ServiceUnavailableError,
+    litellm.InternalServerError,
+)
+
+# Grow the concurrency limit back by one after this many successful calls
+_GROWTH_INTERVAL = 20
+
+
+class TokenBucket:
+    """
+    A classic token bucket refilled continuously at `per_minute` units per minute.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        """
+        Args:
+            per_minute (int): Bucket capacity and refill rate per minute.
+        """
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float) -> None:
+        """
+        Block until `amount` units are available, then take them.
+
+        Requests larger than the bucket capacity are clamped to the capacity
+        so they can still proceed once the bucket is full.
+        """
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, delta: float) -> None:
+        """
+        Correct the bucket after the real usage is known (positive delta = refund).
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class AdaptiveConcurrency:
+    """
+    A semaphore whose limit shrinks on rate-limit errors and recovers slowly.
+    """
+
+    def __init__(self, max_limit: int) -> None:
+        """
+        Args:
+            max_limit (int): The configured (and maximum) number of in-flight calls.
+        """
+        self.max_limit = max(1, max_limit)
+        self.limit = self.max_limit
+        self._active = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._active >= self.limit:
+                self._cond.wait()
+            self._active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self.limit < self.max_limit and self._successes >= _GROWTH_INTERVAL:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_rate_limited(self) -> None:
+        with self._cond:
+            new_limit = max(1, self.limit // 2)
+            if new_limit < self.limit:
+                logger.warning("LLM rate limited: reducing concurrency %d → %d", self.limit, new_limit)
+            self.limit = new_limit
+            self._successes = 0
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Extract a Retry-After delay (in seconds) from a LiteLLM/OpenAI exception, if any.
+
+    Args:
+        error (BaseException): The exception raised by litellm.completion.
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the provider did not say.
+    """
+    header_sources = [
+        getattr(error, "headers", None),
+        getattr(error, "litellm_response_headers", None),
+        getattr(getattr(error, "response", None), "headers", None),
+    ]
+    for headers in header_sources:
+        if not headers:
+            continue
+        try:
+            value = headers.get("retry-after-ms")
+            if value is not None:
+                return max(0.0, float(value) / 1000.0)
+            value = headers.get("retry-after") or headers.get("Retry-After")
+        except (AttributeError, TypeError, ValueError):
+            continue
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            # An HTTP date; anything else falls back to the backoff schedule
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            continue
+        if parsed is not None:
+            return max(0.0, parsed.timestamp() - time.time())
+    return None
+
+
+class LLMRateLimiter:
+    """
+    Paces, gates and retries LLM calls for one LLMAnalyzer.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        max_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0
+    ) -> None:
+        """
+        Args:
+            requests_per_minute (int, optional): RPM budget; 0 disables request pacing.
+            tokens_per_minute (int, optional): TPM budget; 0 disables token pacing.
+            max_concurrency (int, optional): Maximum in-flight calls. Defaults to 1.
+            max_retries (int, optional): Retries per call after the first attempt. Defaults to 5.
+            base_delay (float, optional): First backoff delay in seconds. Defaults to 1.0.
+            max_delay (float, optional): Upper bound for one backoff delay. Defaults to 60.0.
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config: Optional[dict]) -> "LLMRateLimiter":
+        """
+        Build a limiter from the LLM configuration dictionary (see load_llm_config()).
+        """
+        config = config or {}
+        return cls(
+            requests_per_minute=int(config.get("rpm", 0) or 0),
+            tokens_per_minute=int(config.get("tpm", 0) or 0),
+            max_concurrency=int(config.get("concurrency", 1) or 1),
+            max_retries=int(config.get("max_retries", 5)),
+        )
+
+    def backoff_delay(self, attempt: int, error: BaseException) -> float:
+        """
+        Delay before retry number `attempt` (0-based): Retry-After if the provider
+        sent one, else full-jitter exponential backoff.
+        """
+        retry_after = get_retry_after(error)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func: Callable[[], T], estimated_tokens: int = 0) -> T:
+        """
+        Run `func` (a single completion request) under the limiter, retrying
+        retryable errors.
+
+        Args:
+            func (Callable[[], T]): Zero-argument callable performing the request.
+            estimated_tokens (int, optional): Expected prompt + completion tokens,
+                debited from the TPM bucket before the call. Defaults to 0.
+
+        Returns:
+            T: The value returned by `func`.
+
+        Raises:
+            Exception: The last error from `func` once retries are exhausted, or
+                any non-retryable error immediately.
+        """
+        attempt = 0
+        while True:
+            if self.requests:
+                self.requests.acquire(1)
+            if self.tokens and estimated_tokens:
+                self.tokens.acquire(estimated_tokens)
+
+            self.concurrency.acquire()
+            try:
+                result = func()
+            except RETRYABLE_ERRORS as e:
+                if isinstance(e, litellm.RateLimitError):
+                    self.concurrency.on_rate_limited()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff_delay(attempt, e)
+                logger.debug(
+                    "LLM call failed (%s), retry %d/%d in %.1fs",
+                    type(e).__name__, attempt + 1, self.max_retries, delay
+                )
+            else:
+                self.concurrency.on_success()
+                self._settle_tokens(result, estimated_tokens)
+                return result
+            finally:
+                self.concurrency.release()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _settle_tokens(self, response: Any, estimated_tokens: int) -> None:
+        """
+        Reconcile the TPM bucket with the usage reported by the provider.
+        """
+        if not self.tokens:
+            return
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None) if usage is not None else None
+        if isinstance(total, int):
+            self.tokens.adjust(estimated_tokens - total)
@@ -0,0 +1,231 @@
+"""
+Content-addressed on-disk cache for LLM completions.
+
+Each completion request is keyed by a SHA-256 of the model, sampling
+parameters, tools schema and the full (normalized) messages list, so a
+re-run on an unchanged database replays every turn of a conversation,
+tool calls included, without touching the network. Entries live in a
+single SQLite file with TTL and total-size eviction.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import litellm
+
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = "output/cache/llm"
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_MB = 1024
+
+# Request fields that change the completion; everything else (timeout, ...) is ignored
+_KEY_FIELDS = ("model", "temperature", "top_p", "tools", "tool_choice", "response_format")
+
+
+def _normalize_tool_call(tool_call: Any) -> Dict[str, Any]:
+    """
+    Reduce a tool call (LiteLLM object or dict) to the fields the model sees.
+    """
+    if hasattr(tool_call, "model_dump"):
+        tool_call = tool_call.model_dump()
+    function = tool_call.get("function") or {}
+    arguments = function.get("arguments")
+    if not isinstance(arguments, str):
+        arguments = json.dumps(arguments, sort_keys=True)
+    return {"id": tool_call.get("id"), "name": function.get("name"), "arguments": arguments}
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Return a JSON-serializable, provider-object-free view of a messages list.
+
+    Live responses and responses replayed from the cache normalize to the
+    same value, so a replayed turn produces the same key for the next turn.
+    """
+    normalized = []
+    for message in messages:
+        entry: Dict[str, Any] = {"role": message.get("role"), "content": message.get("content")}
+        for field in ("name", "tool_call_id"):
+            if message.get(field) is not None:
+                entry[field] = message[field]
+        if message.get("tool_calls"):
+            entry["tool_calls"] = [_normalize_tool_call(tc) for tc in message["tool_calls"]]
+        normalized.append(entry)
+    return normalized
+
+
+def make_cache_key(completion_kwargs: Dict[str, Any]) -> str:
+    """
+    Compute the content address of a completion request.
+
+    Args:
+        completion_kwargs (Dict[str, Any]): Keyword arguments for litellm.completion.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    payload = {field: completion_kwargs.get(field) for field in _KEY_FIELDS}
+    payload["messages"] = normalize_messages(completion_kwargs["messages"])
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed store of LiteLLM responses keyed by make_cache_key().
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        ttl_seconds: float = DEFAULT_TTL_DAYS * 86400,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024
+    ) -> None:
+        """
+        Args:
+            cache_dir (str, optional): Directory holding responses.sqlite.
+            ttl_seconds (float, optional): Entries older than this are ignored and purged.
+            max_bytes (int, optional): Total payload size above which least-recently
+                used entries are evicted.
+        """
+        self.path = Path(cache_dir) / "responses.sqlite"
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["LLMResponseCache"]:
+        """
+        Build a cache from the LLM configuration dictionary, or None if caching is disabled.
+        """
+        config = config or {}
+        if not config.get("cache", True):
+            return None
+        return cls(
+            cache_dir=config.get("cache_dir", DEFAULT_CACHE_DIR),
+            ttl_seconds=float(config.get("cache_ttl_days", DEFAULT_TTL_DAYS)) * 86400,
+            max_bytes=int(config.get("cache_max_mb", DEFAULT_MAX_MB)) * 1024 * 1024,
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " response TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created_at)")
+            # Running total of the payload sizes, kept by triggers so eviction
+            # checks are O(1) and stay right when several processes share the file
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_stats ("
+                " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                " total_size INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_stats (id, total_size)"
+                " SELECT 0, COALESCE(SUM(size), 0) FROM responses"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN"
+                " UPDATE cache_stats SET total_size = total_size + NEW.size WHERE id = 0; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN"
+                " UPDATE cache_stats SET total_size = total_size - OLD.size WHERE id = 0; END"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached response for `key` as a litellm.ModelResponse, or None.
+
+        A cache that cannot be read is treated as a miss.
+        """
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                row = conn.execute(
+                    "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] > self.ttl_seconds:
+                    if row is not None:
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        conn.commit()
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+            return litellm.ModelResponse(**json.loads(row[0]))
+        except (sqlite3.Error, OSError, ValueError, TypeError) as e:
+            logger.warning("LLM response cache read failed, ignoring cache: %s", e)
+            return None
+
+    def put(self, key: str, response: Any) -> None:
+        """
+        Store a LiteLLM response under `key` and evict entries over the size budget.
+
+        Write failures are logged and otherwise ignored.
+        """
+        now = time.time()
+        try:
+            payload = json.dumps(response.model_dump(), default=str)
+            with self._lock:
+                conn = self._connect()
+                # Explicit delete: the implicit one of INSERT OR REPLACE fires no trigger
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.execute(
+                    "INSERT INTO responses (key, response, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now)
+                )
+                conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+                self._evict(conn)
+                conn.commit()
+        except (sqlite3.Error, OSError, TypeError, AttributeError) as e:
+            logger.warning("LLM response cache write failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """
+        Delete least-recently accessed entries until the total size fits max_bytes.
+        """
+        total = conn.execute("SELECT total_size FROM cache_stats WHERE id = 0").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,115 @@
+"""
+Structured triage verdicts.
+
+By default the model answers in free text, and an issue is classified by
+looking for a status code (1337, 1007, 7331, 3713) anywhere in the answer.
+That misfires when the digits appear in code or in the reasoning. With
+structured output enabled (LLM_STRUCTURED_OUTPUT), the final answer is a
+JSON object following VERDICT_SCHEMA, requested with response_format where
+the model supports it, and parse_verdict() reads the status from its
+"status" field.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Status code -> issue status ("true" / "false" / "more")
+STATUS_CLASSES = {"1337": "true", "1007": "false", "7331": "more", "3713": "more"}
+
+VERDICT_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "analysis": {
+            "type": "string",
+            "description": "Brief explanation of the code and the answers to all hint questions.",
+        },
+        "status": {"type": "string", "enum": list(STATUS_CLASSES)},
+        "reason": {
+            "type": "string",
+            "description": "Why this status: what protects the code, or what data is still needed.",
+        },
+        "exploit_parameters": {
+            "type": "string",
+            "description": "For 1337, the parameters that could exploit the issue; otherwise empty.",
+        },
+    },
+    "required": ["analysis", "status", "reason", "exploit_parameters"],
+    "additionalProperties": False,
+}
+
+VERDICT_INSTRUCTIONS = (
+    "### Answer Format\n"
+    "When you give your final answer (not when calling tools), reply with a single JSON object "
+    "and nothing else:\n"
+    '{"analysis": "<steps 1-3 of the answer guidelines>", "status": "<1337|1007|7331|3713>", '
+    '"reason": "<explanation of the status>", "exploit_parameters": "<for 1337, else empty>"}'
+)
+
+_CODE_FENCE = re.compile(r"^```(?:json)?\s*(.*?)\s*```$", re.DOTALL)
+
+
+@dataclass(frozen=True)
+class Verdict:
+    """
+    The final answer of a triage conversation.
+    """
+
+    status: str
+    reason: str
+    exploit_parameters: str = ""
+    analysis: str = ""
+
+    @property
+    def issue_status(self) -> str:
+        """
+        Return "true", "false" or "more" for the status code.
+        """
+        return STATUS_CLASSES[self.status]
+
+
+def verdict_response_format() -> Dict[str, Any]:
+    """
+    Return the response_format requesting a verdict that follows VERDICT_SCHEMA.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "triage_verdict", "schema": VERDICT_SCHEMA, "strict": True},
+    }
+
+
+def parse_verdict(content: Any) -> Optional[Verdict]:
+    """
+    Parse a structured verdict from the content of an assistant message.
+
+    Args:
+        content (Any): The message content.
+
+    Returns:
+        Optional[Verdict]: The verdict, or None if the content is not a JSON
+            object with a valid status code.
+    """
+    if not isinstance(content, str):
+        return None
+    text = content.strip()
+    fenced = _CODE_FENCE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    if not text.startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    status = str(data.get("status", "")).strip().strip("*")
+    if status not in STATUS_CLASSES:
+        return None
+    return Verdict(
+        status=status,
+        reason=str(data.get("reason") or ""),
+        exploit_parameters=str(data.get("exploit_parameters") or ""),
+        analysis=str(data.get("analysis") or ""),
+    )
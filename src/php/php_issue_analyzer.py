@@ -26,7 +26,7 @@ These two extractions are the only modifications to existing Vulnhalla files.
 import json
 import logging
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Mapping, Optional
 
 from src.vulnhalla import IssueAnalyzer
 from src.php.php_db_lookup import PHPDBLookup
@@ -63,11 +63,13 @@ class PHPIssueAnalyzer(IssueAnalyzer):
         # process_issue_type() actually read.
         self.lang = lang
         self.issues = issues
+        self.incremental = True
+        self.stream_issues = False
         self.results_dir = Path("output") / "results" / lang
         self.results_dir.mkdir(parents=True, exist_ok=True)
 
         # Group issues by type upfront (mirrors IssueAnalyzer.collect_issues)
-        self._issues_by_type: dict[str, list[dict]] = {}
+        self._issues_by_type: dict[str, list[Mapping[str, str]]] = {}
         for issue in issues:
             issue_type = issue.get("type", issue.get("name", "unknown"))
             self._issues_by_type.setdefault(issue_type, []).append(issue)
@@ -81,10 +83,10 @@ class PHPIssueAnalyzer(IssueAnalyzer):
     # Override: issue collection
     # =========================================================================
 
-    def collect_issues_from_databases(self) -> dict[str, list[dict]]:
+    def collect_issues_from_databases(self, dbs_dir: Optional[str] = None) -> dict[str, list[Mapping[str, str]]]:
         """
         Override: return the pre-built issue dict (progpilot output) instead
-        of parsing CodeQL issues.csv files.
+        of parsing CodeQL issues.csv files. `dbs_dir` is ignored.
 
         IssueAnalyzer.run() calls this method first. By returning self._issues_by_type
         here, we preserve the run() → process_issue_type() call chain unchanged.
@@ -186,7 +188,7 @@ class PHPIssueAnalyzer(IssueAnalyzer):
 
 
     def _prepare_issue_context(
-        self, issue: dict
+        self, issue: Mapping[str, Any]
     ) -> tuple[list[str], str, str]:
         """
         Override: set db_path and code_path from the issue dict (already
@@ -208,7 +210,7 @@ class PHPIssueAnalyzer(IssueAnalyzer):
         return lines, None, None
 
     def _find_current_function(
-        self, function_tree_file: str, issue: dict
+        self, function_tree_file: str, issue: Mapping[str, Any]
     ) -> dict:
         """
         Override: find enclosing PHP function via PHPDBLookup instead of
@@ -132,13 +132,22 @@ def step2_run_codeql_queries(dbs_dir: str, lang: str, threads: int) -> None:
         sys.exit(1)
     
 
-def step3_classify_results_with_llm(dbs_dir: str, lang: str) -> None:
+def step3_classify_results_with_llm(
+    dbs_dir: str,
+    lang: str,
+    use_cache: bool = True,
+    incremental: bool = True,
+    stream_issues: bool = False
+) -> None:
     """
     Step 3: Classify CodeQL results using LLM analysis.
     
     Args:
         dbs_dir: Path to the directory containing CodeQL databases.
         lang: Programming language code.
+        use_cache: If False, bypass the on-disk LLM response cache.
+        incremental: If False, re-triage issues that already have results.
+        stream_issues: If True, parse and triage one database at a time.
     
     Raises:
         LLMConfigError: If LLM configuration is invalid (e.g., missing API credentials).
@@ -151,7 +160,9 @@ def step3_classify_results_with_llm(dbs_dir: str, lang: str) -> None:
     logger.info("-" * 60)
     
     try:
-        analyzer = IssueAnalyzer(lang=lang)
+        analyzer = IssueAnalyzer(
+            lang=lang, use_cache=use_cache, incremental=incremental, stream_issues=stream_issues
+        )
         analyzer.run(dbs_dir)
     except LLMConfigError as e:
         logger.error("[-] Step 3: LLM configuration error: %s", e)
@@ -203,6 +214,9 @@ def main_analyze() -> None:
     Expected usage: 
         vulnhalla <org/repo> [--force]           # Fetch from GitHub
         vulnhalla --local <path/to/db>           # Use local CodeQL database
+        vulnhalla ... --no-cache                 # Ignore cached LLM responses
+        vulnhalla ... --reanalyze                # Re-triage issues that already have results
+        vulnhalla ... --stream                   # Triage each database as soon as it is parsed
     """
     parser = argparse.ArgumentParser(
         prog="vulnhalla",
@@ -211,6 +225,9 @@ def main_analyze() -> None:
     parser.add_argument("repo", nargs="?", help="GitHub repository in 'org/repo' format")
     parser.add_argument("--force", "-f", action="store_true", help="Re-download even if database exists")
     parser.add_argument("--local", "-l", metavar="PATH", help="Path to local CodeQL database (skips GitHub fetch)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the LLM response cache")
+    parser.add_argument("--reanalyze", action="store_true", help="Re-triage issues that were already triaged with the same prompt")
+    parser.add_argument("--stream", action="store_true", help="Parse and triage one database at a time (bounded memory for many databases)")
     
     args = parser.parse_args()
     
@@ -220,12 +237,14 @@ def main_analyze() -> None:
         local_path = Path(args.local)
         if not local_path.exists():
             parser.error(f"Local database path does not exist: {args.local}")
-        analyze_pipeline(repo=None, local_db_path=str(local_path))
+        analyze_pipeline(repo=None, local_db_path=str(local_path), use_cache=not args.no_cache,
+                         incremental=not args.reanalyze, stream_issues=args.stream)
     elif args.repo:
         # GitHub fetch mode
         if "/" not in args.repo:
             parser.error("Repository must be in format 'org/repo'")
-        analyze_pipeline(repo=args.repo, force=args.force)
+        analyze_pipeline(repo=args.repo, force=args.force, use_cache=not args.no_cache,
+                         incremental=not args.reanalyze, stream_issues=args.stream)
     else:
         parser.error("Either provide a repository (org/repo) or use --local <path>")
 
@@ -284,7 +303,10 @@ def analyze_pipeline(
     threads: int = 16,
     open_ui: bool = True,
     force: bool = False,
-    local_db_path: Optional[str] = None
+    local_db_path: Optional[str] = None,
+    use_cache: bool = True,
+    incremental: bool = True,
+    stream_issues: bool = False
 ) -> None:
     """
     Run the complete Vulnhalla pipeline: fetch, analyze, classify, and optionally open UI.
@@ -296,6 +318,9 @@ def analyze_pipeline(
         open_ui: Whether to open the UI after completion. Defaults to True.
         force: If True, re-download even if database exists. Defaults to False.
         local_db_path: Path to local CodeQL database. If provided, skips GitHub fetch.
+        use_cache: If False, bypass the on-disk LLM response cache. Defaults to True.
+        incremental: If False, re-triage issues that already have results. Defaults to True.
+        stream_issues: If True, parse and triage one database at a time. Defaults to False.
     
     Note:
         This function catches and handles all exceptions internally, logging errors
@@ -334,7 +359,7 @@ See README.md for configuration reference.
     step2_run_codeql_queries(dbs_dir, lang, threads)
     
     # Step 3: Classify results with LLM
-    step3_classify_results_with_llm(dbs_dir, lang)
+    step3_classify_results_with_llm(dbs_dir, lang, use_cache, incremental, stream_issues)
     
     # Step 4: Open UI (optional)
     if open_ui:
@@ -501,12 +526,12 @@ def _run_php_pipeline(
     try:
         from src.llm.llm_analyzer import LLMAnalyzer
         analyzer = PHPIssueAnalyzer(issues, lang="php")
-        llm_analyzer = LLMAnalyzer()
-        llm_analyzer.init_llm_client()
+        with LLMAnalyzer() as llm_analyzer:
+            llm_analyzer.init_llm_client()
 
-        issues_by_type = analyzer.collect_issues_from_databases()
-        for issue_type, issues_of_type in issues_by_type.items():
-            analyzer.process_issue_type(issue_type, issues_of_type, llm_analyzer)
+            issues_by_type = analyzer.collect_issues_from_databases()
+            for issue_type, issues_of_type in issues_by_type.items():
+                analyzer.process_issue_type(issue_type, issues_of_type, llm_analyzer)
 
     except LLMConfigError as e:
         logger.error("[-] Step 3: LLM configuration error: %s", e)
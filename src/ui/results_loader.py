@@ -14,6 +14,7 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+from src.llm.verdict import parse_verdict
 from src.ui.models import Issue
 from src.utils.logger import get_logger
 from src.utils.exceptions import VulnhallaError
@@ -90,6 +91,9 @@ class ResultsLoader:
         """
         Extract status code from LLM content.
 
+        A structured verdict (LLM_STRUCTURED_OUTPUT) is classified by its
+        "status" field; free-text content by the codes it contains.
+
         Args:
             content (str): The LLM message content to analyze.
 
@@ -99,6 +103,9 @@ class ResultsLoader:
         """
         if not content:
             return "more"
+        verdict = parse_verdict(content)
+        if verdict is not None:
+            return verdict.issue_status
         content_lower = content.lower()
         if "1337" in content_lower:
             return "true"
@@ -365,8 +372,16 @@ class ResultsLoader:
                 
                 # Extract status from final_data
                 status = "more"
-                # Try to find status in assistant messages
+                # A structured verdict decides on its own (LLM_STRUCTURED_OUTPUT)
+                verdict = None
                 for msg in reversed(final_data):
+                    if isinstance(msg, dict) and msg.get("role", "").lower() == "assistant":
+                        verdict = parse_verdict(msg.get("content"))
+                        if verdict is not None:
+                            status = verdict.issue_status
+                            break
+                # Try to find status in assistant messages
+                for msg in ([] if verdict is not None else reversed(final_data)):
                     if isinstance(msg, dict) and msg.get("role", "").lower() == "assistant":
                         content = msg.get("content", "")
                         if content:
@@ -374,7 +389,7 @@ class ResultsLoader:
                             if status != "more":
                                 break
                 # No status found in assistant messages, check all messages
-                if status == "more":
+                if status == "more" and verdict is None:
                     for msg in reversed(final_data):
                         if isinstance(msg, dict) and "content" in msg:
                             status = self.extract_status(msg.get("content", ""))
@@ -7,11 +7,11 @@ that are shared across multiple parts of the project.
 """
 
 from pathlib import Path
-import zipfile
 import yaml
 from typing import Any, Dict, List 
 
 from src.utils.exceptions import VulnhallaError, CodeQLError
+from src.utils.source_archive import get_source_archive
 
 
 def read_file(file_name: str) -> str:
@@ -116,6 +116,10 @@ def read_file_lines_from_zip(zip_path: str, file_path_in_zip: str) -> str:
     """
     Read text from a single file within a ZIP archive (UTF-8).
 
+    The archive is opened once per process via get_source_archive(); callers
+    that need the file split into lines should use SourceArchive.read_lines()
+    directly to reuse the cached list.
+
     Args:
         zip_path (str): The path to the ZIP file.
         file_path_in_zip (str): The internal path within the ZIP to the file.
@@ -126,18 +130,16 @@ def read_file_lines_from_zip(zip_path: str, file_path_in_zip: str) -> str:
     Raises:
         CodeQLError: If ZIP file cannot be read or file not found in archive.
     """
-    try:
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            with zip_ref.open(file_path_in_zip) as file:
-                return file.read().decode('utf-8')
-    except zipfile.BadZipFile as e:
-        raise CodeQLError(f"Invalid or corrupted ZIP file: {zip_path}") from e
-    except KeyError as e:
-        raise CodeQLError(f"File '{file_path_in_zip}' not found in ZIP archive: {zip_path}") from e
-    except PermissionError as e:
-        raise CodeQLError(f"Permission denied reading ZIP file: {zip_path}") from e
-    except OSError as e:
-        raise CodeQLError(f"OS error while reading ZIP file: {zip_path}") from e
+    return get_source_archive(zip_path).read_text(file_path_in_zip)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of `text` (about four characters per token for code).
+
+    Used where no tokenizer is configured (see src/llm/prompt_budget.py).
+    """
+    return (len(text) + 3) // 4
 
 
 def read_yml(file_path: str) -> Dict[str, Any]:
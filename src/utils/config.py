@@ -74,3 +74,66 @@ def get_github_ssl_verify() -> bool:
     value = os.getenv("GITHUB_SSL_VERIFY", "true").lower()
     return value not in ("false", "0", "no", "off")
 
+
+def get_codeql_parallel_dbs() -> int:
+    """
+    Get the maximum number of CodeQL databases analyzed at once.
+
+    Running several at once multiplies CodeQL's memory use, so it is opt-in;
+    set CODEQL_RAM_MB as well to keep the evaluators within a shared budget.
+
+    Returns:
+        Value of CODEQL_PARALLEL_DBS. Defaults to 1 (also for invalid values).
+    """
+    try:
+        return max(1, int(os.getenv("CODEQL_PARALLEL_DBS", "1")))
+    except ValueError:
+        return 1
+
+
+def get_codeql_ram_mb() -> Optional[int]:
+    """
+    Get the total RAM budget (MB) shared by concurrently running CodeQL evaluators.
+
+    Returns:
+        Value of CODEQL_RAM_MB, or None to let CodeQL pick its own default.
+    """
+    value = os.getenv("CODEQL_RAM_MB", "").strip()
+    try:
+        return int(value) if value and int(value) > 0 else None
+    except ValueError:
+        return None
+
+
+def get_codeql_query_cache_dir() -> str:
+    """
+    Get the directory of the precompiled-query cache.
+
+    Returns:
+        Value of CODEQL_QUERY_CACHE_DIR. Defaults to "output/cache/codeql-queries";
+        an empty value disables the cache.
+    """
+    return os.getenv("CODEQL_QUERY_CACHE_DIR", "output/cache/codeql-queries").strip()
+
+
+def get_codeql_tools_sidecar() -> bool:
+    """
+    Get whether to build the SQLite sidecar of the tool-query outputs
+    (FunctionTree, Macros, GlobalVars, Classes) for each database.
+
+    Returns:
+        True unless CODEQL_TOOLS_SIDECAR is set to false/0/no/off.
+    """
+    return os.getenv("CODEQL_TOOLS_SIDECAR", "true").lower() not in ("false", "0", "no", "off")
+
+
+def get_codeql_tools_format() -> str:
+    """
+    Get the format the tool-query results are decoded to.
+
+    Returns:
+        "json" if CODEQL_TOOLS_FORMAT is json (typed columns, no CSV text),
+        otherwise "csv" (default).
+    """
+    value = os.getenv("CODEQL_TOOLS_FORMAT", "csv").strip().lower()
+    return "json" if value == "json" else "csv"
@@ -10,7 +10,7 @@ from pathlib import Path
 import shutil
 from typing import Any, Dict, List, Optional, Tuple
 from src.utils.config import get_codeql_path
-from src.utils.llm_config import load_llm_config, ALLOWED_LLM_PROVIDERS
+from src.utils.llm_config import load_llm_config, ALLOWED_ARGS_MAPPING_MODES, ALLOWED_LLM_PROVIDERS
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -166,6 +166,35 @@ def validate_llm_config_dict(config: Dict[str, Any]) -> bool:
             f"Allowed providers: {', '.join(sorted(ALLOWED_LLM_PROVIDERS))}"
         )
     
+    # Validate optional concurrency (number of in-flight LLM conversations)
+    if "concurrency" in config:
+        concurrency = config["concurrency"]
+        if not isinstance(concurrency, int) or concurrency < 1:
+            raise ValueError(f"LLM concurrency must be a positive integer, got: {concurrency!r}")
+    
+    # Validate optional rate limits, retry count, prefetch budget and compaction (0 disables a limit)
+    for field in ("rpm", "tpm", "max_retries", "prefetch_tokens", "compact_after_rounds"):
+        if field in config:
+            value = config[field]
+            if not isinstance(value, int) or value < 0:
+                raise ValueError(f"LLM {field} must be a non-negative integer, got: {value!r}")
+    
+    # Validate optional prompt budget (None = no limit, "auto" derives it from the model)
+    prompt_max_tokens = config.get("prompt_max_tokens")
+    if prompt_max_tokens not in (None, "auto") and (
+        not isinstance(prompt_max_tokens, int) or prompt_max_tokens < 0
+    ):
+        raise ValueError(
+            f"LLM prompt_max_tokens must be a non-negative integer or 'auto', got: {prompt_max_tokens!r}"
+        )
+    
+    # Validate optional argument-mapping mode
+    args_mapping = config.get("args_mapping", "auto")
+    if args_mapping not in ALLOWED_ARGS_MAPPING_MODES:
+        raise ValueError(
+            f"LLM args_mapping must be one of {', '.join(ALLOWED_ARGS_MAPPING_MODES)}, got: {args_mapping!r}"
+        )
+    
     # Validate provider specific requirements
     if provider == "azure":
         if "endpoint" not in config:
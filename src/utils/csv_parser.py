@@ -1,36 +1,63 @@
 """
 CSV parsing utilities for handling CodeQL CSV files.
 
-This module provides utilities for parsing CSV rows that may contain commas
-inside quoted fields, which requires regex-based parsing rather than
-simple string splitting.
+CodeQL tool-query CSVs quote string columns, and names and paths may contain
+commas inside the quotes. split_csv_fields() splits such a line on the
+commas outside quotes in a single linear pass, keeping each field's raw
+text (quotes included), which is the format the lookup code expects.
 """
 
-import re
 from typing import Dict, List
 
 
-# Regex pattern for splitting CSV rows while handling commas inside quoted fields
-CSV_SPLIT_PATTERN = re.compile(r',(?=(?:[^"]*"[^"]*")*[^"]*$)')
+def split_csv_fields(row: str) -> List[str]:
+    """
+    Split a CodeQL CSV line on the commas that are outside quoted fields.
+
+    A comma separates two fields when the number of quote characters after
+    it is even. The line is split on every comma with str.split (in C),
+    and pieces are re-joined while the quotes remaining to the end of the
+    line are odd. This is one pass over the line, where the old lookahead
+    regex rescanned the rest of the line at every comma (quadratic in the
+    line length), and the result is the same for any input.
+
+    Args:
+        row (str): The raw CSV line, without the trailing newline.
+
+    Returns:
+        List[str]: The raw field values, quotes preserved.
+    """
+    if "\"" not in row:
+        return row.split(",")
+
+    fields = []
+    pending: List[str] = []
+    remaining_quotes = row.count("\"")
+    for piece in row.split(","):
+        remaining_quotes -= piece.count("\"")
+        if pending or remaining_quotes % 2:
+            pending.append(piece)
+            if remaining_quotes % 2 == 0:
+                fields.append(",".join(pending))
+                pending = []
+        else:
+            fields.append(piece)
+    return fields
 
 
 def parse_csv_row(row: str, keys: List[str]) -> Dict[str, str]:
     """
-    Parse a CSV row into a dictionary using regex to handle commas inside quotes.
+    Parse a CSV row into a dictionary, keeping commas inside quoted fields.
 
     This function is designed for line-by-line CSV parsing where rows may contain
-    commas within quoted fields. It uses a regex pattern to split on commas that
-    are not inside quotes.
+    commas within quoted fields (see split_csv_fields()).
 
     Args:
-        row (str): The raw CSV row string (may include newline).
+        row (str): The raw CSV row string (without the trailing newline).
         keys (List[str]): List of field names to map the split values to.
 
     Returns:
         Dict[str, str]: Dictionary mapping keys to CSV field values.
-        
-    """
-    row_split = CSV_SPLIT_PATTERN.split(row)
-    return dict(zip(keys, row_split))
-
 
+    """
+    return dict(zip(keys, split_csv_fields(row)))
@@ -8,7 +8,7 @@ Supports multiple providers via LiteLLM.
 
 import os
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Union
 from dotenv import load_dotenv
 
 # Load .env file if it exists, otherwise try .env.example
@@ -24,6 +24,10 @@ ALLOWED_LLM_PROVIDERS = {
     "vertex_ai", "gemini", "ollama"
 }
 
+# Caller -> callee argument mapping: "auto" parses the call site and asks the model only
+# when that fails, "llm" always asks the model, "static" never does
+ALLOWED_ARGS_MAPPING_MODES = ("auto", "llm", "static")
+
 
 def get_model_name(provider: Optional[str], model: Optional[str]) -> str:
     """
@@ -71,7 +75,23 @@ def load_llm_config() -> Dict[str, Any]:
             "endpoint": Optional[str],
             "api_version": Optional[str],
             "temperature": float,
-            "top_p": float
+            "top_p": float,
+            "concurrency": int,
+            "rpm": int,
+            "tpm": int,
+            "max_retries": int,
+            "cache": bool,
+            "cache_dir": str,
+            "cache_ttl_days": float,
+            "cache_max_mb": int,
+            "prefetch_tokens": int,
+            "prompt_max_tokens": Union[int, str, None],
+            "compact_after_rounds": int,
+            "args_mapping": str,
+            "args_model": Optional[str],
+            "prompt_cache": bool,
+            "stream": bool,
+            "structured_output": bool
         }
     
     Raises:
@@ -169,13 +189,59 @@ def load_llm_config() -> Dict[str, Any]:
     # Get optional parameters
     temperature = float(os.getenv("LLM_TEMPERATURE", "0.2"))
     top_p = float(os.getenv("LLM_TOP_P", "0.2"))
+    concurrency = int(os.getenv("LLM_CONCURRENCY", "1"))
+    # Rate limits shared by all LLM calls (0 = unlimited) and retries per call
+    rpm = int(os.getenv("LLM_RPM", "0"))
+    tpm = int(os.getenv("LLM_TPM", "0"))
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    # On-disk response cache (replays identical completions on re-runs)
+    cache = os.getenv("LLM_CACHE", "true").lower() not in ("false", "0", "no", "off")
+    cache_dir = os.getenv("LLM_CACHE_DIR", "output/cache/llm")
+    cache_ttl_days = float(os.getenv("LLM_CACHE_TTL_DAYS", "30"))
+    cache_max_mb = int(os.getenv("LLM_CACHE_MAX_MB", "1024"))
+    # Token budget for context attached to the first prompt (0 = no prefetch)
+    prefetch_tokens = int(os.getenv("LLM_PREFETCH_TOKENS", "0"))
+    # Token budget of the first prompt ("auto" = half the model's input window, unset or 0 = no limit)
+    prompt_max_tokens_env = os.getenv("LLM_PROMPT_MAX_TOKENS", "").strip().lower()
+    prompt_max_tokens: Union[int, str, None] = None
+    if prompt_max_tokens_env == "auto":
+        prompt_max_tokens = "auto"
+    elif prompt_max_tokens_env:
+        prompt_max_tokens = int(prompt_max_tokens_env)
+    # Tool rounds whose outputs are resent in full; older ones are summarized (0 = off)
+    compact_after_rounds = int(os.getenv("LLM_COMPACT_AFTER_ROUNDS", "0"))
+    # Caller -> callee argument mapping: "auto", "llm" (optionally a cheaper model) or "static" (no LLM)
+    args_mapping = os.getenv("LLM_ARGS_MAPPING", "auto").strip().lower()
+    args_model = os.getenv("LLM_ARGS_MODEL") or None
+    # Provider-side prompt caching markers (Anthropic, Claude on Bedrock / Vertex AI, Gemini)
+    prompt_cache = os.getenv("LLM_PROMPT_CACHE", "true").lower() not in ("false", "0", "no", "off")
+    # Streamed completions, stopped once the status code and its explanation are in
+    stream = os.getenv("LLM_STREAM", "false").lower() in ("true", "1", "yes", "on")
+    # Final answer as a JSON verdict (status, reason, exploit parameters) instead of free text
+    structured_output = os.getenv("LLM_STRUCTURED_OUTPUT", "false").lower() in ("true", "1", "yes", "on")
     
     config = {
         "provider": provider,
         "model": get_model_name(provider, model),
         "api_key": api_key,
         "temperature": temperature,
-        "top_p": top_p
+        "top_p": top_p,
+        "concurrency": concurrency,
+        "rpm": rpm,
+        "tpm": tpm,
+        "max_retries": max_retries,
+        "cache": cache,
+        "cache_dir": cache_dir,
+        "cache_ttl_days": cache_ttl_days,
+        "cache_max_mb": cache_max_mb,
+        "prefetch_tokens": prefetch_tokens,
+        "prompt_max_tokens": prompt_max_tokens,
+        "compact_after_rounds": compact_after_rounds,
+        "args_mapping": args_mapping,
+        "args_model": get_model_name(provider, args_model) if args_model else None,
+        "prompt_cache": prompt_cache,
+        "stream": stream,
+        "structured_output": structured_output
     }
     
     # Add provider-specific fields
@@ -0,0 +1,235 @@
+"""
+Compact records for CodeQL issue and FunctionTree rows.
+
+A database can have millions of FunctionTree rows. Holding each one as a
+dict of quoted strings costs several hundred bytes per row, and every
+consumer re-parses the line numbers with int(). These records use
+__slots__, keep line numbers as ints and intern file paths and names
+(shared by many rows).
+
+They are read-only Mappings over the unquoted values, with line numbers
+as decimal strings, so dict(record) and the JSON writers keep working. New
+code should use the attributes (int lines) or line_range(). field_value()
+reads a column of any row type, including the quoted rows parsed from the
+CSV text, without quotes.
+"""
+
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+def _unquote(value: str) -> str:
+    """
+    Remove the CSV quotes CodeQL puts around a string field.
+    """
+    value = value.strip()
+    if len(value) >= 2 and value[0] == "\"" and value[-1] == "\"":
+        return value[1:-1]
+    return value
+
+
+def _to_int(value: Any) -> Union[int, str]:
+    """
+    Parse a line/offset column; values that are not integers are kept as given.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class FunctionRecord(Mapping[str, str]):
+    """
+    One FunctionTree.csv row: function_name, file, start_line, function_id,
+    end_line, caller_id.
+
+    String attributes hold the unquoted values; start_line / end_line are ints.
+    """
+
+    __slots__ = ("function_name", "file", "start_line", "function_id", "end_line", "caller_id")
+
+    KEYS = ("function_name", "file", "start_line", "function_id", "end_line", "caller_id")
+
+    function_name: str
+    file: str
+    start_line: int
+    function_id: str
+    end_line: int
+    caller_id: str
+
+    def __init__(
+        self,
+        function_name: str,
+        file: str,
+        start_line: int,
+        function_id: str,
+        end_line: int,
+        caller_id: str
+    ) -> None:
+        self.function_name = sys.intern(function_name)
+        self.file = sys.intern(file)
+        self.start_line = int(start_line)
+        self.function_id = function_id
+        self.end_line = int(end_line)
+        self.caller_id = caller_id
+
+    @classmethod
+    def from_csv_fields(cls, fields: List[str]) -> "FunctionRecord":
+        """
+        Build a record from the split (still quoted) fields of a FunctionTree.csv line.
+
+        Raises:
+            ValueError: If a line column is not an integer.
+        """
+        name, file, start, function_id, end, caller_id = fields
+        return cls(
+            _unquote(name), _unquote(file), int(start),
+            _unquote(function_id), int(end), _unquote(caller_id)
+        )
+
+    def __getitem__(self, key: str) -> str:
+        if key not in FunctionRecord.KEYS:
+            raise KeyError(key)
+        return str(getattr(self, key))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FunctionRecord.KEYS)
+
+    def __len__(self) -> int:
+        return len(FunctionRecord.KEYS)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class ToolRow(Mapping[str, str]):
+    """
+    One row of a tool query (Macros, GlobalVars, Classes) decoded from BQRS JSON.
+
+    Values keep their result types (str or int); the item view is their text.
+    """
+
+    __slots__ = ("_keys", "_values")
+
+    def __init__(self, keys: Tuple[str, ...], values: List[Any]) -> None:
+        self._keys = keys
+        self._values = tuple(
+            sys.intern(value) if isinstance(value, str) and len(value) < 256 else value
+            for value in values
+        )
+
+    def value(self, key: str) -> Any:
+        """
+        Return the typed (unquoted) value of column `key`.
+        """
+        try:
+            return self._values[self._keys.index(key)]
+        except ValueError:
+            raise KeyError(key) from None
+
+    def __getitem__(self, key: str) -> str:
+        return str(self.value(key))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+class IssueRecord(MutableMapping):
+    """
+    One issues.csv row (plus the db_path of its database).
+
+    Line and offset columns are ints; file and db_path are interned. The
+    item view returns strings like csv.DictReader did, and allows setting
+    the known fields (e.g. issue["db_path"] = ...).
+    """
+
+    __slots__ = (
+        "name", "help", "type", "message", "file",
+        "start_line", "start_offset", "end_line", "end_offset", "db_path"
+    )
+
+    KEYS = (
+        "name", "help", "type", "message", "file",
+        "start_line", "start_offset", "end_line", "end_offset", "db_path"
+    )
+    _INTS = frozenset(("start_line", "start_offset", "end_line", "end_offset"))
+    _INTERNED = frozenset(("name", "type", "file", "db_path"))
+
+    def __init__(self, *values: Any, **fields: Any) -> None:
+        for key, value in zip(IssueRecord.KEYS, values):
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IssueRecord":
+        """
+        Rebuild a record from dict(record) (e.g. after a JSON round trip).
+        """
+        return cls(**{key: value for key, value in data.items() if key in IssueRecord.KEYS})
+
+    def __getitem__(self, key: str) -> Optional[str]:
+        if key not in IssueRecord.KEYS:
+            raise KeyError(key)
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        return value if value is None or isinstance(value, str) else str(value)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in IssueRecord.KEYS:
+            raise KeyError(f"IssueRecord has no field {key!r}")
+        if key in IssueRecord._INTS:
+            value = _to_int(value)
+        elif key in IssueRecord._INTERNED and isinstance(value, str):
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in IssueRecord.KEYS if hasattr(self, key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+
+def field_value(row: Mapping, key: str) -> str:
+    """
+    Return column `key` of a tool-query row as an unquoted string.
+
+    Records already hold unquoted values; rows parsed from the CSV text
+    (or built by the PHP backend) have their enclosing quotes removed.
+    """
+    if isinstance(row, (FunctionRecord, ToolRow)):
+        return row[key]
+    return _unquote(str(row[key]))
+
+
+def line_range(function: Mapping) -> Tuple[int, int]:
+    """
+    Return (start_line, end_line) of a function row as ints.
+
+    Uses the pre-parsed attributes of a FunctionRecord, and parses the
+    columns of a plain dict row (e.g. from the PHP backend).
+    """
+    if isinstance(function, FunctionRecord):
+        return function.start_line, function.end_line
+    if isinstance(function, ToolRow):
+        return int(function.value("start_line")), int(function.value("end_line"))
+    return int(function["start_line"]), int(function["end_line"])
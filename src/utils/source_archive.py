@@ -0,0 +1,242 @@
+"""
+Open-once access to a CodeQL database's src.zip.
+
+A SourceArchive keeps its zipfile.ZipFile open (the central directory is
+read once), and decoded, pre-split file contents go to an LRU bounded by a
+byte budget, so repeated reads of the same source file during prompt
+building and tool calls cost nothing. All archives share one line cache,
+and only the most recently used archives stay open, so memory stays
+bounded on runs over many databases.
+"""
+
+import itertools
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, List, Optional, Tuple
+
+from src.utils.exceptions import CodeQLError
+
+
+# Budget for decoded source kept in memory, shared by all archives (source file bytes)
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+# Archives kept open at once; the least recently used one is closed beyond that
+MAX_OPEN_ARCHIVES = 8
+
+
+class LineCache:
+    """
+    A byte-bounded LRU of decoded file lines, keyed by (archive, path).
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        """
+        Args:
+            max_bytes (int, optional): Upper bound on the total size of the
+                cached files, in bytes of source. Defaults to DEFAULT_CACHE_BYTES.
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[Hashable, str], Tuple[List[str], int]]" = OrderedDict()
+        self.cached_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[Hashable, str]) -> Optional[List[str]]:
+        """
+        Return the cached lines for `key`, marking them recently used.
+        """
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return None
+            self._entries.move_to_end(key)
+            return cached[0]
+
+    def put(self, key: Tuple[Hashable, str], lines: List[str], size: int) -> None:
+        """
+        Cache `lines` (`size` bytes of source), evicting the least recently used files.
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.cached_bytes -= previous[1]
+            self._entries[key] = (lines, size)
+            self.cached_bytes += size
+            while self.cached_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.cached_bytes -= evicted_size
+
+    def __contains__(self, key: Tuple[Hashable, str]) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def discard(self, owner: Hashable) -> None:
+        """
+        Drop every cached file of the archive `owner`.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner]:
+                self.cached_bytes -= self._entries.pop(key)[1]
+
+
+_line_cache = LineCache()
+_archive_ids = itertools.count()
+
+
+class SourceArchive:
+    """
+    A src.zip archive with a persistent handle and a decoded-lines LRU cache.
+    """
+
+    def __init__(self, zip_path: str, cache: Optional[LineCache] = None) -> None:
+        """
+        Args:
+            zip_path (str): The path to the ZIP file.
+            cache (Optional[LineCache], optional): The line cache to use. Defaults
+                to the cache shared by all archives.
+        """
+        self.zip_path = zip_path
+        self.cache = cache if cache is not None else _line_cache
+        self._cache_owner = next(_archive_ids)
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _open(self) -> zipfile.ZipFile:
+        """
+        Open a new handle on the archive.
+
+        Raises:
+            CodeQLError: If ZIP file cannot be opened.
+        """
+        try:
+            return zipfile.ZipFile(self.zip_path, "r")
+        except zipfile.BadZipFile as e:
+            raise CodeQLError(f"Invalid or corrupted ZIP file: {self.zip_path}") from e
+        except FileNotFoundError as e:
+            raise CodeQLError(f"ZIP file not found: {self.zip_path}") from e
+        except PermissionError as e:
+            raise CodeQLError(f"Permission denied reading ZIP file: {self.zip_path}") from e
+        except OSError as e:
+            raise CodeQLError(f"OS error while reading ZIP file: {self.zip_path}") from e
+
+    def read_lines(self, file_path_in_zip: str) -> List[str]:
+        """
+        Return the file's contents split on "\\n".
+
+        The returned list is shared with the cache and must not be modified.
+        After close() (e.g. the archive was evicted while a caller still held
+        it), each read opens the archive for that read only and is not cached.
+
+        Args:
+            file_path_in_zip (str): The internal path within the ZIP to the file.
+
+        Returns:
+            List[str]: The decoded (UTF-8) lines of the file.
+
+        Raises:
+            CodeQLError: If ZIP file cannot be read or file not found in archive.
+        """
+        key = (self._cache_owner, file_path_in_zip)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            closed = self._closed
+            if closed:
+                zip_ref = self._open()
+            else:
+                if self._zip is None:
+                    self._zip = self._open()
+                zip_ref = self._zip
+            try:
+                with zip_ref.open(file_path_in_zip) as file:
+                    data = file.read()
+            except KeyError as e:
+                raise CodeQLError(
+                    f"File '{file_path_in_zip}' not found in ZIP archive: {self.zip_path}"
+                ) from e
+            except zipfile.BadZipFile as e:
+                raise CodeQLError(f"Invalid or corrupted ZIP file: {self.zip_path}") from e
+            except OSError as e:
+                raise CodeQLError(f"OS error while reading ZIP file: {self.zip_path}") from e
+            finally:
+                if closed:
+                    zip_ref.close()
+
+        lines = data.decode("utf-8").split("\n")
+        if not closed:
+            self.cache.put(key, lines, len(data))
+        return lines
+
+    def read_text(self, file_path_in_zip: str) -> str:
+        """
+        Return the file's contents as a single UTF-8 string.
+
+        Raises:
+            CodeQLError: If ZIP file cannot be read or file not found in archive.
+        """
+        return "\n".join(self.read_lines(file_path_in_zip))
+
+    def close(self) -> None:
+        """
+        Close the archive handle and drop its files from the line cache.
+        """
+        with self._lock:
+            self._closed = True
+            if self._zip is not None:
+                self._zip.close()
+                self._zip = None
+        self.cache.discard(self._cache_owner)
+
+
+# Open archives by resolved path, least recently used first
+_archives: "OrderedDict[str, Tuple[Tuple[int, int], SourceArchive]]" = OrderedDict()
+_archives_lock = threading.Lock()
+
+
+def get_source_archive(zip_path: str) -> SourceArchive:
+    """
+    Return the shared SourceArchive for `zip_path`, opening it on first use.
+
+    The archive is reopened if the file on disk has been replaced
+    (e.g. after a forced re-download of the database). At most
+    MAX_OPEN_ARCHIVES archives stay open; the least recently used one is
+    closed when another is opened.
+
+    Args:
+        zip_path (str): The path to the ZIP file.
+
+    Returns:
+        SourceArchive: The archive for that path.
+
+    Raises:
+        CodeQLError: If ZIP file cannot be accessed.
+    """
+    path = Path(zip_path)
+    try:
+        stat = path.stat()
+    except FileNotFoundError as e:
+        raise CodeQLError(f"ZIP file not found: {zip_path}") from e
+    except OSError as e:
+        raise CodeQLError(f"OS error while reading ZIP file: {zip_path}") from e
+
+    key = str(path.resolve())
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _archives_lock:
+        cached = _archives.get(key)
+        if cached and cached[0] == version:
+            _archives.move_to_end(key)
+            return cached[1]
+        if cached:
+            del _archives[key]
+            cached[1].close()
+        archive = SourceArchive(zip_path)
+        _archives[key] = (version, archive)
+        while len(_archives) > MAX_OPEN_ARCHIVES:
+            _, (_, evicted) = _archives.popitem(last=False)
+            evicted.close()
+        return archive
@@ -0,0 +1,147 @@
+"""
+Grouping buffer with bounded memory.
+
+GroupedSpillBuffer collects items (JSON-serializable mappings) under group
+keys. Once more than `max_in_memory` items are held, all buffered items
+are appended to one JSON-lines file per group in a temporary directory,
+so grouping a very large issues.csv never holds more than a small window
+of rows in memory. Iterating a group yields its items in insertion order.
+"""
+
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+from src.utils.exceptions import VulnhallaError
+
+
+# Default number of items kept in memory before spilling to disk
+DEFAULT_MAX_IN_MEMORY = 50_000
+
+
+class SpilledGroup:
+    """
+    A read-only, sized, re-iterable view of one group of a GroupedSpillBuffer.
+    """
+
+    def __init__(self, buffer: "GroupedSpillBuffer", key: str) -> None:
+        self._buffer = buffer
+        self.key = key
+
+    def __len__(self) -> int:
+        return self._buffer._counts.get(self.key, 0)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return self._buffer._iter_group(self.key)
+
+
+class GroupedSpillBuffer:
+    """
+    Insertion-ordered groups of dicts that spill to disk past a memory budget.
+
+    Use as a context manager (or call close()) to remove the spill files.
+    """
+
+    def __init__(
+        self,
+        max_in_memory: int = DEFAULT_MAX_IN_MEMORY,
+        spill_dir: Optional[str] = None,
+        decode: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> None:
+        """
+        Args:
+            max_in_memory (int, optional): Items held in memory before spilling.
+                Defaults to DEFAULT_MAX_IN_MEMORY.
+            spill_dir (Optional[str], optional): Parent directory of the spill files.
+                Defaults to the system temporary directory.
+            decode (Optional[Callable], optional): Rebuilds an item from the dict
+                read back from disk (items are spilled as dict(item)).
+        """
+        self._decode = decode
+        self.max_in_memory = max(1, max_in_memory)
+        self._spill_parent = spill_dir
+        self._spill_path: Optional[Path] = None
+        self._memory: Dict[str, List[Mapping[str, Any]]] = {}
+        self._counts: Dict[str, int] = {}
+        self._files: Dict[str, Path] = {}
+        self._in_memory = 0
+
+    def __enter__(self) -> "GroupedSpillBuffer":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def add(self, key: str, item: Mapping[str, Any]) -> None:
+        """
+        Append `item` to group `key`.
+
+        Raises:
+            VulnhallaError: If spilling to disk fails.
+        """
+        if key not in self._counts:
+            self._counts[key] = 0
+            self._memory[key] = []
+        self._memory[key].append(item)
+        self._counts[key] += 1
+        self._in_memory += 1
+        if self._in_memory > self.max_in_memory:
+            self._spill()
+
+    def keys(self) -> List[str]:
+        """
+        Group keys in first-seen order.
+        """
+        return list(self._counts)
+
+    def group(self, key: str) -> SpilledGroup:
+        return SpilledGroup(self, key)
+
+    def __len__(self) -> int:
+        return sum(self._counts.values())
+
+    def _spill(self) -> None:
+        try:
+            if self._spill_path is None:
+                self._spill_path = Path(tempfile.mkdtemp(prefix="vulnhalla-groups-", dir=self._spill_parent))
+            for key, items in self._memory.items():
+                if not items:
+                    continue
+                path = self._files.get(key)
+                if path is None:
+                    path = self._spill_path / f"{len(self._files)}.jsonl"
+                    self._files[key] = path
+                with path.open("a", encoding="utf-8") as f:
+                    for item in items:
+                        f.write(json.dumps(dict(item), ensure_ascii=False))
+                        f.write("\n")
+                items.clear()
+        except OSError as e:
+            raise VulnhallaError(f"OS error while spilling grouped issues to disk: {self._spill_path}") from e
+        self._in_memory = 0
+
+    def _iter_group(self, key: str) -> Iterator[Mapping[str, Any]]:
+        path = self._files.get(key)
+        if path is not None:
+            try:
+                with path.open("r", encoding="utf-8") as f:
+                    for line in f:
+                        item = json.loads(line)
+                        yield self._decode(item) if self._decode else item
+            except OSError as e:
+                raise VulnhallaError(f"OS error while reading spilled issues: {path}") from e
+        yield from list(self._memory.get(key, ()))
+
+    def close(self) -> None:
+        """
+        Drop all items and delete the spill files.
+        """
+        if self._spill_path is not None:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+        self._memory.clear()
+        self._counts.clear()
+        self._files.clear()
+        self._in_memory = 0
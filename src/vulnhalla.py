@@ -9,22 +9,27 @@ each finding is a true positive, false positive, or needs more data,
 and writes structured result files for further inspection (e.g. in the UI).
 
 Analysis Pipeline Algorithm:
-    1. Collect DBs via get_all_dbs(dbs_folder), parse issues.csv, group by issue['name'].
-    2. For each issue: find containing function via find_function_by_line() (smallest line range).
+    1. Collect DBs via get_all_dbs(dbs_folder), parse issues.csv, group by issue['name']
+       (all DBs up front, or one DB at a time with stream_issues=True).
+    2. For each issue: find containing function via find_function_by_line() (interval index, smallest line range).
     3. Extract snippet and full function code.
     4. Replace bracket references in the message; if references point outside current function, append those functions' code.
-    5. Build prompt; save *_raw.json; run LLM analysis; save *_final.json.
-    6. Classify by substring: "1337" → true, "1007" → false, else → more; log stats.
+    5. Fingerprint the issue; skip it if manifest.json shows it was already triaged with the same prompt.
+    6. Build prompt; save *_raw.json; run LLM analysis (LLM_CONCURRENCY conversations in flight); save *_final.json in issue order.
+    7. Classify by substring: "1337" → true, "1007" → false, else → more; log stats.
 """
 
 from pathlib import Path, PurePosixPath
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import csv
+import hashlib
+import os
 import re
 import json
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
 from src.utils.common_functions import (
     get_all_dbs,
-    read_file_lines_from_zip,
     read_file as read_file_utf8,
     write_file_ascii,
     read_yml
@@ -32,9 +37,16 @@ from src.utils.common_functions import (
 
 # LLM analyzer for security analysis
 from src.llm.llm_analyzer import LLMAnalyzer
+from src.llm.verdict import parse_verdict
+from src.llm.prompt_budget import CodeSection, PromptAssembler, make_token_counter, resolve_prompt_budget
+from src.codeql.context_prefetch import ContextPrefetcher, PrefetchedItemJson, PrefetchResult, prefetch_stats
+from src.codeql.db_index import evict_indexes, get_function_index, resolve_tool_output
+from src.utils.source_archive import get_source_archive
+from src.utils.records import IssueRecord, line_range
+from src.utils.spill_buffer import DEFAULT_MAX_IN_MEMORY, GroupedSpillBuffer, SpilledGroup
 from src.utils.config_validator import validate_and_exit_on_error
 from src.utils.logger import get_logger
-from src.utils.exceptions import VulnhallaError, CodeQLError, LLMApiError
+from src.utils.exceptions import VulnhallaError, CodeQLError, CodeQLConfigError, LLMApiError, LLMConfigError
 
 logger = get_logger(__name__)
 
@@ -45,57 +57,93 @@ class IssueAnalyzer:
     and forwards them to an LLM (via llm_analyzer) for triage.
     """
 
-    def __init__(self, lang: str = "c", config: Optional[Dict[str, Any]] = None) -> None:
+    def __init__(
+        self,
+        lang: str = "c",
+        config: Optional[Dict[str, Any]] = None,
+        use_cache: bool = True,
+        incremental: bool = True,
+        stream_issues: bool = False
+    ) -> None:
         """
         Initialize the IssueAnalyzer with default parameters.
 
         Args:
             lang (str, optional): The language code. Defaults to 'c'.
             config (Dict, optional): Full LLM configuration dictionary. If not provided, loads from .env file.
+            use_cache (bool, optional): If False, bypass the on-disk LLM response cache. Defaults to True.
+            incremental (bool, optional): If True, skip issues whose fingerprint and prompt
+                already have a result from a previous run. Defaults to True.
+            stream_issues (bool, optional): If True, run() parses and triages one
+                database at a time instead of loading every issues.csv first
+                (see iter_issues_by_database()). Defaults to False.
         """
         self.lang = lang
         self.db_path: Optional[str] = None
         self.code_path: Optional[str] = None
         self.config = config
+        self.use_cache = use_cache
+        self.incremental = incremental
+        self.stream_issues = stream_issues
 
     # ----------------------------------------------------------------------
     # 1. CSV Parsing and Data Gathering
     # ----------------------------------------------------------------------
 
-    def parse_issues_csv(self, file_name: str) -> List[Dict[str, str]]:
+    ISSUE_FIELD_NAMES = [
+        "name", "help", "type", "message",
+        "file", "start_line", "start_offset",
+        "end_line", "end_offset"
+    ]
+
+    def iter_issues_csv(self, file_name: str) -> Iterator[IssueRecord]:
         """
-        Reads the issues.csv file produced by CodeQL (with a custom or default
-        set of columns) and returns a list of dicts.
+        Lazily reads the issues.csv file produced by CodeQL, yielding one issue
+        per row (same format as parse_issues_csv()).
 
         Args:
             file_name (str): The path to 'issues.csv'.
 
-        Returns:
-            List[Dict[str, str]]: A list of issue objects parsed from CSV rows.
-        
+        Yields:
+            IssueRecord: Issue objects parsed from CSV rows.
+
         Raises:
             CodeQLError: If file cannot be read (not found, permission denied, etc.).
         """
-        field_names = [
-            "name", "help", "type", "message",
-            "file", "start_line", "start_offset",
-            "end_line", "end_offset"
-        ]
-        issues = []
+        width = len(self.ISSUE_FIELD_NAMES)
         try:
-            with Path(file_name).open("r", encoding="utf-8") as f:
-                csv_reader = csv.DictReader(f, fieldnames=field_names)
-                for row in csv_reader:
-                    issues.append(row)
+            with Path(file_name).open("r", encoding="utf-8", newline="") as f:
+                for row in csv.reader(f):
+                    if not row:
+                        continue
+                    # Missing columns are None, like csv.DictReader
+                    yield IssueRecord(*row[:width], *[None] * (width - len(row)))
         except FileNotFoundError as e:
             raise CodeQLError(f"Issues CSV file not found: {file_name}") from e
         except PermissionError as e:
             raise CodeQLError(f"Permission denied reading issues CSV: {file_name}") from e
         except OSError as e:
             raise CodeQLError(f"OS error while reading issues CSV: {file_name}") from e
-        return issues
 
-    def collect_issues_from_databases(self, dbs_dir: str) -> Dict[str, List[Dict[str, str]]]:
+    def parse_issues_csv(self, file_name: str) -> List[IssueRecord]:
+        """
+        Reads the issues.csv file produced by CodeQL (with a custom or default
+        set of columns) and returns a list of issue records.
+
+        Args:
+            file_name (str): The path to 'issues.csv'.
+
+        Returns:
+            List[IssueRecord]: Issue objects parsed from CSV rows. They behave
+                like the csv.DictReader dicts (string values) and also expose
+                int line/offset attributes.
+        
+        Raises:
+            CodeQLError: If file cannot be read (not found, permission denied, etc.).
+        """
+        return list(self.iter_issues_csv(file_name))
+
+    def collect_issues_from_databases(self, dbs_dir: str) -> Dict[str, List[Mapping[str, str]]]:
         """
         Searches through all CodeQL databases in `dbs_folder`, collects issues
         from each DB, and groups them by issue name.
@@ -104,45 +152,82 @@ class IssueAnalyzer:
             dbs_folder (str): The folder containing the language-specific databases.
 
         Returns:
-            Dict[str, List[Dict[str, str]]]: All issues, grouped by issue name.
+            Dict[str, List[Mapping[str, str]]]: All issues, grouped by issue name.
         
         Raises:
             CodeQLError: If database folder cannot be accessed or issues cannot be read.
         """
-        issues_statistics: Dict[str, List[Dict[str, str]]] = {}
+        issues_statistics: Dict[str, List[Mapping[str, str]]] = {}
         
         actual_dbs = get_all_dbs(dbs_dir)
         for curr_db in actual_dbs:
             logger.info("Processing DB: %s", curr_db)
             curr_db_path = Path(curr_db)
-            function_tree_csv = curr_db_path / "FunctionTree.csv"
+            function_tree_file = resolve_tool_output(curr_db_path / "FunctionTree.csv")
             issues_file = curr_db_path / "issues.csv"
-            if function_tree_csv.exists() and issues_file.exists():
+            if function_tree_file.exists() and issues_file.exists():
                 # parse_issues_csv() raises CodeQLError on errors
                 issues = self.parse_issues_csv(str(issues_file))
                 for issue in issues:
-                    if issue["name"] not in issues_statistics:
-                        issues_statistics[issue["name"]] = []
+                    issue_name = issue["name"] or ""
+                    if issue_name not in issues_statistics:
+                        issues_statistics[issue_name] = []
                     issue["db_path"] = curr_db
-                    issues_statistics[issue["name"]].append(issue)
+                    issues_statistics[issue_name].append(issue)
             else:
                 logger.error("Error: Execute run_codeql_queries.py first!")
                 continue
 
         return issues_statistics
 
+    def iter_issues_by_database(
+        self, dbs_dir: str, max_in_memory: int = DEFAULT_MAX_IN_MEMORY
+    ) -> Iterator[Tuple[str, GroupedSpillBuffer]]:
+        """
+        Streaming counterpart of collect_issues_from_databases(): yields one
+        database at a time with its issues grouped by issue name, so triage
+        can start after the first database is parsed. Only the current
+        database's issues are buffered, and at most `max_in_memory` of them
+        are kept in memory (the rest spill to a temporary file).
+
+        Args:
+            dbs_dir (str): The folder containing the language-specific databases.
+            max_in_memory (int, optional): Issues kept in memory before spilling.
+
+        Yields:
+            Tuple[str, GroupedSpillBuffer]: (database path, issues grouped by name).
+                The buffer is closed when the generator advances.
+
+        Raises:
+            CodeQLError: If database folder cannot be accessed or issues cannot be read.
+            VulnhallaError: If spilling issues to disk fails.
+        """
+        for curr_db in get_all_dbs(dbs_dir):
+            logger.info("Processing DB: %s", curr_db)
+            curr_db_path = Path(curr_db)
+            issues_file = curr_db_path / "issues.csv"
+            if not (resolve_tool_output(curr_db_path / "FunctionTree.csv").exists() and issues_file.exists()):
+                logger.error("Error: Execute run_codeql_queries.py first!")
+                continue
+
+            with GroupedSpillBuffer(max_in_memory, decode=IssueRecord.from_dict) as grouped:
+                for issue in self.iter_issues_csv(str(issues_file)):
+                    issue["db_path"] = curr_db
+                    grouped.add(issue["name"] or "", issue)
+                yield curr_db, grouped
+
     # ----------------------------------------------------------------------
     # 2. Function and Snippet Extraction
     # ----------------------------------------------------------------------
 
-    def find_function_by_line(self, function_tree_file: str, file_path: str, line: int) -> Optional[Dict[str, str]]:
+    def find_function_by_line(self, function_tree_file: str, file_path: str, line: int) -> Optional[Mapping[str, str]]:
         """
         Finds the most specific (smallest) function containing the given file and line number.
 
         Algorithm:
-            - Iterate rows where file_path substring appears
-            - Keep rows where start_line <= line <= end_line and file_path in function["file"]
-            - Return function with smallest (end_line - start_line), else None
+            - Load (or reuse) the database's FunctionTreeIndex, built once per FunctionTree.csv
+            - Match indexed files where file_path is a substring of the row's file
+            - Bisect the per-file segment table for the smallest enclosing function, else None
 
         Args:
             function_tree_file (str): Path to the 'FunctionTree.csv' file.
@@ -150,70 +235,38 @@ class IssueAnalyzer:
             line (int): The line number to check within function range.
 
         Returns:
-            Optional[Dict[str, str]]: The best matching function dictionary, or None if not found.
+            Optional[Mapping[str, str]]: The best matching function dictionary, or None if not found.
         
         Raises:
             CodeQLError: If function tree file cannot be read (not found, permission denied, etc.).
         """
-        keys = ["function_name", "file", "start_line", "function_id", "end_line", "caller_id"]
-        best_function = None
-        smallest_range = float('inf')
-
-        try:
-            with Path(function_tree_file).open("r", encoding="utf-8") as f:
-                for row in f:
-                    if file_path in row:
-                        fields = re.split(r',(?=(?:[^"]*"[^"]*")*[^"]*$)', row.strip())
-                        if len(fields) != len(keys):
-                            continue  # Skip malformed rows
-
-                        function = dict(zip(keys, fields))
-                        try:
-                            start_line = int(function["start_line"])
-                            end_line = int(function["end_line"])
-                        except ValueError:
-                            continue  # Skip if lines aren't integers
-
-                        # Check if the target line falls within this function's range
-                        if start_line <= line <= end_line:
-                            if file_path in function["file"]:
-                                # Greedy selection: track the function with smallest range
-                                # (most specific/nested function containing the line)
-                                size = end_line - start_line
-                                if size < smallest_range:
-                                    best_function = function
-                                    smallest_range = size
-        except FileNotFoundError as e:
-            raise CodeQLError(f"Function tree file not found: {function_tree_file}") from e
-        except PermissionError as e:
-            raise CodeQLError(f"Permission denied reading function tree file: {function_tree_file}") from e
-        except OSError as e:
-            raise CodeQLError(f"OS error while reading function tree file: {function_tree_file}") from e
-
-        return best_function
+        return get_function_index(function_tree_file).find_function_by_line(file_path, line)
 
-    def extract_function_code(self, code_file: List[str], function_dict: Dict[str, str]) -> str:
+    def extract_function_code(self, code_file: List[str], function_dict: Mapping[str, str]) -> str:
         """
         Produces lines of the function's code from a list of lines.
 
         Args:
             code_file (List[str]): A list of lines for the entire file.
-            function_dict (Dict[str, str]): The dictionary describing the function.
+            function_dict (Mapping[str, str]): The dictionary describing the function.
 
         Returns:
             str: A snippet string of code for the function.
         """
         if not function_dict:
             return ""
-        start_line_idx = int(function_dict["start_line"]) - 1  # Index for array access
-        start_line_display = int(function_dict["start_line"])  # Index for display
-        end_line = int(function_dict["end_line"])
-        snippet_lines = code_file[start_line_idx:end_line]
-        snippet = "\n".join(
+        return "\n".join(self.numbered_function_lines(code_file, function_dict))
+
+    def numbered_function_lines(self, code_file: List[str], function_dict: Mapping[str, str]) -> List[str]:
+        """
+        Return the function's lines as "<line number>: <code>" strings (tabs expanded).
+        """
+        start_line_display, end_line = line_range(function_dict)
+        snippet_lines = code_file[start_line_display - 1:end_line]
+        return [
             f"{start_line_display + i}: {s.replace(chr(9), '    ')}"
             for i, s in enumerate(snippet_lines)
-        )
-        return snippet
+        ]
 
     # ----------------------------------------------------------------------
     # 3. Text Replacement & Prompt Building
@@ -256,11 +309,7 @@ class IssueAnalyzer:
             else:
                 full_path = file_path[1:] if file_path.startswith("/") else file_path
 
-            code_text = read_file_lines_from_zip(
-                str(Path(db_path) / "src.zip"),
-                full_path
-            )
-            code_lines = code_text.split("\n")
+            code_lines = get_source_archive(str(Path(db_path) / "src.zip")).read_lines(full_path)
             snippet = code_lines[int(line_number) - 1][int(start_offset) - 1:int(end_offset)]
 
             file_name = PurePosixPath(file_path).name
@@ -270,7 +319,7 @@ class IssueAnalyzer:
 
     def build_prompt_by_template(
         self,
-        issue: Dict[str, str],
+        issue: Mapping[str, str],
         message: str,
         snippet: str,
         code: str
@@ -280,7 +329,7 @@ class IssueAnalyzer:
         the code snippet, code content, and a set of hints.
 
         Args:
-            issue (Dict[str, str]): The issue dictionary from parse_issues_csv.
+            issue (Mapping[str, str]): The issue dictionary from parse_issues_csv.
             message (str): The processed "message" text to embed.
             snippet (str): The direct snippet from the code for the particular highlight.
             code (str): Additional code context (e.g. entire function).
@@ -362,16 +411,122 @@ class IssueAnalyzer:
 
 
     # ----------------------------------------------------------------------
-    # 5. Main Analysis Routine
+    # 5. Incremental Re-analysis
+    # ----------------------------------------------------------------------
+
+    MANIFEST_FILE = "manifest.json"
+
+    def compute_issue_fingerprint(self, issue: Mapping[str, str], function_code: str) -> str:
+        """
+        Compute a stable fingerprint for an issue.
+
+        The fingerprint covers the database (repo/db folder names), rule name,
+        message, file, start/end lines and offsets, and a hash of the enclosing
+        function's code, so it changes whenever the finding or its surrounding
+        code does.
+
+        Args:
+            issue (Mapping[str, str]): The issue dictionary from parse_issues_csv.
+            function_code (str): The extracted code of the enclosing function.
+
+        Returns:
+            str: Hex SHA-256 fingerprint.
+        """
+        db_path = PurePosixPath(Path(str(issue.get("db_path", ""))).as_posix())
+        function_hash = hashlib.sha256(function_code.encode("utf-8")).hexdigest()
+        parts = [
+            f"{db_path.parent.name}/{db_path.name}",
+            issue.get("name", ""),
+            issue.get("message", ""),
+            issue.get("file", ""),
+            issue.get("start_line", ""),
+            issue.get("start_offset", ""),
+            issue.get("end_line", ""),
+            issue.get("end_offset", ""),
+            function_hash,
+        ]
+        return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def compute_prompt_hash(prompt: str) -> str:
+        """
+        Return the hex SHA-256 of a prompt (changes when templates or context change).
+        """
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def load_results_manifest(self, results_folder: Path) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the fingerprint manifest of a results folder.
+
+        The manifest maps issue fingerprints to {"issue_id", "prompt_hash"}; the
+        prompt hash is only recorded once the issue's result is written. If the
+        manifest is missing or unreadable, it is rebuilt from the fingerprints
+        stored in the folder's *_raw.json files, and *_raw.json files it does not
+        know (e.g. after an interrupted run) are added without a prompt hash, so
+        their IDs are never handed out again and the issues are re-triaged.
+
+        Args:
+            results_folder (Path): The issue type's results folder.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: fingerprint → {"issue_id": int, "prompt_hash": str}.
+        """
+        manifest_path = results_folder / self.MANIFEST_FILE
+        manifest: Dict[str, Dict[str, Any]] = {}
+        rebuild = True
+        if manifest_path.exists():
+            try:
+                manifest = json.loads(read_file_utf8(str(manifest_path))).get("issues", {})
+                rebuild = False
+            except (VulnhallaError, ValueError, AttributeError) as e:
+                logger.warning("Ignoring unreadable results manifest %s: %s", manifest_path, e)
+
+        known_ids = {entry["issue_id"] for entry in manifest.values()}
+        for raw_file in sorted(results_folder.glob("*_raw.json")):
+            issue_id = raw_file.stem.split("_")[0]
+            if not issue_id.isdigit() or int(issue_id) in known_ids:
+                continue
+            try:
+                raw_data = json.loads(read_file_utf8(str(raw_file)))
+            except (VulnhallaError, ValueError):
+                continue
+            fingerprint = raw_data.get("fingerprint")
+            if fingerprint and fingerprint not in manifest:
+                manifest[fingerprint] = {"issue_id": int(issue_id)}
+                if rebuild and (results_folder / f"{issue_id}_final.json").exists():
+                    manifest[fingerprint]["prompt_hash"] = raw_data.get("prompt_hash")
+        return manifest
+
+    def save_results_manifest(self, results_folder: Path, manifest: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Atomically write the fingerprint manifest of a results folder.
+
+        Raises:
+            VulnhallaError: If the manifest cannot be written.
+        """
+        manifest_path = results_folder / self.MANIFEST_FILE
+        tmp_path = results_folder / f".{self.MANIFEST_FILE}.tmp"
+        write_file_ascii(str(tmp_path), json.dumps({"version": 1, "issues": manifest}, indent=1))
+        try:
+            os.replace(tmp_path, manifest_path)
+        except OSError as e:
+            raise VulnhallaError(f"OS error while writing results manifest: {manifest_path}") from e
+
+
+    # ----------------------------------------------------------------------
+    # 6. Main Analysis Routine
     # ----------------------------------------------------------------------
 
     def save_raw_input_data(
         self,
         prompt: str,
         function_tree_file: str,
-        current_function: Dict[str, str],
+        current_function: Mapping[str, str],
         results_folder: str,
-        issue_id: int
+        issue_id: int,
+        fingerprint: Optional[str] = None,
+        prefetched: Optional[List[PrefetchedItemJson]] = None,
+        token_counts: Optional[Dict[str, int]] = None
     ) -> None:
         """
         Saves the raw input data (prompt, function tree info, etc.) to a JSON file before
@@ -380,19 +535,28 @@ class IssueAnalyzer:
         Args:
             prompt (str): The final prompt text sent to the LLM.
             function_tree_file (str): Path to 'FunctionTree.csv'.
-            current_function (Dict[str, str]): The currently found function dict.
+            current_function (Mapping[str, str]): The currently found function dict.
             results_folder (str): Folder path where we store the result files.
             issue_id (int): The numeric ID of the current issue.
+            fingerprint (str, optional): The issue fingerprint (see compute_issue_fingerprint()).
+            prefetched (List[PrefetchedItemJson], optional): The context items attached
+                to the prompt by the prefetch stage.
+            token_counts (Dict[str, int], optional): Prompt token counts and budget
+                (see PromptAssembler.assemble()).
         
         Raises:
             VulnhallaError: If file cannot be written (permission denied, etc.).
         """
         raw_data = json.dumps({
             "function_tree_file": function_tree_file,
-            "current_function": current_function,
+            "current_function": dict(current_function),
             "db_path": self.db_path,
             "code_path": self.code_path,
-            "prompt": prompt
+            "prompt": prompt,
+            "fingerprint": fingerprint,
+            "prompt_hash": self.compute_prompt_hash(prompt),
+            "prefetched": prefetched or [],
+            "tokens": token_counts or {}
         }, ensure_ascii=False)
 
         raw_output_file = Path(results_folder) / f"{issue_id}_raw.json"
@@ -421,6 +585,9 @@ class IssueAnalyzer:
         Checks the content returned by the LLM to see if it includes certain
         status codes that classify the issue as 'true' or 'false' or 'more'.
 
+        A structured verdict (LLM_STRUCTURED_OUTPUT) is classified by its
+        "status" field alone; free-text answers by the codes they contain.
+
         Args:
             llm_content (str): The text content from the LLM's final response.
 
@@ -428,6 +595,9 @@ class IssueAnalyzer:
             str: "true" if content has '1337', "false" if content has '1007',
                  otherwise "more".
         """
+        verdict = parse_verdict(llm_content)
+        if verdict is not None:
+            return verdict.issue_status
         if "1337" in llm_content:
             return "true"
         elif "1007" in llm_content:
@@ -441,8 +611,8 @@ class IssueAnalyzer:
         function_tree_file: str,
         src_zip_path: str,
         code: str,
-        current_function: Dict[str, str]
-    ) -> Tuple[str, List[Dict[str, str]]]:
+        current_function: Mapping[str, str]
+    ) -> Tuple[str, List[Mapping[str, str]]]:
         """
         Appends code from additional functions referenced outside the current function.
 
@@ -456,15 +626,53 @@ class IssueAnalyzer:
             function_tree_file (str): Path to 'FunctionTree.csv'.
             src_zip_path (str): Path to the DB's src.zip file.
             code (str): The existing code snippet.
-            current_function (Dict[str, str]): The currently found function dict.
+            current_function (Mapping[str, str]): The currently found function dict.
 
         Returns:
-            Tuple[str, List[Dict[str, str]]]: Extended code snippet and list of all functions.
+            Tuple[str, List[Mapping[str, str]]]: Extended code snippet and list of all functions.
         
         Raises:
             CodeQLError: If function tree file or ZIP file cannot be read.
         """
         functions = [current_function]
+        for file_ref, new_function, _ in self.find_extra_functions(
+            extra_lines, function_tree_file, current_function
+        ):
+            functions.append(new_function)
+            # Read the function's source file and extract its code
+            code_file2 = get_source_archive(src_zip_path).read_lines(file_ref)
+            code += (
+                "\n\nfile: " + file_ref + "\n" +
+                self.extract_function_code(code_file2, new_function)
+            )
+
+        return code, functions
+
+    def find_extra_functions(
+        self,
+        extra_lines: List[tuple[str, str, str]],
+        function_tree_file: str,
+        current_function: Mapping[str, str]
+    ) -> List[Tuple[str, Mapping[str, str], int]]:
+        """
+        Resolve the references of an issue message that lie outside the current
+        function to the functions containing them (each function once).
+
+        Args:
+            extra_lines (List[tuple[str, str, str]]): References as (path_type, file_path, line_number).
+            function_tree_file (str): Path to 'FunctionTree.csv'.
+            current_function (Mapping[str, str]): The currently found function dict.
+
+        Returns:
+            List[Tuple[str, Mapping[str, str], int]]: (archive file path, function, referenced line)
+                for each new function, in reference order.
+
+        Raises:
+            CodeQLError: If function tree file cannot be read.
+        """
+        functions = [current_function]
+        found = []
+        start_line_func, end_line_func = line_range(current_function)
         for another_func_ref in extra_lines:
             # Unpack reference tuple: (path_type, file_path, line_number)
             path_type, file_ref, line_ref = another_func_ref
@@ -478,8 +686,6 @@ class IssueAnalyzer:
                 file_ref = file_ref[1:] if file_ref.startswith("/") else file_ref
 
             # If it's within the same function's line range, skip
-            start_line_func = int(current_function["start_line"])
-            end_line_func = int(current_function["end_line"])
             if start_line_func <= int(line_ref) <= end_line_func:
                 continue
 
@@ -488,33 +694,28 @@ class IssueAnalyzer:
             # Deduplication: Only add if function was found and not already in the list
             if new_function and new_function not in functions:
                 functions.append(new_function)
-                # Read the function's source file and extract its code
-                code_file2 = read_file_lines_from_zip(src_zip_path, file_ref).split("\n")
-                code += (
-                    "\n\nfile: " + file_ref + "\n" +
-                    self.extract_function_code(code_file2, new_function)
-                )
+                found.append((file_ref, new_function, int(line_ref)))
 
-        return code, functions
+        return found
 
     def get_next_issue_id(self, issue_type: str) -> int:
         """
-        Gets the maximum issue ID currently in the results folder.
-        Returns 0 if no files exist. The caller should add 1 to get the next ID.
+        Gets the next free issue ID in the results folder (1 if it is empty).
+        Only numbered result files ("<id>_raw.json", "<id>_final.json") are counted.
         """
-        max_issue_id = 1
+        max_issue_id = 0
         results_folder = Path("output/results") / self.lang / issue_type.replace(" ", "_").replace("/", "-")
-        if not results_folder.exists() or len(list(results_folder.glob("*.json"))) == 0:
+        if not results_folder.exists():
             return 1
-            
-        for file in results_folder.glob("*.json"):
-            issue_id = int(file.stem.split("_")[0])
-            max_issue_id = max(issue_id, max_issue_id)
-        return max_issue_id + 1
 
+        for file in results_folder.glob("*_*.json"):
+            issue_id = file.stem.split("_")[0]
+            if issue_id.isdigit():
+                max_issue_id = max(int(issue_id), max_issue_id)
+        return max_issue_id + 1
 
     def _prepare_issue_context(
-        self, issue: Dict[str, str]
+        self, issue: Mapping[str, str]
     ) -> Tuple[List[str], str, str]:
         """
         Set self.db_path and self.code_path from the issue, read the source
@@ -538,16 +739,14 @@ class IssueAnalyzer:
         function_tree_file = str(db_path_obj / "FunctionTree.csv")
         src_zip_path = str(db_path_obj / "src.zip")
         full_file_path = self.code_path + issue["file"]
-        code_file_contents = read_file_lines_from_zip(
-            src_zip_path, full_file_path
-        ).split("\n")
+        code_file_contents = get_source_archive(src_zip_path).read_lines(full_file_path)
 
         return code_file_contents, function_tree_file, src_zip_path
     
 
     def _find_current_function(
-        self, function_tree_file: str, issue: Dict[str, str]
-    ) -> Optional[Dict[str, str]]:
+        self, function_tree_file: str, issue: Mapping[str, str]
+    ) -> Optional[Mapping[str, str]]:
         """
         Find the enclosing function for an issue's sink location.
 
@@ -559,10 +758,118 @@ class IssueAnalyzer:
             int(issue["start_line"])
         )
 
+    def _prepare_llm_request(
+        self,
+        issue: Mapping[str, str],
+        results_folder: Path,
+        issue_id: int,
+        prefetcher: Optional[ContextPrefetcher] = None,
+        assembler: Optional[PromptAssembler] = None
+    ) -> Optional[Tuple[
+        str, Tuple[str, str, Mapping[str, str], List[Mapping[str, str]], str], PrefetchResult, Dict[str, int]
+    ]]:
+        """
+        Build everything the LLM needs for one issue.
+
+        Runs on the calling thread, so the shared per-issue state
+        (self.db_path, self.code_path) is only ever touched sequentially.
+
+        Args:
+            issue (Mapping[str, str]): The issue to prepare.
+            results_folder (Path): Folder where the result files are stored.
+            issue_id (int): The numeric ID this issue will get if it is new (for logging).
+            prefetcher (Optional[ContextPrefetcher], optional): Attaches the likely-needed
+                caller, macros and classes to the prompt. Defaults to None (no prefetch).
+            assembler (Optional[PromptAssembler], optional): Fits the code into the prompt
+                token budget and counts tokens. Defaults to no limit, with estimated counts.
+
+        Returns:
+            Optional[Tuple[str, Tuple[...], PrefetchResult, Dict[str, int]]]:
+                (fingerprint, (prompt, function_tree_file, current_function, functions, db_path),
+                prefetched, token_counts), the second item being the arguments for
+                run_llm_security_analysis(), or None if the enclosing function could not be found.
+
+        Raises:
+            CodeQLError: If database files cannot be read (YAML, ZIP, CSV, etc.).
+        """
+        code_file_contents, function_tree_file, src_zip_path = \
+            self._prepare_issue_context(issue)
+
+        current_function = self._find_current_function(function_tree_file, issue)
+        if not current_function:
+            logger.warning("issue %s: Can't find the function or function is too big!", issue_id)
+            return None
+
+        snippet = code_file_contents[int(issue["start_line"]) - 1][
+            int(issue["start_offset"]) - 1:int(issue["end_offset"])
+        ]
+
+        function_start, _ = line_range(current_function)
+        sections = [CodeSection(
+            "file: " + self.code_path + issue["file"],
+            self.numbered_function_lines(code_file_contents, current_function),
+            int(issue["start_line"]) - function_start
+        )]
+
+        # Replace bracket refs in message
+        bracket_pattern = r'\[\["(.*?)"\|"((?:relative://|file://))?(/.*?):(\d+):(\d+):\d+:(\d+)"\]\]'
+        transform_func = self.create_bracket_reference_replacer(self.db_path, self.code_path)
+        message = re.sub(bracket_pattern, transform_func, issue["message"])
+
+        # Find extra refs for context expansion
+        extra_lines_pattern = r'\[\[".*?"\|"((?:relative://|file://)?)(/.*?):(\d+):\d+:\d+:\d+"\]\]'
+        extra_lines = re.findall(extra_lines_pattern, issue["message"])
+        functions = [current_function]
+
+        if extra_lines:
+            # NOTE: PHP issues have no bracket refs — this branch is never
+            # reached in the PHP backend. function_tree_file and src_zip_path
+            # are None for PHP; override find_extra_functions() if needed.
+            for file_ref, new_function, line_ref in self.find_extra_functions(
+                extra_lines, function_tree_file, current_function
+            ):
+                functions.append(new_function)
+                extra_start, _ = line_range(new_function)
+                sections.append(CodeSection(
+                    "file: " + file_ref,
+                    self.numbered_function_lines(get_source_archive(src_zip_path).read_lines(file_ref), new_function),
+                    line_ref - extra_start
+                ))
+
+        # The fingerprint identifies the issue: the full code, before budgeting and prefetch
+        fingerprint = self.compute_issue_fingerprint(
+            issue, "\n\n".join(section.render() for section in sections)
+        )
+
+        assembler = assembler or PromptAssembler(0)
+        overhead_tokens = assembler.count_tokens(self.build_prompt_by_template(issue, message, snippet, ""))
+        code, token_counts = assembler.assemble(sections, overhead_tokens)
+
+        prefetched = PrefetchResult()
+        if prefetcher is not None and function_tree_file:
+            prefetched = prefetcher.prefetch(
+                self.db_path, function_tree_file, current_function, code,
+                assembler.remaining_tokens(token_counts["code_tokens"], overhead_tokens)
+            )
+            code += prefetched.context
+            if prefetched.caller is not None and prefetched.caller not in functions:
+                functions.append(prefetched.caller)
+
+        prompt = self.build_prompt_by_template(issue, message, snippet, code)
+        token_counts["prefetch_tokens"] = prefetched.tokens
+        token_counts["prompt_tokens"] = assembler.count_tokens(prompt)
+
+        return (
+            fingerprint,
+            (prompt, function_tree_file, current_function, functions, issue["db_path"]),
+            prefetched,
+            token_counts
+        )
+
     def process_issue_type(
         self,
         issue_type: str,
-        issues_of_type: List[Dict[str, str]],
+        issues_of_type: Union[List[Mapping[str, str]], SpilledGroup],
         llm_analyzer: LLMAnalyzer
     ) -> None:
         """
@@ -576,9 +883,38 @@ class IssueAnalyzer:
             - Build prompt; save raw/final; run LLM
             - Classify by '1337'/'1007'/else; log stats
 
+        Issues are prepared and numbered in order on the calling thread. Up to
+        the configured LLM concurrency (``concurrency`` in the LLM config,
+        LLM_CONCURRENCY in .env) conversations run at once on a thread pool,
+        and their results are committed strictly in issue order, so IDs, files
+        and logs are the same as with sequential processing.
+
+        In incremental mode (the default), an issue whose fingerprint and
+        prompt hash are recorded in the folder's manifest.json and whose
+        ``<id>_final.json`` exists is not sent to the LLM again. A known
+        fingerprint keeps its issue ID, so a changed issue overwrites its
+        previous result instead of being duplicated; its old result is removed
+        before it is re-triaged, and the manifest is saved as each result is
+        written, so an LLM error or a crash never leaves a stale verdict that
+        looks current. Repeated rows with the same fingerprint get IDs of
+        their own.
+
+        With a prefetch budget (``prefetch_tokens`` in the LLM config,
+        LLM_PREFETCH_TOKENS in .env), the direct caller and the macros and
+        classes used by the function are attached to the prompt (see
+        ContextPrefetcher). How many tool round trips that saved is recorded
+        per issue in the manifest and summarized in the log.
+
+        The prompt tokens of every LLM request (see
+        LLMAnalyzer.last_round_stats()) are recorded per issue in the manifest
+        under "rounds", with the tokens read from the provider's prompt cache
+        and those saved by conversation compaction (LLM_COMPACT_AFTER_ROUNDS),
+        and totalled in the log.
+
         Args:
             issue_type (str): The name of the issue type.
-            issues_of_type (List[Dict[str, str]]): All issues belonging to that type.
+            issues_of_type (Union[List[Mapping[str, str]], SpilledGroup]): All issues
+                belonging to that type (a list, or a group of a GroupedSpillBuffer).
             llm_analyzer (LLMAnalyzer): The LLM analyzer instance to use for queries.
         
         Raises:
@@ -589,90 +925,171 @@ class IssueAnalyzer:
         results_folder = Path("output/results") / self.lang / issue_type.replace(" ", "_").replace("/", "-")
         self.ensure_directories_exist([str(results_folder)])
 
-        issue_id = self.get_next_issue_id(issue_type)
+        manifest = self.load_results_manifest(results_folder)
+        # IDs recorded in the manifest stay reserved even if their files are gone
+        issue_id = max(
+            [self.get_next_issue_id(issue_type)] + [entry["issue_id"] + 1 for entry in manifest.values()]
+        )
+        unchanged_issues = []
         real_issues = []
         false_issues = []
         more_data = []
         skipped_issues = []  # Track issues skipped due to LLM errors (timeout, rate limit, etc.)
+        concurrency = max(1, int((llm_analyzer.config or {}).get("concurrency", 1)))
+        model = getattr(llm_analyzer, "model", None)
+        count_tokens = make_token_counter(model)
+        assembler = PromptAssembler(
+            resolve_prompt_budget((llm_analyzer.config or {}).get("prompt_max_tokens"), model), count_tokens
+        )
+        prefetch_tokens = int((llm_analyzer.config or {}).get("prefetch_tokens", 0))
+        prefetcher = ContextPrefetcher(prefetch_tokens, count_tokens) if prefetch_tokens > 0 else None
+        prefetch_totals: Dict[str, int] = {}
+        round_totals: Dict[str, int] = {}
+
+        def run_conversation(
+            request: Tuple[str, str, Mapping[str, str], List[Mapping[str, str]], str]
+        ) -> Tuple[List[Dict[str, Any]], str, List[Dict[str, int]]]:
+            # Runs on the worker thread, where the analyzer keeps the conversation's round stats
+            messages, content = llm_analyzer.run_llm_security_analysis(*request)
+            last_round_stats = getattr(llm_analyzer, "last_round_stats", None)
+            return messages, content, last_round_stats() if last_round_stats else []
+
+        def commit_result(
+            committed_id: int,
+            future: "Future[Tuple[List[Dict[str, Any]], str, List[Dict[str, int]]]]",
+            fingerprint: str,
+            prompt_hash: str,
+            prefetched: PrefetchResult
+        ) -> None:
+            try:
+                messages, content, rounds = future.result()
+                if prefetched.items:
+                    stats = prefetch_stats(prefetched.to_json(), messages)
+                    manifest[fingerprint]["prefetch"] = stats
+                    for key, value in stats.items():
+                        prefetch_totals[key] = prefetch_totals.get(key, 0) + value
+                    logger.debug(
+                        "Issue ID: %s, prefetched %d item(s) (%d tokens), %d mentioned, %d used without a tool call",
+                        committed_id, stats["prefetched"], stats["tokens"], stats["mentioned"], stats["items_used"]
+                    )
+
+                if rounds:
+                    manifest[fingerprint]["rounds"] = [entry["prompt_tokens"] for entry in rounds]
+                    totals = {
+                        "rounds": len(rounds),
+                        "prompt_tokens": sum(entry["prompt_tokens"] for entry in rounds),
+                        "cached_tokens": sum(entry.get("cached_tokens", 0) for entry in rounds),
+                        "saved_tokens": sum(entry.get("saved_tokens", 0) for entry in rounds),
+                        "streamed": sum("ttft_ms" in entry for entry in rounds),
+                        "ttft_ms": sum(entry.get("ttft_ms", 0) for entry in rounds),
+                        "stopped_early": sum(entry.get("stopped_early", 0) for entry in rounds),
+                    }
+                    if totals["cached_tokens"]:
+                        manifest[fingerprint]["cached_tokens"] = totals["cached_tokens"]
+                    if totals["saved_tokens"]:
+                        manifest[fingerprint]["compaction_saved_tokens"] = totals["saved_tokens"]
+                    for key, value in totals.items():
+                        round_totals[key] = round_totals.get(key, 0) + value
+
+                gpt_result = self.format_llm_messages(messages)
+                final_file = Path(results_folder) / f"{committed_id}_final.json"
+                write_file_ascii(str(final_file), gpt_result)
+                # Only a written result makes the issue count as triaged with this prompt
+                manifest[fingerprint]["prompt_hash"] = prompt_hash
+
+                # Check status code in LLM content
+                status = self.determine_issue_status(content)
+                if status == "true":
+                    real_issues.append(committed_id)
+                    status = "True Positive"
+                elif status == "false":
+                    false_issues.append(committed_id)
+                    status = "False Positive"
+                else:
+                    more_data.append(committed_id)
+                    status = "LLM needs More Data"
+
+                # Log issue status
+                logger.info("Issue ID: %s, LLM decision: → %s", committed_id, status)
+            except LLMApiError as e:
+                # Skip this issue on LLM errors (timeout, rate limit, etc.) and continue with others
+                logger.warning("Issue ID: %s SKIPPED - LLM error: %s", committed_id, e)
+                skipped_issues.append(committed_id)
+            except (CodeQLConfigError, LLMConfigError):
+                raise
+            except Exception as e:
+                # Any other error (unreadable database files, a failed write, a bug) only skips this issue
+                logger.error(
+                    "Issue ID: %s SKIPPED - %s: %s", committed_id, type(e).__name__, e,
+                    exc_info=not isinstance(e, VulnhallaError)
+                )
+                skipped_issues.append(committed_id)
+            finally:
+                # Record the ID taken by this issue (and its prompt hash, if triaged) even on failure
+                self.save_results_manifest(results_folder, manifest)
 
         logger.info("Found %d issues of type %s", len(issues_of_type), issue_type)
         logger.info("")
-        for issue in issues_of_type:
-            code_file_contents, function_tree_file, src_zip_path = \
-                self._prepare_issue_context(issue)
-
-            current_function = self._find_current_function(function_tree_file, issue)
-            if not current_function:
-                logger.warning("issue %s: Can't find the function or function is too big!", issue_id)
-                continue
-
-            snippet = code_file_contents[int(issue["start_line"]) - 1][
-                int(issue["start_offset"]) - 1:int(issue["end_offset"])
-            ]
-
-            code = (
-                "file: " + self.code_path + issue["file"] + "\n" +
-                self.extract_function_code(code_file_contents, current_function)
-            )
-
-            # Replace bracket refs in message
-            bracket_pattern = r'\[\["(.*?)"\|"((?:relative://|file://))?(/.*?):(\d+):(\d+):\d+:(\d+)"\]\]'
-            transform_func = self.create_bracket_reference_replacer(self.db_path, self.code_path)
-            message = re.sub(bracket_pattern, transform_func, issue["message"])
-
-            # Find extra refs for context expansion
-            extra_lines_pattern = r'\[\[".*?"\|"((?:relative://|file://)?)(/.*?):(\d+):\d+:\d+:\d+"\]\]'
-            extra_lines = re.findall(extra_lines_pattern, issue["message"])
-            functions = [current_function]
-
-            if extra_lines:
-                # NOTE: PHP issues have no bracket refs — this branch is never
-                # reached in the PHP backend. function_tree_file and src_zip_path
-                # are None for PHP; override append_extra_functions() if needed.
-                code, functions = self.append_extra_functions(
-                    extra_lines, function_tree_file, src_zip_path, code, current_function
+        in_flight: Deque[Tuple[
+            int, "Future[Tuple[List[Dict[str, Any]], str, List[Dict[str, int]]]]", str, str, PrefetchResult
+        ]] = deque()
+        assigned_ids: Set[int] = set()
+        occurrences: Dict[str, int] = {}
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="llm-triage") as executor:
+            for issue in issues_of_type:
+                prepared = self._prepare_llm_request(issue, results_folder, issue_id, prefetcher, assembler)
+                if prepared is None:
+                    continue
+                fingerprint, request, prefetched, token_counts = prepared
+                prompt_hash = self.compute_prompt_hash(request[0])
+                # Repeated rows of the same finding are told apart by their occurrence
+                occurrence = occurrences.get(fingerprint, 0)
+                occurrences[fingerprint] = occurrence + 1
+                if occurrence:
+                    fingerprint = hashlib.sha256(f"{fingerprint}#{occurrence}".encode("utf-8")).hexdigest()
+
+                known = manifest.get(fingerprint)
+                if known is not None and known["issue_id"] not in assigned_ids:
+                    current_id = known["issue_id"]
+                    if (self.incremental and known.get("prompt_hash") == prompt_hash
+                            and (results_folder / f"{current_id}_final.json").exists()):
+                        assigned_ids.add(current_id)
+                        unchanged_issues.append(current_id)
+                        continue
+                else:
+                    current_id = issue_id
+                    issue_id += 1
+                assigned_ids.add(current_id)
+
+                # The previous verdict was for another prompt: it must not outlive a failed re-triage
+                final_file = results_folder / f"{current_id}_final.json"
+                if final_file.exists():
+                    final_file.unlink()
+
+                # Save raw input to the LLM; the manifest gets the prompt hash with the result
+                self.save_raw_input_data(
+                    request[0], request[1], request[2], str(results_folder), current_id, fingerprint,
+                    prefetched.to_json(), token_counts
                 )
+                manifest[fingerprint] = {"issue_id": current_id}
 
-            prompt = self.build_prompt_by_template(issue, message, snippet, code)
-
-            # Save raw input to the LLM
-            self.save_raw_input_data(prompt, function_tree_file, current_function, results_folder, issue_id)
+                # Send to LLM (errors are handled when the result is committed)
+                in_flight.append((
+                    current_id,
+                    executor.submit(run_conversation, request),
+                    fingerprint,
+                    prompt_hash,
+                    prefetched
+                ))
 
-            # Send to LLM (with error handling for timeouts and API errors)
-            try:
-                messages, content = llm_analyzer.run_llm_security_analysis(
-                    prompt,
-                    function_tree_file,
-                    current_function,
-                    functions,
-                    self.db_path
-                )
-            except LLMApiError as e:
-                # Skip this issue on LLM errors (timeout, rate limit, etc.) and continue with others
-                logger.warning("Issue ID: %s SKIPPED - LLM error: %s", issue_id, e)
-                skipped_issues.append(issue_id)
-                issue_id += 1
-                continue
+                # Bounded window: wait for the oldest conversation before starting another
+                while len(in_flight) >= concurrency:
+                    commit_result(*in_flight.popleft())
 
-            gpt_result = self.format_llm_messages(messages)
-            final_file = Path(results_folder) / f"{issue_id}_final.json"
-            write_file_ascii(str(final_file), gpt_result)
-
-            # Check status code in LLM content
-            status = self.determine_issue_status(content)
-            if status == "true":
-                real_issues.append(issue_id)
-                status = "True Positive"
-            elif status == "false":
-                false_issues.append(issue_id)
-                status = "False Positive"
-            else:
-                more_data.append(issue_id)
-                status = "LLM needs More Data"
+            while in_flight:
+                commit_result(*in_flight.popleft())
 
-            # Log issue status
-            logger.info("Issue ID: %s, LLM decision: → %s", issue_id, status)
-            issue_id += 1
+        self.save_results_manifest(results_folder, manifest)
 
         logger.info("")
         logger.info("Issue type: %s", issue_type)
@@ -680,6 +1097,25 @@ class IssueAnalyzer:
         logger.info("True Positive: %d", len(real_issues))
         logger.info("False Positive: %d", len(false_issues))
         logger.info("LLM needs More Data: %d", len(more_data))
+        if unchanged_issues:
+            logger.info("Unchanged (already triaged): %d", len(unchanged_issues))
+        if round_totals:
+            logger.info(
+                "LLM requests: %d, prompt tokens: %d (%d from the provider's prompt cache, %d saved by compaction)",
+                round_totals["rounds"], round_totals["prompt_tokens"], round_totals["cached_tokens"],
+                round_totals["saved_tokens"]
+            )
+        if round_totals.get("streamed"):
+            logger.info(
+                "Streaming: average time to first token %d ms, %d answer(s) stopped early",
+                round_totals["ttft_ms"] // round_totals["streamed"], round_totals["stopped_early"]
+            )
+        if prefetch_totals:
+            logger.info(
+                "Prefetch: %d of %d prefetched items used without a tool call (%d mentioned, %d tokens)",
+                prefetch_totals["items_used"], prefetch_totals["prefetched"],
+                prefetch_totals["mentioned"], prefetch_totals["tokens"]
+            )
         if skipped_issues:
             logger.warning("Skipped (LLM errors): %d (IDs: %s)", len(skipped_issues), skipped_issues)
         logger.info("")
@@ -706,21 +1142,40 @@ class IssueAnalyzer:
         if self.config is None:
             validate_and_exit_on_error()
         
-        llm_analyzer = LLMAnalyzer()
-        llm_analyzer.init_llm_client(config=self.config)
-
-        # Gather issues from all DBs
-        issues_statistics = self.collect_issues_from_databases(dbs_dir)
-
-        total_issues = 0
-        for issue_type in issues_statistics:
-            total_issues += len(issues_statistics[issue_type])
-        logger.info("Total issues found: %d", total_issues)
-        logger.info("")
-
-        # Process all issues, type by type
-        for issue_type in issues_statistics.keys():
-            self.process_issue_type(issue_type, issues_statistics[issue_type], llm_analyzer)
+        with LLMAnalyzer() as llm_analyzer:
+            llm_analyzer.init_llm_client(config=self.config)
+            if not self.use_cache:
+                llm_analyzer.response_cache = None
+
+            if self.stream_issues:
+                # Parse and triage one DB at a time
+                total_issues = 0
+                for db_path, grouped in self.iter_issues_by_database(dbs_dir):
+                    total_issues += len(grouped)
+                    for issue_type in grouped.keys():
+                        self.process_issue_type(issue_type, grouped.group(issue_type), llm_analyzer)
+                    # This database's lookups are done; free its indexes
+                    evict_indexes(db_path)
+                logger.info("Total issues found: %d", total_issues)
+            else:
+                # Gather issues from all DBs
+                issues_statistics = self.collect_issues_from_databases(dbs_dir)
+
+                total_issues = 0
+                for issue_type in issues_statistics:
+                    total_issues += len(issues_statistics[issue_type])
+                logger.info("Total issues found: %d", total_issues)
+                logger.info("")
+
+                # Process all issues, type by type
+                for issue_type in issues_statistics.keys():
+                    self.process_issue_type(issue_type, issues_statistics[issue_type], llm_analyzer)
+
+            if llm_analyzer.response_cache is not None:
+                logger.info(
+                    "LLM response cache: %d hits, %d misses",
+                    llm_analyzer.response_cache.hits, llm_analyzer.response_cache.misses
+                )
 
 if __name__ == '__main__':
     # Initialize logging
@@ -7,3 +7,60 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+
+import zipfile
+
+import pytest
+
+
+FAKE_SOURCE = """#include <stdio.h>
+
+void log_msg(char *msg) {
+    printf(msg);
+}
+
+int main(int argc, char **argv) {
+    log_msg(argv[1]);
+    printf(argv[1]);
+    return 0;
+}
+"""
+
+
+@pytest.fixture
+def fake_codeql_db(tmp_path, monkeypatch):
+    """
+    A minimal CodeQL database (codeql-database.yml, src.zip, tool CSVs and
+    issues.csv) with the working directory switched to a scratch folder that
+    sees the project's data/ templates, so results land under tmp_path/output.
+    """
+    work = tmp_path / "work"
+    work.mkdir()
+    (work / "data").symlink_to(PROJECT_ROOT / "data")
+    monkeypatch.chdir(work)
+
+    db = tmp_path / "dbs" / "demo" / "demo"
+    db.mkdir(parents=True)
+    (db / "codeql-database.yml").write_text("sourceLocationPrefix: /home/demo\n")
+    with zipfile.ZipFile(db / "src.zip", "w") as zf:
+        zf.writestr("home/demo/src/main.c", FAKE_SOURCE)
+
+    (db / "FunctionTree.csv").write_text(
+        '"log_msg","/home/demo/src/main.c",3,"/home/demo/src/main.c:3",5,"/home/demo/src/main.c:7"\n'
+        '"main","/home/demo/src/main.c",7,"/home/demo/src/main.c:7",11,""\n'
+    )
+    (db / "Macros.csv").write_text('"BUF","#define BUF 64"\n')
+    (db / "GlobalVars.csv").write_text("")
+    (db / "Classes.csv").write_text("")
+
+    help_text = "Non-constant format string."
+    rows = [
+        ("Non-constant format string", help_text, "warning", "fmt in log_msg", "/src/main.c", 4, 5, 4, 15),
+        ("Non-constant format string", help_text, "warning", "fmt in main", "/src/main.c", 9, 5, 9, 19),
+        ("Non-constant format string", help_text, "warning", "fmt again", "/src/main.c", 4, 12, 4, 14),
+    ]
+    (db / "issues.csv").write_text(
+        "".join(",".join(f'"{v}"' if isinstance(v, str) else str(v) for v in r) + "\n" for r in rows)
+    )
+    return db
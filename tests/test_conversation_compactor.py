@@ -0,0 +1,129 @@
+"""Tests for conversation compaction and per-round token tracking."""
+
+import json
+
+import litellm
+
+from src.llm.conversation_compactor import ConversationCompactor
+from src.llm.llm_analyzer import LLMAnalyzer
+
+_real_completion = litellm.completion
+
+CODE = "file: src/main.c\n3: void log_msg(char *msg) {\n4: \tprintf(msg);\n5: }"
+
+
+def _round(number, content, name="get_function_code"):
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{"id": f"call_{number}"}]},
+        {"role": "tool", "tool_call_id": f"call_{number}", "name": name, "content": content},
+    ]
+
+
+def _conversation():
+    return (
+        [{"role": "system", "content": "instructions"},
+         {"role": "user", "content": "Code:\n" + CODE.replace("\t", "    ")}]
+        + _round(1, "file: src/util.c\n" + "\n".join(f"{10 + n}:     total += values[{n}];" for n in range(8)))
+        + _round(2, "#define BUF 64", "get_macro")
+        + _round(3, "Here is the caller function for 'log_msg':\n" + CODE)
+    )
+
+
+def test_disabled_compactor_sends_conversation_unchanged():
+    messages = _conversation()
+    assert ConversationCompactor(0).compact(messages) is messages
+
+
+def test_stale_tool_outputs_are_summarized():
+    messages = _conversation()
+    compacted = ConversationCompactor(2).compact(messages)
+
+    assert len(compacted) == len(messages)
+    assert compacted[3]["tool_call_id"] == "call_1"
+    assert compacted[3]["content"].startswith("[Output of get_function_code from tool round 1 omitted (9 lines")
+    assert compacted[5] == messages[5]
+    # The recorded conversation is left intact
+    assert messages[3]["content"].startswith("file: src/util.c")
+
+
+def test_repeated_code_blocks_are_sent_once():
+    compacted = ConversationCompactor(5).compact(_conversation())
+
+    assert compacted[-1]["content"] == (
+        "Here is the caller function for 'log_msg':\n"
+        "file: src/main.c\n(lines 3-5 are shown earlier in the conversation)"
+    )
+    assert compacted[3]["content"].startswith("file: src/util.c\n10:     total += values[0];")
+
+
+def test_round_stats_record_prompt_tokens(tmp_path, monkeypatch):
+    sent = []
+
+    def fake_completion(**kwargs):
+        sent.append(kwargs["messages"])
+        return _real_completion(model="gpt-4o", messages=kwargs["messages"], mock_response="Safe. 1007")
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    analyzer = LLMAnalyzer()
+    analyzer.init_llm_client(config={
+        "provider": "openai", "model": "gpt-4o", "api_key": "sk-test-123",
+        "cache": False, "compact_after_rounds": 1,
+    })
+    analyzer.run_llm_security_analysis("prompt", "", {}, [], str(tmp_path))
+
+    rounds = analyzer.last_round_stats()
+    assert len(rounds) == 1 and rounds[0]["prompt_tokens"] > 0
+    assert rounds[0]["saved_tokens"] == 0
+
+
+
+def test_long_argument_notes_of_stale_rounds_are_summarized():
+    long_note = "\n".join(f"The argument {index} is copied unchanged." for index in range(8))
+    messages = (
+        _round(1, CODE)
+        + [{"role": "assistant", "content": long_note}, {"role": "assistant", "content": "argv[1] (main) -> msg"}]
+        + _round(2, "#define BUF 64", "get_macro")
+    )
+    compacted = ConversationCompactor(1).compact(messages)
+
+    assert compacted[2]["content"] == (
+        "[Argument mapping from tool round 1 omitted (8 lines, began: 'The argument 0 is copied unchanged.').]"
+    )
+    assert compacted[3] == messages[3]
+
+
+def test_compaction_saves_tokens_in_a_conversation(fake_codeql_db, monkeypatch):
+    from src.codeql.db_index import get_function_index
+
+    tree = fake_codeql_db / "FunctionTree.csv"
+    tool_calls = iter([("get_caller_function", {}), ("get_function_code", {"function_name": "log_msg"})])
+    sent = []
+
+    def fake_completion(**kwargs):
+        sent.append(kwargs["messages"])
+        call = next(tool_calls, None)
+        if call is None:
+            return _real_completion(model="gpt-4o", messages=kwargs["messages"], mock_response="Safe. 1007")
+        name, arguments = call
+        return litellm.ModelResponse(choices=[{"message": {
+            "role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{len(sent)}", "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }],
+        }}])
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    analyzer = LLMAnalyzer()
+    analyzer.init_llm_client(config={
+        "provider": "openai", "model": "gpt-4o", "api_key": "sk-test-123",
+        "cache": False, "compact_after_rounds": 1, "args_mapping": "static",
+    })
+    log_msg = get_function_index(tree).get_by_function_id("/home/demo/src/main.c:3")
+    prompt = "Code:\n" + analyzer.extract_function_from_file(str(fake_codeql_db), log_msg)
+    analyzer.run_llm_security_analysis(prompt, str(tree), log_msg, [log_msg], str(fake_codeql_db))
+
+    main_output, log_msg_output = [message for message in sent[-1] if message["role"] == "tool"]
+    # The output of round 1 is stale, the function fetched in round 2 repeats the prompt
+    assert main_output["content"].startswith("[Output of get_caller_function from tool round 1 omitted")
+    assert log_msg_output["content"].endswith("(lines 3-5 are shown earlier in the conversation)")
+    assert analyzer.last_round_stats()[-1]["saved_tokens"] > 0
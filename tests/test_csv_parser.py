@@ -0,0 +1,24 @@
+"""Tests for the CodeQL CSV line splitter."""
+
+import random
+import re
+
+from src.utils.csv_parser import parse_csv_row, split_csv_fields
+
+# The lookahead regex split_csv_fields() replaced
+REGEX_SPLIT_PATTERN = re.compile(r',(?=(?:[^"]*"[^"]*")*[^"]*$)')
+
+
+def test_quoted_commas_are_kept():
+    line = '"Foo<int, long>::bar(a, b)","/src/a.cpp",10,"/src/a.cpp:10",20,""'
+    assert split_csv_fields(line) == [
+        '"Foo<int, long>::bar(a, b)"', '"/src/a.cpp"', "10", '"/src/a.cpp:10"', "20", '""'
+    ]
+    assert parse_csv_row(line, ["name", "file"]) == {"name": '"Foo<int, long>::bar(a, b)"', "file": '"/src/a.cpp"'}
+
+
+def test_matches_regex_splitter_on_random_lines():
+    rng = random.Random(13)
+    for _ in range(5000):
+        line = "".join(rng.choice('ab,"" ,x') for _ in range(rng.randint(0, 30)))
+        assert split_csv_fields(line) == REGEX_SPLIT_PATTERN.split(line), line
@@ -0,0 +1,321 @@
+"""Tests for the FunctionTree.csv interval index."""
+
+import random
+
+from src.codeql.db_index import get_function_index
+
+
+def _row(name, file, start, end, caller=""):
+    return f'"{name}","{file}",{start},"{file}:{start}",{end},"{caller}"\n'
+
+
+def _linear_smallest(rows, file_path, line):
+    """Reference implementation: the original full-scan selection."""
+    best, smallest = None, float("inf")
+    for name, file, start, end in rows:
+        if file_path in f'"{file}"' and start <= line <= end and end - start < smallest:
+            best, smallest = name, end - start
+    return best
+
+
+def test_nested_functions_pick_smallest(tmp_path):
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(
+        _row("outer", "/src/a.c", 1, 50)
+        + _row("inner", "/src/a.c", 10, 20)
+        + _row("other", "/src/b.c", 1, 100)
+    )
+    index = get_function_index(tree)
+
+    assert index.find_function_by_line("/src/a.c", 15)["function_name"] == "inner"
+    assert index.find_function_by_line("/src/a.c", 30)["function_name"] == "outer"
+    assert index.find_function_by_line("/src/a.c", 51) is None
+    assert index.find_function_by_line("/src/b.c", 51)["function_name"] == "other"
+
+
+def test_index_matches_linear_scan(tmp_path):
+    rng = random.Random(7)
+    rows = []
+    for i in range(300):
+        start = rng.randint(1, 500)
+        rows.append((f"f{i}", rng.choice(["/src/a.c", "/src/b.c", "/lib/a.c"]), start, start + rng.randint(0, 80)))
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text("".join(_row(*r) for r in rows))
+    index = get_function_index(tree)
+
+    for file_path in ["/src/a.c", "a.c", "/lib/a.c"]:
+        for line in range(0, 600, 7):
+            found = index.find_function_by_line(file_path, line)
+            expected = _linear_smallest(rows, file_path, line)
+            assert (found["function_name"].strip('"') if found else None) == expected
+
+
+def test_index_rebuilt_when_file_changes(tmp_path):
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(_row("first", "/src/a.c", 1, 10))
+    assert get_function_index(tree).find_function_by_line("/src/a.c", 5)["function_name"] == "first"
+
+    tree.write_text(_row("second", "/src/a.c", 1, 10) + _row("third", "/src/a.c", 20, 30))
+    assert get_function_index(tree).find_function_by_line("/src/a.c", 25)["function_name"] == "third"
+
+
+def test_name_lookups(tmp_path):
+    from src.codeql.db_lookup import CodeQLDBLookup
+
+    (tmp_path / "Macros.csv").write_text(
+        '"BUF_SIZE_MAX","#define BUF_SIZE_MAX 512"\n"BUF_SIZE","#define BUF_SIZE 64"\n'
+    )
+    (tmp_path / "Classes.csv").write_text(
+        '"Class","ns::Parser","/src/p.h",3,40,"Parser"\n'
+    )
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(
+        _row("main", "/src/a.c", 1, 20)
+        + _row("parse_header", "/src/p.c", 5, 30, caller="/src/a.c:1")
+        + _row("parse_body", "/src/p.c", 40, 60, caller="/src/p.c:5")
+    )
+    lookup = CodeQLDBLookup()
+
+    assert lookup.get_macro(str(tmp_path), "BUF_SIZE")["macro_name"] == '"BUF_SIZE"'
+    assert lookup.get_macro(str(tmp_path), "SIZE_M")["macro_name"] == '"BUF_SIZE_MAX"'
+    assert isinstance(lookup.get_macro(str(tmp_path), "NOPE"), str)
+    assert lookup.get_class(str(tmp_path), "Parser")["file"] == '"/src/p.h"'
+
+    main = get_function_index(tree).get_by_function_id("/src/a.c:1")
+    found, parent = lookup.get_function_by_name(str(tree), "parse_header", [main])
+    assert found["function_name"] == "parse_header" and parent is main
+    found, parent = lookup.get_function_by_name(str(tree), "body", [main, found])
+    assert found["function_name"] == "parse_body"
+    assert lookup.get_caller_function(str(tree), found)["function_name"] == "parse_header"
+
+
+def test_function_records_item_view(tmp_path):
+    import json
+    import sys
+
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(_row("main", "/src/a.c", 1, 20, caller="/src/x.c:3") + _row("f", "/src/a.c", 30, 40))
+    index = get_function_index(tree)
+    main, f = index.rows
+
+    assert main.start_line == 1 and main.end_line == 20 and main.file == "/src/a.c"
+    assert main.file is f.file  # interned
+    assert dict(main) == {
+        "function_name": "main", "file": "/src/a.c", "start_line": "1",
+        "function_id": "/src/a.c:1", "end_line": "20", "caller_id": "/src/x.c:3",
+    }
+    assert json.loads(json.dumps(dict(f)))["caller_id"] == ""
+    assert not hasattr(main, "__dict__")
+    assert sys.getsizeof(main) < sys.getsizeof(dict(main))
+
+
+def test_issue_records_parse_lines_once():
+    from src.utils.records import IssueRecord
+
+    issue = IssueRecord("Rule", "help", "warning", "msg", "/src/a.c", "10", "5", "10", "9")
+    issue["db_path"] = "dbs/demo/demo"
+    assert issue.start_line == 10 and issue["start_line"] == "10"
+    assert dict(issue)["db_path"] == "dbs/demo/demo"
+    assert IssueRecord.from_dict(dict(issue)) == issue
+
+
+def test_sidecar_answers_like_csv_index(tmp_path):
+    import os
+
+    from src.codeql.db_index import FunctionTreeIndex, NameIndex, build_tool_sidecar, get_name_index
+    from src.codeql.db_sidecar import SidecarFunctionIndex, SidecarNameIndex
+
+    rng = random.Random(11)
+    rows = []
+    for i in range(200):
+        start = rng.randint(1, 400)
+        rows.append((f"f{i}", rng.choice(["/src/a.c", "/src/b.c"]), start, start + rng.randint(0, 60)))
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text("".join(_row(*r, caller=f"/src/a.c:{rng.randint(1, 400)}") for r in rows))
+    (tmp_path / "Macros.csv").write_text('"BUF_SIZE_MAX","#define BUF_SIZE_MAX 512"\n"BUF_SIZE","x"\n')
+    macro_args = (tmp_path / "Macros.csv", ["macro_name", "body"], ["macro_name"], "Macros CSV")
+
+    in_memory = get_function_index(tree)
+    in_memory_macros = get_name_index(*macro_args)
+    assert isinstance(in_memory, FunctionTreeIndex) and isinstance(in_memory_macros, NameIndex)
+
+    build_tool_sidecar(tmp_path)
+    from src.codeql import db_index
+    db_index._indexes.clear()
+    sidecar = get_function_index(tree)
+    assert isinstance(sidecar, SidecarFunctionIndex)
+    assert isinstance(get_name_index(*macro_args), SidecarNameIndex)
+
+    for line in range(0, 480, 5):
+        assert sidecar.find_function_by_line("a.c", line) == in_memory.find_function_by_line("a.c", line)
+    for row in in_memory.rows[:50]:
+        assert sidecar.get_by_function_id(row["function_id"]) == in_memory.get_by_function_id(row["function_id"])
+        assert sidecar.find_related_by_name(row.caller_id, "f1", less_strict=True) == \
+            in_memory.find_related_by_name(row.caller_id, "f1", less_strict=True)
+    for name, less_strict in [("BUF_SIZE", False), ("SIZE_M", True), ("NOPE", True), ("BU", True), ("UF_", True)]:
+        assert get_name_index(*macro_args).find(name, less_strict) == in_memory_macros.find(name, less_strict)
+
+
+def test_replaced_sidecar_connection_is_closed(tmp_path):
+    import os
+
+    from src.codeql import db_sidecar
+    from src.codeql.db_index import build_tool_sidecar
+
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(_row("first", "/src/a.c", 1, 10))
+    build_tool_sidecar(tmp_path)
+    old_index = db_sidecar.open_function_sidecar(tree)
+    old_conn = old_index._conn
+
+    build_tool_sidecar(tmp_path)
+    sidecar = tmp_path / db_sidecar.SIDECAR_FILE
+    os.utime(sidecar, ns=(1, 1))  # A new version even on coarse timestamps
+    assert db_sidecar.open_function_sidecar(tree)._conn is not old_conn
+    assert old_conn._conn is None
+    # An index still holding the closed connection reopens the current sidecar
+    assert old_index.find_function_by_line("/src/a.c", 5)["function_name"] == "first"
+
+
+def test_stale_sidecar_is_ignored(tmp_path):
+    from src.codeql.db_index import FunctionTreeIndex, build_tool_sidecar
+
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(_row("first", "/src/a.c", 1, 10))
+    build_tool_sidecar(tmp_path)
+    assert get_function_index(tree).find_function_by_line("/src/a.c", 5)["function_name"] == "first"
+
+    tree.write_text(_row("second", "/src/a.c", 1, 10) + _row("third", "/src/a.c", 20, 30))
+    index = get_function_index(tree)
+    assert isinstance(index, FunctionTreeIndex)
+    assert index.find_function_by_line("/src/a.c", 25)["function_name"] == "third"
+
+
+def test_decoded_json_outputs_are_typed(tmp_path):
+    import json
+
+    from src.codeql.db_lookup import CodeQLDBLookup
+    from src.utils.records import ToolRow
+
+    def result_set(*tuples):
+        return json.dumps({"#select": {"columns": [], "tuples": [list(t) for t in tuples]}})
+
+    a_c = {"id": 1, "label": "/src/a.c", "url": {"uri": "file:///src/a.c"}}
+    (tmp_path / "FunctionTree.json").write_text(result_set(
+        ["main", a_c, 1, "/src/a.c:1", 20, ""],
+        ["helper", a_c, 30, "/src/a.c:30", 40, "/src/a.c:1"],
+    ))
+    (tmp_path / "GlobalVars.json").write_text(result_set(["counter", a_c, 25, 25]))
+    tree = tmp_path / "FunctionTree.csv"  # callers keep passing the CSV path
+    lookup = CodeQLDBLookup()
+
+    helper = lookup.get_function_by_line(str(tree), "/src/a.c", 35)
+    assert helper.start_line == 30 and helper["file"] == "/src/a.c"
+    assert lookup.get_caller_function(str(tree), helper)["function_name"] == "main"
+
+    counter = lookup.get_global_var(str(tmp_path), "counter")
+    assert isinstance(counter, ToolRow)
+    assert counter.value("start_line") == 25 and counter["file"] == "/src/a.c" and counter["start_line"] == "25"
+
+
+def test_callers_walk_call_graph_edges(tmp_path):
+    from src.codeql.db_index import build_tool_sidecar, get_call_graph_index
+    from src.codeql.db_lookup import CodeQLDBLookup
+
+    tree = tmp_path / "FunctionTree.csv"
+    tree.write_text(
+        _row("main", "/src/a.c", 1, 20)
+        + _row("handle", "/src/a.c", 30, 40, caller="/src/a.c:1")
+        + _row("retry", "/src/a.c", 50, 60, caller="/src/a.c:30")
+        + _row("parse", "/src/p.c", 5, 30, caller="/src/a.c:30")
+    )
+
+    def edge(caller, callee, line):
+        return f'"{caller}","{callee}","/src/a.c",{line}\n'
+
+    (tmp_path / "CallGraph.csv").write_text(
+        edge("/src/a.c:1", "/src/a.c:30", 10)
+        + edge("/src/a.c:30", "/src/p.c:5", 35)
+        + edge("/src/a.c:50", "/src/p.c:5", 55)
+        + edge("/src/a.c:30", "/src/p.c:5", 38)
+        + edge("/src/a.c:30", "/src/a.c:50", 36)
+    )
+    lookup = CodeQLDBLookup()
+    parse = get_function_index(tree).get_by_function_id("/src/p.c:5")
+
+    for sidecar in (False, True):
+        if sidecar:
+            build_tool_sidecar(tmp_path)
+            from src.codeql import db_index
+            db_index._indexes.clear()
+        graph = get_call_graph_index(tmp_path / "CallGraph.csv")
+        assert graph.callers("/src/p.c:5") == ["/src/a.c:30", "/src/a.c:50"]
+        assert graph.callees("/src/a.c:30") == ["/src/p.c:5", "/src/a.c:50"]
+        assert graph.call_lines('"/src/a.c:30"', "/src/p.c:5") == [35, 38]
+
+        callers = lookup.get_callers(str(tree), parse, 3)
+        assert [(c.function_name, callee.function_name) for c, callee in callers] == [
+            ("handle", "parse"), ("retry", "parse"), ("main", "handle")
+        ]
+        assert lookup.get_caller_function(str(tree), parse)["function_name"] == "handle"
+
+
+def test_index_builds_do_not_block_each_other(tmp_path):
+    import threading
+
+    from src.codeql import db_index
+
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+    first.write_text("a")
+    second.write_text("b")
+    started, both_built = threading.Event(), threading.Event()
+    builds = []
+
+    def slow_build():
+        builds.append("a")
+        started.set()
+        # Finishes only if the other file's build can run meanwhile
+        assert both_built.wait(5)
+        return "index a"
+
+    results = []
+    slow = threading.Thread(target=lambda: results.append(db_index._get_cached_index(first, "A", slow_build)))
+    waiters = [
+        threading.Thread(target=lambda: results.append(db_index._get_cached_index(first, "A", slow_build)))
+        for _ in range(3)
+    ]
+    slow.start()
+    assert started.wait(5)
+    for waiter in waiters:
+        waiter.start()
+    assert db_index._get_cached_index(second, "B", lambda: "index b") == "index b"
+    both_built.set()
+    for thread in [slow] + waiters:
+        thread.join(5)
+    assert results == ["index a"] * 4 and builds == ["a"]
+
+
+def test_index_cache_is_bounded_and_evicted_per_database(tmp_path, monkeypatch):
+    from src.codeql import db_index
+
+    monkeypatch.setattr(db_index, "MAX_CACHED_INDEXES", 2)
+    files = []
+    for db in ["db1", "db2"]:
+        (tmp_path / db).mkdir()
+        for name in ["a.csv", "b.csv"]:
+            files.append(tmp_path / db / name)
+            files[-1].write_text(name)
+    builds = []
+
+    def get(path):
+        return db_index._get_cached_index(path, "CSV", lambda: builds.append(path) or str(path))
+
+    get(files[0]), get(files[1]), get(files[0]), get(files[2])
+    assert builds == files[:3]
+    # files[1] was the least recently used
+    get(files[0]), get(files[1])
+    assert builds == files[:3] + [files[1]]
+
+    db_index.evict_indexes(tmp_path / "db1")
+    get(files[0])
+    assert builds[-1] == files[0] and len(builds) == 5
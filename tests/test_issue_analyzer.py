@@ -0,0 +1,245 @@
+"""Tests for IssueAnalyzer issue processing."""
+
+import random
+import threading
+import time
+from pathlib import Path
+
+from src.vulnhalla import IssueAnalyzer
+
+
+class FakeLLMAnalyzer:
+    """Stands in for LLMAnalyzer: answers from the prompt after a random delay."""
+
+    def __init__(self, concurrency=1):
+        self.config = {"concurrency": concurrency}
+        self.max_in_flight = 0
+        self.calls = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def run_llm_security_analysis(self, prompt, function_tree_file, current_function, functions, db_path):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        time.sleep(random.uniform(0, 0.05))
+        with self._lock:
+            self._in_flight -= 1
+        verdict = "1337" if "main" in current_function["function_name"] else "1007"
+        return [{"role": "assistant", "content": verdict}], verdict
+
+
+def _run(concurrency, fake_codeql_db, incremental=True):
+    analyzer = IssueAnalyzer(lang="c", incremental=incremental)
+    llm = FakeLLMAnalyzer(concurrency)
+    issues = analyzer.collect_issues_from_databases(str(fake_codeql_db.parent.parent))
+    for issue_type, issues_of_type in issues.items():
+        analyzer.process_issue_type(issue_type, issues_of_type, llm)
+    results = Path("output/results/c/Non-constant_format_string")
+    return {p.name: p.read_text() for p in sorted(results.iterdir())}, llm
+
+
+def test_concurrent_mode_matches_sequential(fake_codeql_db, tmp_path):
+    sequential, _ = _run(1, fake_codeql_db)
+    assert sorted(sequential) == [
+        "1_final.json", "1_raw.json", "2_final.json", "2_raw.json", "3_final.json", "3_raw.json",
+        "manifest.json"
+    ]
+
+    for path in Path("output/results/c/Non-constant_format_string").iterdir():
+        path.unlink()
+    concurrent, llm = _run(3, fake_codeql_db)
+
+    assert concurrent == sequential
+    assert llm.max_in_flight <= 3
+
+
+def test_rerun_skips_already_triaged_issues(fake_codeql_db):
+    first, llm = _run(2, fake_codeql_db)
+    assert llm.calls == 3
+
+    second, llm = _run(2, fake_codeql_db)
+    assert llm.calls == 0
+    assert second == first
+
+    _, llm = _run(2, fake_codeql_db, incremental=False)
+    assert llm.calls == 3
+
+
+def test_missing_result_is_retriaged_in_place(fake_codeql_db):
+    _run(1, fake_codeql_db)
+    results = Path("output/results/c/Non-constant_format_string")
+    (results / "2_final.json").unlink()
+
+    files, llm = _run(1, fake_codeql_db)
+    assert llm.calls == 1
+    assert "2_final.json" in files and "4_raw.json" not in files
+
+
+def test_rows_at_the_same_location_keep_their_own_ids(fake_codeql_db):
+    issues_csv = fake_codeql_db / "issues.csv"
+    first_row = issues_csv.read_text().splitlines()[0]
+    # Same location, another message; and an exact duplicate row
+    issues_csv.write_text(
+        issues_csv.read_text() + first_row.replace("fmt in log_msg", "fmt twice") + "\n" + first_row + "\n"
+    )
+
+    files, llm = _run(2, fake_codeql_db)
+    assert llm.calls == 5
+    assert sorted(name for name in files if name.endswith("_final.json")) == [
+        f"{issue_id}_final.json" for issue_id in range(1, 6)
+    ]
+
+    again, llm = _run(2, fake_codeql_db)
+    assert llm.calls == 0 and again == files
+
+
+def test_failed_retriage_leaves_no_stale_result(fake_codeql_db):
+    import json
+
+    from src.utils.exceptions import LLMApiError
+
+    _run(1, fake_codeql_db)
+    results = Path("output/results/c/Non-constant_format_string")
+    manifest = json.loads((results / "manifest.json").read_text())
+    for entry in manifest["issues"].values():
+        entry["prompt_hash"] = "from an older template"
+    (results / "manifest.json").write_text(json.dumps(manifest))
+
+    class FailingLLM(FakeLLMAnalyzer):
+        def run_llm_security_analysis(self, *args):
+            raise LLMApiError("timeout")
+
+    analyzer = IssueAnalyzer(lang="c")
+    for issue_type, issues_of_type in analyzer.collect_issues_from_databases(
+        str(fake_codeql_db.parent.parent)
+    ).items():
+        analyzer.process_issue_type(issue_type, issues_of_type, FailingLLM())
+
+    assert not list(results.glob("*_final.json"))
+    _, llm = _run(1, fake_codeql_db)
+    assert llm.calls == 3
+
+
+
+def test_unexpected_error_skips_only_that_issue(fake_codeql_db):
+    import json
+
+    class FlakyLLM(FakeLLMAnalyzer):
+        def run_llm_security_analysis(self, prompt, function_tree_file, current_function, *args):
+            if "main" in current_function["function_name"]:
+                raise KeyError("choices")
+            return super().run_llm_security_analysis(prompt, function_tree_file, current_function, *args)
+
+    analyzer = IssueAnalyzer(lang="c")
+    for issue_type, issues_of_type in analyzer.collect_issues_from_databases(
+        str(fake_codeql_db.parent.parent)
+    ).items():
+        analyzer.process_issue_type(issue_type, issues_of_type, FlakyLLM(2))
+
+    results = Path("output/results/c/Non-constant_format_string")
+    manifest = json.loads((results / "manifest.json").read_text())["issues"]
+    triaged = {entry["issue_id"] for entry in manifest.values() if "prompt_hash" in entry}
+    assert len(manifest) == 3 and len(triaged) == 2
+    assert sorted(p.name for p in results.glob("*_final.json")) == [f"{i}_final.json" for i in sorted(triaged)]
+
+def test_streaming_groups_match_collected_issues(fake_codeql_db):
+    analyzer = IssueAnalyzer(lang="c")
+    dbs_dir = str(fake_codeql_db.parent.parent)
+    collected = analyzer.collect_issues_from_databases(dbs_dir)
+
+    streamed = {}
+    for db_path, grouped in analyzer.iter_issues_by_database(dbs_dir, max_in_memory=1):
+        assert db_path == str(fake_codeql_db)
+        for issue_type in grouped.keys():
+            group = grouped.group(issue_type)
+            assert len(group) == len(collected[issue_type])
+            streamed[issue_type] = list(group)
+            # Groups can be iterated more than once (spilled part included)
+            assert list(group) == streamed[issue_type]
+
+    assert streamed == collected
+
+    llm = FakeLLMAnalyzer(2)
+    for _, grouped in analyzer.iter_issues_by_database(dbs_dir, max_in_memory=1):
+        for issue_type in grouped.keys():
+            analyzer.process_issue_type(issue_type, grouped.group(issue_type), llm)
+    assert llm.calls == 3
+
+
+def test_prefetch_attaches_caller_and_macros(fake_codeql_db):
+    import json
+
+    (fake_codeql_db / "Macros.csv").write_text('"printf","#define printf log_printf"\n')
+
+    class PrefetchAwareLLM(FakeLLMAnalyzer):
+        def run_llm_security_analysis(self, prompt, function_tree_file, current_function, functions, db_path):
+            self.calls += 1
+            self.prompts.append(prompt)
+            return [{"role": "assistant", "content": "main passes argv[1] unchecked. 1337"}], "1337"
+
+    llm = PrefetchAwareLLM()
+    llm.prompts = []
+    llm.config["prefetch_tokens"] = 500
+    analyzer = IssueAnalyzer(lang="c")
+    for issue_type, issues_of_type in analyzer.collect_issues_from_databases(
+        str(fake_codeql_db.parent.parent)
+    ).items():
+        analyzer.process_issue_type(issue_type, issues_of_type, llm)
+
+    results = Path("output/results/c/Non-constant_format_string")
+    raw = json.loads((results / "1_raw.json").read_text())
+    assert [(item["kind"], item["name"]) for item in raw["prefetched"]] == [
+        ("caller", "main"), ("macro", "printf")
+    ]
+    assert "### caller of 'log_msg'" in llm.prompts[0] and "#define printf log_printf" in llm.prompts[0]
+
+    manifest = json.loads((results / "manifest.json").read_text())
+    stats = next(entry["prefetch"] for entry in manifest["issues"].values() if entry["issue_id"] == 1)
+    assert stats["mentioned"] == 1 and stats["items_used"] == 1
+
+
+def test_prefetch_respects_token_budget(fake_codeql_db):
+    from src.codeql.context_prefetch import ContextPrefetcher
+    from src.codeql.db_index import get_function_index
+
+    tree = fake_codeql_db / "FunctionTree.csv"
+    log_msg = get_function_index(tree).get_by_function_id("/home/demo/src/main.c:3")
+    code = "3: void log_msg(char *msg) {\n4:     printf(msg);\n5: }"
+    (fake_codeql_db / "Macros.csv").write_text('"printf","#define printf log_printf"\n')
+
+    # The caller does not fit in 20 tokens, the macro still does
+    result = ContextPrefetcher(20).prefetch(str(fake_codeql_db), str(tree), log_msg, code)
+    assert [item.name for item in result.items] == ["printf"] and result.tokens <= 20
+    assert ContextPrefetcher(0).prefetch(str(fake_codeql_db), str(tree), log_msg, code).items == []
+
+
+def test_prefetch_does_not_read_sources_that_cannot_fit(fake_codeql_db):
+    from src.codeql.context_prefetch import ContextPrefetcher
+    from src.codeql.db_index import get_function_index
+
+    tree = fake_codeql_db / "FunctionTree.csv"
+    # A 400-line caller can never fit in 50 tokens
+    tree.write_text(tree.read_text().replace(",11,", ",406,"))
+    log_msg = get_function_index(tree).get_by_function_id("/home/demo/src/main.c:3")
+    code = "3: void log_msg(char *msg) {\n4:     printf(msg);\n5: }"
+    (fake_codeql_db / "Macros.csv").write_text('"printf","#define printf log_printf"\n')
+
+    prefetcher = ContextPrefetcher(50)
+    read = []
+    prefetcher._code_of = lambda db_path, row: read.append(row) or ""
+    result = prefetcher.prefetch(str(fake_codeql_db), str(tree), log_msg, code)
+    assert [item.name for item in result.items] == ["printf"] and read == []
+
+    assert ContextPrefetcher(5).prefetch(str(fake_codeql_db), str(tree), log_msg, code).items == []
+
+
+def test_raw_output_records_prompt_tokens(fake_codeql_db):
+    import json
+
+    _run(1, fake_codeql_db)
+    raw = json.loads(Path("output/results/c/Non-constant_format_string/1_raw.json").read_text())
+    tokens = raw["tokens"]
+    assert tokens["budget"] == 0 and tokens["elided_lines"] == 0
+    assert 0 < tokens["code_tokens"] < tokens["prompt_tokens"]
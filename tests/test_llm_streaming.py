@@ -0,0 +1,52 @@
+"""Tests for streamed completions and their early stop."""
+
+import litellm
+
+from src.llm.llm_analyzer import LLMAnalyzer, StreamedAnswer
+
+_real_completion = litellm.completion
+
+
+def _complete(*chunks):
+    answer = StreamedAnswer()
+    return [answer.feed(chunk) for chunk in chunks][-1]
+
+
+def test_streamed_answer_stops_after_status_and_explanation(tmp_path, monkeypatch):
+    answer = (
+        "The format string comes from argv.\n"
+        "**1337**: argv[1] reaches printf as the format string.\n"
+        "Further rambling that should never be generated or paid for.\n"
+    )
+    requests = []
+
+    def fake_completion(**kwargs):
+        requests.append(kwargs)
+        return _real_completion(model="gpt-4o", messages=kwargs["messages"], mock_response=answer, stream=True)
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    analyzer = LLMAnalyzer()
+    analyzer.init_llm_client(config={
+        "provider": "openai", "model": "gpt-4o", "api_key": "sk-test-123", "cache": False, "stream": True,
+    })
+    _, content = analyzer.run_llm_security_analysis("prompt", "", {}, [], str(tmp_path))
+
+    assert requests[0]["stream"] is True
+    assert "argv[1] reaches printf" in content and "rambling" not in content
+    [round_stats] = analyzer.last_round_stats()
+    assert round_stats["stopped_early"] == 1 and round_stats["ttft_ms"] >= 0
+
+
+def test_streamed_answer_needs_a_final_status_line():
+    assert not _complete("1337")
+    assert not _complete("**7331**: need the caller of parse to be sure.\n")
+    assert _complete("**1007**: the buffer is bounded by sizeof(buf).\n")
+    assert _complete("Status: 1337\n", "argv[1] reaches printf ", "unchecked.\n")
+    # A code mentioned mid-sentence is not a verdict
+    assert not _complete("This could be 1337 if argv reaches printf unchecked.\n")
+
+
+def test_streamed_answer_waits_while_still_reasoning():
+    assert not _complete("1337: argv[1] probably reaches printf.\n", "Let me look at the caller first.\n")
+    assert not _complete("1007: bounded, but is len ever larger than the buffer here?\n")
+    assert _complete("1337: maybe not.\n", "1337\n", "argv[1] reaches printf unchecked.\n")
@@ -0,0 +1,143 @@
+"""Tests for the LLM tool handlers of LLMAnalyzer."""
+
+import threading
+import time
+
+from src.llm.llm_analyzer import MAX_BATCH_SYMBOLS, MAX_BATCH_WORKERS, LLMAnalyzer
+
+
+class FakeLookup:
+    """Answers lookups from fixed tables, slowly, and records the threads used."""
+
+    def __init__(self):
+        self.threads = set()
+
+    def _lookup(self, table, name):
+        self.threads.add(threading.get_ident())
+        time.sleep(0.02)
+        return table.get(name, f"'{name}' not found.")
+
+    def get_function_by_name(self, function_tree_file, name, all_functions):
+        found = self._lookup({"parse": {"function_name": '"parse"'}}, name)
+        return found, None
+
+    def get_macro(self, db_path, name):
+        return self._lookup({"BUF_SIZE": {"body": "#define BUF_SIZE 64"}}, name)
+
+    def get_class(self, db_path, name):
+        return self._lookup({"Parser": {"class_name": '"Parser"'}}, name)
+
+    def get_global_var(self, db_path, name):
+        return self._lookup({}, name)
+
+
+def test_batch_tool_resolves_symbols_in_one_message():
+    analyzer = LLMAnalyzer()
+    analyzer.db_lookup = FakeLookup()
+    analyzer.extract_function_from_file = lambda db_path, row: (
+        f"code of {next(iter(row.values()))}" if isinstance(row, dict) else str(row)
+    )
+
+    message, functions, arg_messages = analyzer._resolve_batch(
+        "FunctionTree.csv",
+        "db",
+        {
+            "function_names": ["parse", "missing_fn"],
+            "class_names": ["Parser"],
+            "macro_names": ["BUF_SIZE", "BUF_SIZE"],
+            "global_var_names": "counter",
+        },
+        [],
+    )
+
+    sections = message.split("\n\n")
+    assert sections == [
+        "### function 'parse'\ncode of \"parse\"",
+        "### function 'missing_fn'\n'missing_fn' not found.",
+        "### class 'Parser'\ncode of \"Parser\"",
+        "### macro 'BUF_SIZE'\n#define BUF_SIZE 64",
+        "### global variable 'counter'\n'counter' not found.",
+    ]
+    assert functions == [{"function_name": '"parse"'}] and arg_messages == []
+    assert len(analyzer.db_lookup.threads) > 1
+
+    # Batches share the analyzer's lookup threads, which stop when it is closed
+    analyzer._resolve_batch("FunctionTree.csv", "db", {"macro_names": ["BUF_SIZE"]}, [])
+    threads = list(analyzer._batch_resolver._threads)
+    analyzer.close()
+    assert 1 < len(threads) <= MAX_BATCH_WORKERS and not any(thread.is_alive() for thread in threads)
+
+
+def test_batch_tool_caps_symbols_per_call():
+    analyzer = LLMAnalyzer()
+    analyzer.db_lookup = FakeLookup()
+    names = [f"M{i}" for i in range(MAX_BATCH_SYMBOLS + 2)]
+
+    message, _, _ = analyzer._resolve_batch("FunctionTree.csv", "db", {"macro_names": names}, [])
+
+    assert message.count("### macro") == MAX_BATCH_SYMBOLS
+    assert message.endswith(f"request these again: M{MAX_BATCH_SYMBOLS}, M{MAX_BATCH_SYMBOLS + 1}")
+
+
+CALLER = (
+    "file: src/main.c\n7: int main(int argc, char **argv) {\n"
+    "8:     log_msg(argv[1],\n9:             argc);\n10:     return 0;\n11: }"
+)
+CALLEE = "file: src/main.c\n3: static void log_msg(const char *msg, int level) {\n4:     printf(msg);\n5: }"
+
+
+def test_static_argument_mapping_needs_no_llm():
+    analyzer = LLMAnalyzer()
+    analyzer.args_mapping = "static"
+    analyzer.map_func_args_by_llm = None  # Any LLM request would fail
+
+    message = analyzer.map_func_args(CALLER, CALLEE)
+
+    assert message == {
+        "role": "assistant",
+        "content": "Call at line 8:\nargv[1] (main) -> msg (log_msg)\nargc (main) -> level (log_msg)",
+    }
+
+
+def test_argument_mappings_run_in_parallel():
+    class Reply:
+        role = "assistant"
+        content = "x (main) -> y (f)"
+
+    def slow_mapping(caller, callee):
+        time.sleep(0.1)
+        return Reply()
+
+    with LLMAnalyzer() as analyzer:
+        analyzer.args_mapping = "llm"
+        analyzer.map_func_args_by_llm = slow_mapping
+
+        started = time.monotonic()
+        futures = [analyzer.submit_arg_mapping(CALLER, CALLEE) for _ in range(4)]
+        assert [future.result()["content"] for future in futures] == [Reply.content] * 4
+        assert time.monotonic() - started < 0.3
+        threads = list(analyzer._arg_mapper._threads)
+
+    # Closing the analyzer stops its mapping threads
+    assert threads and not any(thread.is_alive() for thread in threads)
+
+
+def test_auto_argument_mapping_falls_back_to_llm():
+    class Reply:
+        role = "assistant"
+        content = "buf (main) -> msg (log_msg)"
+
+    requests = []
+    analyzer = LLMAnalyzer()
+    analyzer.map_func_args_by_llm = lambda caller, callee: requests.append(caller) or Reply()
+
+    # The call on line 10 (from the call graph) is parsed locally
+    caller = CALLER.replace("10:     return 0;", "10:     log_msg(argv[0], 0); // line 10")
+    message = analyzer.map_func_args(caller, CALLEE, [10])
+    assert message["content"] == "Call at line 10:\nargv[0] (main) -> msg (log_msg)\n0 (main) -> level (log_msg)"
+    assert requests == []
+
+    # A call through a macro cannot be parsed: the LLM maps it
+    macro_caller = "file: src/main.c\n7: int main(void) {\n8:     LOG(buf);\n9: }"
+    assert analyzer.map_func_args(macro_caller, CALLEE)["content"] == Reply.content
+    assert requests == [macro_caller]
@@ -0,0 +1,59 @@
+"""Tests for token-budgeted prompt assembly."""
+
+from src.llm.prompt_budget import CodeSection, PromptAssembler, resolve_prompt_budget
+
+
+def _count_words(text):
+    return len(text.split())
+
+
+def _section(length=100, focus=50):
+    lines = [f"{i + 1}: statement_{i + 1} ( ) ;" for i in range(length)]
+    return CodeSection("file: src/big.c", lines, focus)
+
+
+def test_assemble_returns_full_code_when_it_fits():
+    sections = [_section(10, 3), CodeSection("file: src/other.c", ["7: int x ;"], 0)]
+    full = "\n\n".join(section.render() for section in sections)
+
+    for budget in (0, 10_000):
+        code, stats = PromptAssembler(budget, _count_words).assemble(sections, 100)
+        assert code == full
+        assert stats["elided_lines"] == 0 and stats["dropped_functions"] == 0
+        assert stats["code_tokens"] == _count_words(full)
+
+
+def test_long_function_is_trimmed_around_focus_line():
+    section = _section()
+    assembler = PromptAssembler(200, _count_words)
+    code, stats = assembler.assemble([section], 50)
+
+    assert stats["code_tokens"] <= 150 and stats["elided_lines"] > 0
+    lines = code.splitlines()
+    assert lines[0] == "file: src/big.c"
+    # Signature, sink neighbourhood and closing line survive; the gaps are marked
+    for kept in ("1: ", "2: ", "3: ", "50: ", "51: ", "52: ", "100: "):
+        assert any(line.startswith(kept) for line in lines)
+    assert not any(line.startswith("20: ") for line in lines)
+    assert sum("lines omitted" in line for line in lines) == 2
+
+
+def test_referenced_functions_share_the_budget():
+    main = _section()
+    other = CodeSection("file: src/other.c", [f"{i}: call ( ) ;" for i in range(1, 6)], 2)
+    code, stats = PromptAssembler(300, _count_words).assemble([main, other], 0)
+    assert other.render() in code and stats["dropped_functions"] == 0
+
+    huge = _section(500, 10)
+    code, stats = PromptAssembler(120, _count_words).assemble([main, huge], 0)
+    assert "51: statement_51" in code
+    assert stats["code_tokens"] <= 120
+
+
+def test_resolve_prompt_budget():
+    assert resolve_prompt_budget(0, "gpt-4o") == 0
+    assert resolve_prompt_budget(4000, None) == 4000
+    assert resolve_prompt_budget(None, "gpt-4o") == 0
+    assert resolve_prompt_budget("auto", None) == 0
+    assert resolve_prompt_budget("auto", "no-such-model-xyz") == 0
+    assert resolve_prompt_budget("auto", "gpt-4o") > 0
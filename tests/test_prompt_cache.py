@@ -0,0 +1,56 @@
+"""Tests for the prompt-cache layout of LLM requests."""
+
+from types import SimpleNamespace
+
+import litellm
+
+from src.llm.llm_analyzer import CACHE_CONTROL, LLMAnalyzer, supports_cache_markers
+
+_real_completion = litellm.completion
+
+PROMPT = "### Issue Type\nName: X\n\n### Hints for Validation\n1. Q?\n\n### Issue Overview\nMessage: m"
+
+
+def _run(model, monkeypatch, tmp_path, usage=None):
+    sent = []
+
+    def fake_completion(**kwargs):
+        sent.append(kwargs["messages"])
+        response = _real_completion(model="gpt-4o", messages=[{"role": "user", "content": "x"}], mock_response="1007")
+        if usage is not None:
+            response.usage = usage
+        return response
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    analyzer = LLMAnalyzer()
+    analyzer.init_llm_client(config={"provider": "anthropic", "model": model, "api_key": "sk-test-123", "cache": False})
+    messages, _ = analyzer.run_llm_security_analysis(PROMPT, "", {}, [], str(tmp_path))
+    return analyzer, messages, sent[0]
+
+
+def test_static_prefix_is_marked_for_anthropic(monkeypatch, tmp_path):
+    analyzer, messages, request = _run("claude-3-5-sonnet-20240620", monkeypatch, tmp_path)
+
+    system = request[len(analyzer.MESSAGES) - 1]["content"]
+    assert system[0]["cache_control"] == CACHE_CONTROL
+    prefix, issue = request[len(analyzer.MESSAGES)]["content"]
+    assert prefix["cache_control"] == CACHE_CONTROL and prefix["text"].endswith("1. Q?\n\n")
+    assert issue["text"].startswith("### Issue Overview") and "cache_control" not in issue
+    assert prefix["text"] + issue["text"] == PROMPT
+    # The recorded conversation keeps the plain prompt
+    assert messages[len(analyzer.MESSAGES)]["content"] == PROMPT
+
+
+def test_cached_tokens_are_recorded(monkeypatch, tmp_path):
+    usage = SimpleNamespace(prompt_tokens=1200, prompt_tokens_details=SimpleNamespace(cached_tokens=1024))
+    analyzer, _, _ = _run("claude-3-5-sonnet-20240620", monkeypatch, tmp_path, usage)
+    assert analyzer.last_round_stats() == [{"prompt_tokens": 1200, "cached_tokens": 1024}]
+
+
+def test_cache_markers_only_where_needed():
+    assert supports_cache_markers("anthropic/claude-3-5-sonnet-20240620")
+    assert supports_cache_markers("bedrock/anthropic.claude-3-5-sonnet-20240620-v1:0")
+    assert supports_cache_markers("gemini/gemini-1.5-pro")
+    assert not supports_cache_markers("gpt-4o")
+    assert not supports_cache_markers("azure/gpt-4o")
+    assert not supports_cache_markers("ollama/llama3")
@@ -0,0 +1,61 @@
+"""Tests for the shared LLM rate limiter."""
+
+import litellm
+import pytest
+
+from src.llm.rate_limiter import LLMRateLimiter, get_retry_after
+
+
+def _rate_limit_error(headers=None):
+    return litellm.RateLimitError("slow down", llm_provider="openai", model="gpt-4o", headers=headers)
+
+
+def test_retries_rate_limits_and_shrinks_concurrency(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("src.llm.rate_limiter.time.sleep", sleeps.append)
+    limiter = LLMRateLimiter(max_concurrency=8, max_retries=3)
+    attempts = iter([_rate_limit_error({"retry-after": "2"}), _rate_limit_error(), "ok"])
+
+    def flaky():
+        outcome = next(attempts)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert limiter.call(flaky) == "ok"
+    assert len(sleeps) == 2 and 2.0 <= sleeps[0] <= 3.0
+    assert limiter.concurrency.limit == 2
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr("src.llm.rate_limiter.time.sleep", lambda _: None)
+    limiter = LLMRateLimiter(max_retries=2)
+    calls = []
+
+    def always_limited():
+        calls.append(1)
+        raise _rate_limit_error()
+
+    with pytest.raises(litellm.RateLimitError):
+        limiter.call(always_limited)
+    assert len(calls) == 3
+
+
+def test_non_retryable_errors_propagate_immediately():
+    limiter = LLMRateLimiter(max_retries=5)
+    calls = []
+
+    def bad_auth():
+        calls.append(1)
+        raise litellm.AuthenticationError("nope", llm_provider="openai", model="gpt-4o")
+
+    with pytest.raises(litellm.AuthenticationError):
+        limiter.call(bad_auth)
+    assert len(calls) == 1
+
+
+def test_retry_after_parsing():
+    assert get_retry_after(_rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(_rate_limit_error()) is None
+    assert get_retry_after(_rate_limit_error({"retry-after": "soon"})) is None
+    assert get_retry_after(_rate_limit_error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
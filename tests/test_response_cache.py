@@ -0,0 +1,80 @@
+"""Tests for the on-disk LLM response cache."""
+
+import time
+
+import litellm
+
+from src.llm.llm_analyzer import LLMAnalyzer
+from src.llm.response_cache import LLMResponseCache, make_cache_key
+
+
+_real_completion = litellm.completion
+
+
+def _response(content):
+    return _real_completion(
+        model="gpt-4o", messages=[{"role": "user", "content": "x"}], mock_response=content
+    )
+
+
+def test_conversation_replays_from_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_completion(**kwargs):
+        calls.append(kwargs)
+        return _response("The format string is constant. 1007")
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    config = {"provider": "openai", "model": "gpt-4o", "api_key": "sk-test-123", "cache_dir": str(tmp_path)}
+
+    for _ in range(2):
+        analyzer = LLMAnalyzer()
+        analyzer.init_llm_client(config=config)
+        messages, content = analyzer.run_llm_security_analysis("prompt", "", {}, [], str(tmp_path))
+        assert "1007" in content
+
+    assert len(calls) == 1
+    assert analyzer.response_cache.hits == 1
+
+
+def test_key_depends_on_request_content():
+    base = {"model": "gpt-4o", "temperature": 0.2, "messages": [{"role": "user", "content": "a"}]}
+    assert make_cache_key(base) == make_cache_key(dict(base, timeout=5))
+    assert make_cache_key(base) != make_cache_key(dict(base, temperature=0.3))
+    assert make_cache_key(base) != make_cache_key(dict(base, messages=[{"role": "user", "content": "b"}]))
+
+
+def test_ttl_and_size_eviction(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), ttl_seconds=3600, max_bytes=10**9)
+    cache.put("old", _response("old"))
+    cache.put("new", _response("new"))
+    assert cache.get("old").choices[0].message.content == "old"
+
+    cache.ttl_seconds = 0
+    time.sleep(0.01)
+    assert cache.get("old") is None
+
+    cache.ttl_seconds = 3600
+    cache.max_bytes = 1
+    cache.put("newest", _response("newest"))
+    assert cache.get("new") is None
+
+
+def test_running_total_tracks_entry_sizes(tmp_path):
+    cache = LLMResponseCache(str(tmp_path), max_bytes=10**9)
+    for key in ("a", "b", "a", "c"):
+        cache.put(key, _response(key * 50))
+    conn = cache._connect()
+
+    def totals():
+        return (
+            conn.execute("SELECT total_size FROM cache_stats").fetchone()[0],
+            conn.execute("SELECT SUM(size) FROM responses").fetchone()[0],
+        )
+
+    running, actual = totals()
+    assert running == actual
+    cache.max_bytes = actual - 1
+    cache.put("d", _response("d"))
+    running, actual = totals()
+    assert running == actual <= cache.max_bytes
@@ -0,0 +1,196 @@
+"""Tests for CodeQL query scheduling, using a stand-in codeql executable."""
+
+import json
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.codeql.db_scheduler import allocate_threads, run_database_jobs
+from src.codeql.run_codeql_queries import compile_all_queries, compile_workers, run_queries_on_db
+from src.utils.exceptions import CodeQLExecutionError
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Logs its argv, writes a dummy .bqrs for each query of 'database run-queries'
+# (where the real CLI puts them) and copies .bqrs → .csv on 'bqrs decode'.
+FAKE_CODEQL = '''#!{python}
+import json, sys
+from pathlib import Path
+args = sys.argv[1:]
+with open({log!r}, "a") as log:
+    log.write(json.dumps(args) + "\\n")
+if args[:2] == ["database", "run-queries"]:
+    for query in args[3:]:
+        if query.endswith(".ql"):
+            out = Path(args[2]) / "results" / "vulnhalla-cpp" / (Path(query).stem + ".bqrs")
+            out.parent.mkdir(parents=True, exist_ok=True)
+            out.write_text(Path(query).stem)
+elif args[:2] == ["bqrs", "decode"]:
+    if {fail_decode!r} and "Macros" in args[2]:
+        sys.exit(2)
+    output = next(a for a in args if a.startswith("--output="))[len("--output="):]
+    Path(output).write_text(Path(args[2]).read_text())
+elif args[:1] == ["version"]:
+    print("2.99.0")
+elif args[:2] == ["query", "compile"]:
+    Path(args[2] + "x").write_text("compiled:" + Path(args[2]).read_text())
+elif args[:2] == ["database", "analyze"]:
+    output = next(a for a in args if a.startswith("--output="))[len("--output="):]
+    Path(output).write_text("")
+'''
+
+
+def _fake_codeql(tmp_path, fail_decode=False):
+    log = tmp_path / "codeql.log"
+    script = tmp_path / "codeql"
+    script.write_text(FAKE_CODEQL.format(python=sys.executable, log=str(log), fail_decode=fail_decode))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script), log
+
+
+def test_tool_queries_run_in_one_invocation(tmp_path):
+    codeql_bin, log = _fake_codeql(tmp_path)
+    db = tmp_path / "db"
+    db.mkdir()
+
+    run_queries_on_db(
+        str(db),
+        str(PROJECT_ROOT / "data/queries/cpp/tools"),
+        str(PROJECT_ROOT / "data/queries/cpp/issues"),
+        8,
+        codeql_bin
+    )
+
+    calls = [json.loads(line) for line in log.read_text().splitlines()]
+    commands = [tuple(call[:2]) for call in calls]
+    assert commands.count(("database", "run-queries")) == 1
+    assert commands.count(("bqrs", "decode")) == 5
+    assert commands.count(("database", "analyze")) == 1
+    assert "--threads=8" in calls[0]
+    for name in ["FunctionTree", "Classes", "GlobalVars", "Macros", "CallGraph"]:
+        assert (db / f"{name}.csv").read_text() == name
+    assert (db / "issues.csv").exists()
+
+
+def test_tool_results_decoded_to_json(tmp_path):
+    codeql_bin, log = _fake_codeql(tmp_path)
+    db = tmp_path / "db"
+    db.mkdir()
+
+    run_queries_on_db(
+        str(db),
+        str(PROJECT_ROOT / "data/queries/cpp/tools"),
+        str(PROJECT_ROOT / "data/queries/cpp/issues"),
+        8,
+        codeql_bin,
+        tools_format="json"
+    )
+
+    decodes = [json.loads(line) for line in log.read_text().splitlines() if '"decode"' in line]
+    assert all("--format=json" in call for call in decodes)
+    assert (db / "FunctionTree.json").exists() and not (db / "FunctionTree.csv").exists()
+
+
+def test_decode_failure_is_reported(tmp_path):
+    codeql_bin, _ = _fake_codeql(tmp_path, fail_decode=True)
+    db = tmp_path / "db"
+    db.mkdir()
+
+    with pytest.raises(CodeQLExecutionError, match="Macros.bqrs"):
+        run_queries_on_db(
+            str(db),
+            str(PROJECT_ROOT / "data/queries/cpp/tools"),
+            str(PROJECT_ROOT / "data/queries/cpp/issues"),
+            8,
+            codeql_bin
+        )
+    assert (db / "issues.csv").exists()
+
+
+def test_allocate_threads_is_proportional():
+    assert allocate_threads(16, [300, 100]) == [12, 4]
+    assert allocate_threads(16, [1, 1, 1, 1]) == [4, 4, 4, 4]
+    assert allocate_threads(3, [1000, 1, 1]) == [1, 1, 1]
+    assert sum(allocate_threads(7, [5, 3, 2])) == 7
+
+
+def test_compile_workers_follow_ram_budget():
+    assert compile_workers(misses=30, threads=16, ram_mb=4096) == 2
+    assert compile_workers(misses=30, threads=16, ram_mb=1000) == 1
+    assert compile_workers(misses=3, threads=16, ram_mb=64000) == 3
+    assert compile_workers(misses=30, threads=4, ram_mb=64000) == 4
+
+
+def test_scheduler_isolates_failures_and_respects_budget(tmp_path):
+    dbs = []
+    for name, loc in [("big", 9000), ("small", 1000), ("broken", 1000), ("tiny", 10), ("crashed", 5)]:
+        db = tmp_path / name
+        db.mkdir()
+        (db / "codeql-database.yml").write_text(f"baselineLinesOfCode: {loc}\n")
+        dbs.append(str(db))
+
+    lock = threading.Lock()
+    in_use = {"threads": 0, "max": 0}
+    seen = {}
+
+    def run_job(job):
+        with lock:
+            in_use["threads"] += job.threads
+            in_use["max"] = max(in_use["max"], in_use["threads"])
+            seen[Path(job.db_path).name] = job.threads
+        time.sleep(0.05)
+        with lock:
+            in_use["threads"] -= job.threads
+        if job.db_path.endswith("broken"):
+            raise CodeQLExecutionError("boom")
+        if job.db_path.endswith("crashed"):
+            raise KeyError("name")
+
+    result = run_database_jobs(dbs, run_job, threads=10, max_parallel=3)
+
+    assert sorted(Path(p).name for p in result.succeeded) == ["big", "small", "tiny"]
+    assert sorted(result.failed) == [dbs[2], dbs[4]] and "boom" in result.failed[dbs[2]]
+    assert in_use["max"] <= 10
+    assert seen["big"] > seen["small"]
+
+
+def test_compile_cache_reuses_and_invalidates(tmp_path):
+    codeql_bin, log = _fake_codeql(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+
+    def compiles():
+        calls = [json.loads(line) for line in log.read_text().splitlines()] if log.exists() else []
+        return sorted(Path(c[2]).name for c in calls if c[:2] == ["query", "compile"])
+
+    def checkout(name):
+        pack = tmp_path / name
+        pack.mkdir()
+        (pack / "qlpack.yml").write_text("name: test-pack\n")
+        (pack / "A.ql").write_text("select 1")
+        (pack / "B.ql").write_text("select 2")
+        return pack
+
+    first = checkout("first")
+    compile_all_queries(str(first), 4, codeql_bin, cache_dir)
+    assert compiles() == ["A.ql", "B.ql"]
+
+    # A fresh checkout with the same queries compiles nothing
+    second = checkout("second")
+    compile_all_queries(str(second), 4, codeql_bin, cache_dir)
+    assert compiles() == ["A.ql", "B.ql"]
+    assert (second / "A.qlx").read_text() == "compiled:select 1"
+
+    # An edited query is recompiled even though a .qlx exists
+    (second / "A.ql").write_text("select 3")
+    compile_all_queries(str(second), 4, codeql_bin, cache_dir)
+    assert compiles() == ["A.ql", "A.ql", "B.ql"]
+    assert (second / "A.qlx").read_text() == "compiled:select 3"
+
+    # Pack libraries are part of the key
+    (second / "Lib.qll").write_text("predicate p() { any() }")
+    compile_all_queries(str(second), 4, codeql_bin, cache_dir)
+    assert len(compiles()) == 5
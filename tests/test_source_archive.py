@@ -0,0 +1,65 @@
+"""Tests for the open-once src.zip reader."""
+
+import zipfile
+
+import pytest
+
+from src.utils.exceptions import CodeQLError
+from src.utils import source_archive
+from src.utils.source_archive import LineCache, SourceArchive, get_source_archive
+
+
+def _make_zip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, text in members.items():
+            zf.writestr(name, text)
+
+
+def test_read_lines_is_cached(tmp_path):
+    zip_path = tmp_path / "src.zip"
+    _make_zip(zip_path, {"home/a.c": "int a;\nint b;\n"})
+    archive = get_source_archive(str(zip_path))
+
+    lines = archive.read_lines("home/a.c")
+    assert lines == ["int a;", "int b;", ""]
+    assert archive.read_lines("home/a.c") is lines
+    assert get_source_archive(str(zip_path)) is archive
+
+    with pytest.raises(CodeQLError):
+        archive.read_lines("home/missing.c")
+
+
+def test_byte_budget_evicts_least_recently_used(tmp_path):
+    zip_path = tmp_path / "src.zip"
+    _make_zip(zip_path, {"a.c": "a" * 40, "b.c": "b" * 40, "c.c": "c" * 40})
+    archive = SourceArchive(str(zip_path), cache=LineCache(100))
+
+    first = archive.read_lines("a.c")
+    archive.read_lines("b.c")
+    archive.read_lines("a.c")
+    archive.read_lines("c.c")  # evicts b.c, the least recently used
+
+    assert archive.read_lines("a.c") is first
+    assert (archive._cache_owner, "b.c") not in archive.cache
+    assert archive.cache.cached_bytes == 80
+
+
+def test_archives_share_one_budget_and_are_closed_when_evicted(tmp_path, monkeypatch):
+    monkeypatch.setattr(source_archive, "_line_cache", LineCache(100))
+    monkeypatch.setattr(source_archive, "MAX_OPEN_ARCHIVES", 2)
+    monkeypatch.setattr(source_archive, "_archives", source_archive.OrderedDict())
+    archives = []
+    for name in "abc":
+        zip_path = tmp_path / f"{name}.zip"
+        _make_zip(zip_path, {"f.c": "é" * 20})  # 40 bytes, 20 characters
+        archives.append(get_source_archive(str(zip_path)))
+        archives[-1].read_lines("f.c")
+
+    first, second, third = archives
+    assert first._zip is None and (first._cache_owner, "f.c") not in first.cache
+    assert second._zip is not None and third._zip is not None
+    assert source_archive._line_cache.cached_bytes == 80
+
+    # A caller still holding the evicted archive reads without keeping a handle open
+    assert first.read_lines("f.c") == ["é" * 20]
+    assert first._zip is None and (first._cache_owner, "f.c") not in first.cache
@@ -0,0 +1,59 @@
+"""Tests for structured triage verdicts (LLM_STRUCTURED_OUTPUT)."""
+
+import json
+
+import litellm
+
+from src.llm.llm_analyzer import LLMAnalyzer
+from src.llm.verdict import VERDICT_INSTRUCTIONS, parse_verdict
+from src.ui.results_loader import ResultsLoader
+from src.vulnhalla import IssueAnalyzer
+
+_real_completion = litellm.completion
+
+VERDICT = json.dumps({
+    "analysis": "buf is 1337 bytes and the copy is bounded by sizeof(buf).",
+    "status": "1007",
+    "reason": "memcpy(buf, src, 1337) cannot overflow the 1337-byte buffer.",
+    "exploit_parameters": "",
+})
+
+
+def test_parse_verdict():
+    verdict = parse_verdict("```json\n" + VERDICT + "\n```")
+    assert verdict.status == "1007" and verdict.issue_status == "false"
+    assert "bounded" in verdict.analysis
+
+    assert parse_verdict("Safe. **1007**") is None
+    assert parse_verdict('{"status": "42", "reason": "x"}') is None
+    assert parse_verdict("{not json") is None
+    assert parse_verdict(None) is None
+
+
+def test_status_comes_from_the_verdict_not_its_text():
+    # The reason mentions 1337, free-text matching would call this a true positive
+    assert IssueAnalyzer(lang="c").determine_issue_status(VERDICT) == "false"
+    assert ResultsLoader().extract_status(VERDICT) == "false"
+    assert ResultsLoader().extract_status("Vulnerable. 1337") == "true"
+
+
+def test_structured_run_answers_in_one_round(tmp_path, monkeypatch):
+    requests = []
+
+    def fake_completion(**kwargs):
+        requests.append(kwargs)
+        return _real_completion(model="gpt-4o", messages=kwargs["messages"], mock_response=VERDICT)
+
+    monkeypatch.setattr(litellm, "completion", fake_completion)
+    analyzer = LLMAnalyzer()
+    analyzer.init_llm_client(config={
+        "provider": "openai", "model": "gpt-4o", "api_key": "sk-test-123",
+        "cache": False, "structured_output": True,
+    })
+    messages, content = analyzer.run_llm_security_analysis("prompt", "", {}, [], str(tmp_path))
+
+    assert len(requests) == 1 and parse_verdict(content).status == "1007"
+    assert any(message["content"] == VERDICT_INSTRUCTIONS for message in requests[0]["messages"])
+    assert not any(message["content"] == "Please follow all the instructions!" for message in messages)
+    if litellm.supports_response_schema(model="gpt-4o"):
+        assert requests[0]["response_format"]["json_schema"]["name"] == "triage_verdict"